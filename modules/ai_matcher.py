@@ -3,108 +3,247 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import re
-from difflib import SequenceMatcher
-from typing import List, Dict, Tuple, Any
-from itertools import combinations
+from time import perf_counter
+from typing import List, Dict, Tuple, NamedTuple
+from modules.assignment_solver import AssignmentSolver
+from modules.matching_engine import CandidatePairs, GroupSumMatcher, descricoes_posicionais, dia_ordinal, expandir_janelas, pares_na_janela
+from modules.monetario import centavos_absolutos, centavos_para_valor, garantir_coluna_centavos
+from modules.subset_sum import SubsetSumSolver
+from modules.lsh_blocking import blocagem_por_lsh
+from modules.match_ledger import MatchLedger
+from modules.parallel_matching import ComponentParallelMatcher, colunas_dos_pares
+
+CAMPOS_ENTIDADE = ('banco', 'empresa', 'pessoa', 'local')
+# Janela de datas padrão da camada IA; o agrupamento N:1 busca as partes numa janela FATOR vezes maior
+TOLERANCIA_DIAS_IA = 3
+FATOR_JANELA_AGRUPAMENTO = 2
+
+
+class SemanticFeatureMatrix(NamedTuple):
+    """Features semânticas por linha em arrays colunares (tokens em formato CSR)"""
+    indptr: np.ndarray
+    tokens: np.ndarray
+    n_palavras: np.ndarray
+    tipo: np.ndarray
+    metodo: np.ndarray
+    entidades: np.ndarray
+    centavos: np.ndarray
+    categoria_valor: np.ndarray
+
+    def colunas(self, lado: str) -> Dict[str, np.ndarray]:
+        """Arrays nomeados '<campo>_<lado>', no formato das colunas compartilhadas com os processos"""
+        return {f'{campo}_{lado}': array for campo, array in zip(self._fields, self)}
+
+    @classmethod
+    def das_colunas(cls, colunas: Dict[str, np.ndarray], lado: str) -> 'SemanticFeatureMatrix':
+        return cls(*(colunas[f'{campo}_{lado}'] for campo in cls._fields))
+
 
 class AIMatcher:
     """Matcher avançado com IA para aumentar taxa de matching"""
     
-    def __init__(self):
+    def __init__(self, tamanho_maximo_grupo: int = 5, orcamento_grupo_segundos: float = 0.05,
+                 linhas_por_bloco: int = 1000):
         self.semantic_cache = {}
+        self._codigos = {}
+        self.estatisticas_lsh = {}
+        self.pares_candidatos = None
+        self.processos = 1
+        self.linhas_por_bloco = linhas_por_bloco
+        self.subset_sum = SubsetSumSolver(tamanho_maximo=tamanho_maximo_grupo,
+                                          orcamento_segundos=orcamento_grupo_segundos)
+        self.agrupador = GroupSumMatcher(self.subset_sum)
         
     def matching_avancado_com_ia(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
                                nao_matchados_extrato: pd.DataFrame, nao_matchados_contabil: pd.DataFrame,
-                               tolerancia_dias: int = 3, tolerancia_valor: float = 0.05) -> Dict:
-        """Matching avançado usando técnicas de IA e análise semântica"""
-        matches = []
+                               tolerancia_dias: int = TOLERANCIA_DIAS_IA, tolerancia_valor: float = 0.05,
+                               estrategia_atribuicao: str = 'otima', blocagem_lsh: bool = False,
+                               pares_candidatos: CandidatePairs = None, ledger: MatchLedger = None,
+                               processos: int = 1, prazo_segundos: float = None) -> Dict:
+        """Matching avançado usando técnicas de IA e análise semântica
+
+        As estratégias rodam em sequência sobre o mesmo ledger: cada uma só vê as linhas que as
+        anteriores deixaram livres e matches que tocariam linhas já conciliadas são recusados.
+        Com processos != 1 as estratégias 1:1 (semântica e entidades) pontuam os componentes
+        conexos do grafo de pares em vários processos.
+
+        Com prazo_segundos cada estratégia percorre as linhas livres em blocos de maior valor
+        primeiro e, esgotado o prazo, ficam os matches já encontrados; 'cobertura' informa quanto
+        da entrada cada estratégia chegou a processar.
+        """
+        self.estatisticas_lsh = {}
+        self.pares_candidatos = pares_candidatos
+        self.processos = processos
+        inicio = perf_counter()
+        prazo = None if prazo_segundos is None else inicio + prazo_segundos
+        nao_matchados_extrato = garantir_coluna_centavos(nao_matchados_extrato)
+        nao_matchados_contabil = garantir_coluna_centavos(nao_matchados_contabil)
+        ledger = ledger or MatchLedger(nao_matchados_extrato, nao_matchados_contabil)
+        
+        def livres():
+            return (ledger.nao_conciliados(nao_matchados_extrato, 'extrato'),
+                    ledger.nao_conciliados(nao_matchados_contabil, 'contabil'))
+        
+        cobertura = {}
         
         # 1. Matching por similaridade semântica avançada
-        matches_semanticos = self._matching_semantico_avancado(
-            nao_matchados_extrato, nao_matchados_contabil,
-            tolerancia_dias, tolerancia_valor
+        matches_semanticos, cobertura['semantica'] = self._em_blocos_por_valor(
+            *livres(), ledger, tolerancia_valor, prazo,
+            lambda extrato, contabil: self._matching_semantico_avancado(
+                extrato, contabil, tolerancia_dias, tolerancia_valor, estrategia_atribuicao, blocagem_lsh)
         )
-        matches.extend(matches_semanticos)
         
         # 2. Matching por padrões temporais (mensalidades, parcelas)
-        matches_temporais = self._matching_padroes_temporais(
-            nao_matchados_extrato, nao_matchados_contabil
-        )
-        matches.extend(matches_temporais)
+        matches_temporais = ledger.registrar(self._matching_padroes_temporais(*livres()))
         
-        # 3. Matching por agrupamento de valores
-        matches_agrupados = self._matching_agrupamento_valores(
-            nao_matchados_extrato, nao_matchados_contabil,
-            tolerancia_dias
-        )
-        matches.extend(matches_agrupados)
+        # 3. Matching por agrupamento de valores (alvos do contábil já percorrem do maior para o menor)
+        extrato_livre, contabil_livre = livres()
+        self.agrupador.alvos_processados = np.arange(len(contabil_livre))
+        matches_agrupados = ledger.registrar(self._matching_agrupamento_valores(
+            extrato_livre, contabil_livre, tolerancia_dias, prazo=prazo
+        ))
+        cobertura['agrupamento'] = self._cobertura_estrategia(contabil_livre, self.agrupador.alvos_processados)
         
         # 4. Matching por entidades financeiras
-        matches_entidades = self._matching_entidades_financeiras(
-            nao_matchados_extrato, nao_matchados_contabil,
-            tolerancia_dias, tolerancia_valor
+        matches_entidades, cobertura['entidades'] = self._em_blocos_por_valor(
+            *livres(), ledger, tolerancia_valor, prazo,
+            lambda extrato, contabil: self._matching_entidades_financeiras(
+                extrato, contabil, tolerancia_dias, tolerancia_valor, estrategia_atribuicao)
         )
-        matches.extend(matches_entidades)
         
         return {
-            'matches': matches,
+            'matches': matches_semanticos + matches_temporais + matches_agrupados + matches_entidades,
             'matches_semanticos': len(matches_semanticos),
             'matches_temporais': len(matches_temporais),
             'matches_agrupados': len(matches_agrupados),
-            'matches_entidades': len(matches_entidades)
+            'matches_entidades': len(matches_entidades),
+            'blocagem_lsh': self.estatisticas_lsh,
+            'cobertura': {
+                'estrategias': cobertura,
+                'percentual_linhas': min(c['percentual_linhas'] for c in cobertura.values()),
+                'percentual_valor': min(c['percentual_valor'] for c in cobertura.values()),
+                'prazo_esgotado': any(c['percentual_linhas'] < 100 for c in cobertura.values()),
+                'tempo_segundos': round(perf_counter() - inicio, 3)
+            }
+        }
+    
+    def _em_blocos_por_valor(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, ledger: MatchLedger,
+                             tolerancia_valor: float, prazo: float, estrategia) -> Tuple[List[Dict], Dict]:
+        """Estratégia 1:1 sobre as linhas livres do extrato em blocos de maior valor primeiro, até o prazo
+
+        Cada bloco (na ordem original das linhas) enfrenta só o contábil ao alcance da tolerância de
+        valor dos seus valores, as únicas linhas com que pode formar pares. Sem prazo roda uma vez
+        sobre tudo. Devolve os matches registrados e a cobertura da estratégia.
+        """
+        if prazo is None:
+            matches = ledger.registrar(estrategia(extrato_df, contabil_df))
+            return matches, self._cobertura_estrategia(extrato_df, np.arange(len(extrato_df)))
+        
+        centavos_extrato = centavos_absolutos(extrato_df)
+        centavos_contabil = centavos_absolutos(contabil_df)
+        tolerancia = int(round(tolerancia_valor * 100))
+        ordem = np.argsort(-centavos_extrato, kind='mergesort')
+        matches, processadas = [], []
+        for inicio in range(0, len(ordem), self.linhas_por_bloco):
+            if perf_counter() >= prazo:
+                break
+            bloco = np.sort(ordem[inicio:inicio + self.linhas_por_bloco])
+            alcance = ((centavos_contabil >= centavos_extrato[bloco].min() - tolerancia) &
+                       (centavos_contabil <= centavos_extrato[bloco].max() + tolerancia))
+            matches.extend(ledger.registrar(estrategia(
+                ledger.nao_conciliados(extrato_df.iloc[bloco], 'extrato'),
+                ledger.nao_conciliados(contabil_df[alcance], 'contabil')
+            )))
+            processadas.append(bloco)
+        processadas = np.concatenate(processadas) if processadas else np.zeros(0, dtype=np.int64)
+        return matches, self._cobertura_estrategia(extrato_df, processadas)
+    
+    @staticmethod
+    def _cobertura_estrategia(df: pd.DataFrame, processadas: np.ndarray) -> Dict:
+        """Linhas e valor (em % do que a estratégia recebeu) efetivamente processados"""
+        centavos = centavos_absolutos(df)
+        total = int(centavos.sum())
+        return {
+            'linhas': len(processadas),
+            'percentual_linhas': round(100.0 * len(processadas) / len(df), 2) if len(df) else 100.0,
+            'percentual_valor': round(100.0 * int(centavos[processadas].sum()) / total, 2) if total else 100.0
         }
     
     def _matching_semantico_avancado(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
-                                   tolerancia_dias: int, tolerancia_valor: float) -> List[Dict]:
+                                   tolerancia_dias: int, tolerancia_valor: float,
+                                   estrategia_atribuicao: str = 'otima', blocagem_lsh: bool = False) -> List[Dict]:
         """Matching por similaridade semântica avançada"""
         matches = []
-        extrato_processado = set()
-        contabil_processado = set()
-        
-        for _, extrato_row in extrato_df.iterrows():
-            if extrato_row['id'] in extrato_processado: continue
-                
-            valor_extrato = abs(extrato_row.get('valor_original', extrato_row.get('valor', 0)))
-            data_extrato = extrato_row.get('data')
-            descricao_extrato = extrato_row.get('descricao', '')
-            
-            features_extrato = self._extrair_features_semanticas(descricao_extrato, valor_extrato)
-            melhor_match = None
-            melhor_confianca = 0
-            
-            for _, contabil_row in contabil_df.iterrows():
-                if contabil_row['id'] in contabil_processado: continue
-                    
-                valor_contabil = abs(contabil_row.get('valor_original', contabil_row.get('valor', 0)))
-                data_contabil = contabil_row.get('data')
-                descricao_contabil = contabil_row.get('descricao', '')
-                
-                if not self._verificar_tolerancias_basicas(valor_extrato, valor_contabil, data_extrato, data_contabil, tolerancia_valor, tolerancia_dias):
-                    continue
-                
-                features_contabil = self._extrair_features_semanticas(descricao_contabil, valor_contabil)
-                confianca = self._calcular_similaridade_semantica_avancada(
-                    features_extrato, features_contabil,
-                    descricao_extrato, descricao_contabil,
-                    valor_extrato, valor_contabil,
-                    data_extrato, data_contabil
-                )
-                
-                if confianca > melhor_confianca and confianca >= 65:
-                    melhor_confianca = confianca
-                    melhor_match = contabil_row
-            
-            if melhor_match is not None:
-                matches.append({
-                    'tipo_match': '1:1', 'camada': 'ia_semantica',
-                    'ids_extrato': [extrato_row['id']], 'ids_contabil': [melhor_match['id']],
-                    'valor_total': valor_extrato, 'confianca': melhor_confianca,
-                    'explicacao': f"Match semântico (confiança: {melhor_confianca:.1f}%)",
-                    'chave_match': f"IA_SEM_{extrato_row['id']}_{melhor_match['id']}"
-                })
-                extrato_processado.add(extrato_row['id'])
-                contabil_processado.add(melhor_match['id'])
-        
+        pares = pares_na_janela(extrato_df, contabil_df, tolerancia_valor, tolerancia_dias, self.pares_candidatos)
+        if blocagem_lsh:
+            pares_lsh, self.estatisticas_lsh = blocagem_por_lsh(
+                descricoes_posicionais(extrato_df), descricoes_posicionais(contabil_df)
+            )
+            pares = pares.merge(pares_lsh[['pos_extrato', 'pos_contabil']], on=['pos_extrato', 'pos_contabil'])
+        if estrategia_atribuicao == 'gulosa':
+            pares = pares.sort_values(['pos_extrato'], kind='mergesort')
+        if self.processos != 1:
+            escolhidos, confiancas, colunas = self._resolver_em_processos(
+                extrato_df, contabil_df, pares, _pontuar_semantico_lote, estrategia_atribuicao)
+            return self._montar_matches_semanticos(extrato_df, contabil_df, colunas['pos_extrato'][escolhidos],
+                                                   colunas['pos_contabil'][escolhidos], confiancas)
+        return self._pontuar_semantico(extrato_df, contabil_df, pares, estrategia_atribuicao)
+    
+    def _resolver_em_processos(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, pares: pd.DataFrame,
+                               funcao, estrategia_atribuicao: str) -> Tuple[np.ndarray, np.ndarray, Dict]:
+        """Pares e features semânticas (códigos inteiros) em memória compartilhada, pontuados por componentes"""
+        colunas = {**colunas_dos_pares(pares),
+                   **self._montar_matriz_semantica(extrato_df).colunas('extrato'),
+                   **self._montar_matriz_semantica(contabil_df).colunas('contabil')}
+        escolhidos, pontuacoes = ComponentParallelMatcher(self.processos).resolver(
+            colunas, len(extrato_df), len(contabil_df), funcao, (estrategia_atribuicao,)
+        )
+        return escolhidos, pontuacoes, colunas
+    
+    def _pontuar_semantico(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, pares: pd.DataFrame,
+                           estrategia_atribuicao: str = 'otima') -> List[Dict]:
+        """Confiança semântica e atribuição 1:1 dos pares candidatos já filtrados"""
+        pos_extrato = pares['pos_extrato'].to_numpy()
+        pos_contabil = pares['pos_contabil'].to_numpy()
+        escolhidos, confiancas = self._escolher_semantico(
+            self._montar_matriz_semantica(extrato_df), self._montar_matriz_semantica(contabil_df),
+            pos_extrato, pos_contabil, pares['diff_dias'].to_numpy(), estrategia_atribuicao
+        )
+        ordem = np.argsort(pos_extrato[escolhidos], kind='mergesort')
+        return self._montar_matches_semanticos(extrato_df, contabil_df, pos_extrato[escolhidos][ordem],
+                                               pos_contabil[escolhidos][ordem], confiancas[ordem])
+    
+    def _escolher_semantico(self, features_extrato: 'SemanticFeatureMatrix', features_contabil: 'SemanticFeatureMatrix',
+                            pos_extrato: np.ndarray, pos_contabil: np.ndarray, diff_dias: np.ndarray,
+                            estrategia_atribuicao: str = 'otima') -> Tuple[np.ndarray, np.ndarray]:
+        """Índices dos pares escolhidos e a confiança de cada um"""
+        confiancas = self._calcular_similaridade_semantica_pares(
+            features_extrato, features_contabil, pos_extrato, pos_contabil, diff_dias
+        )
+        validos = np.flatnonzero(confiancas >= 65)
+        if estrategia_atribuicao == 'gulosa':
+            # Melhor candidato disponível de cada linha do extrato, na ordem das linhas
+            validos = validos[np.lexsort((-confiancas[validos], pos_extrato[validos]))]
+        escolhidos = validos[AssignmentSolver(estrategia_atribuicao).resolver(
+            pos_extrato[validos], pos_contabil[validos], confiancas[validos]
+        )]
+        return escolhidos, confiancas[escolhidos]
+    
+    def _montar_matches_semanticos(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                                   pos_extrato: np.ndarray, pos_contabil: np.ndarray, confiancas: np.ndarray) -> List[Dict]:
+        """Matches 1:1 da estratégia semântica, um por par escolhido"""
+        matches = []
+        centavos_extrato = centavos_absolutos(extrato_df)
+        ids_extrato = extrato_df['id'].tolist()
+        ids_contabil = contabil_df['id'].tolist()
+        for pe, pc, confianca in zip(pos_extrato.tolist(), pos_contabil.tolist(), confiancas):
+            matches.append({
+                'tipo_match': '1:1', 'camada': 'ia_semantica',
+                'ids_extrato': [ids_extrato[pe]], 'ids_contabil': [ids_contabil[pc]],
+                'valor_total': centavos_para_valor(int(centavos_extrato[pe])), 'confianca': confianca,
+                'explicacao': f"Match semântico (confiança: {confianca:.1f}%)",
+                'chave_match': f"IA_SEM_{ids_extrato[pe]}_{ids_contabil[pc]}"
+            })
         return matches
     
     def _matching_padroes_temporais(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
@@ -112,103 +251,185 @@ class AIMatcher:
         return []  # Implementação simplificada
     
     def _matching_agrupamento_valores(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
-                                    tolerancia_dias: int) -> List[Dict]:
-        """Matching por agrupamento de valores"""
+                                    tolerancia_dias: int, tolerancia_percentual: float = 0.01,
+                                    prazo: float = None) -> List[Dict]:
+        """Matching por agrupamento de valores (N transações → 1 lançamento), sem sobreposição"""
         matches = []
+        if extrato_df.empty or contabil_df.empty:
+            return matches
         
-        for _, contabil_row in contabil_df.iterrows():
-            valor_contabil = abs(contabil_row.get('valor_original', contabil_row.get('valor', 0)))
-            data_contabil = contabil_row.get('data')
-            
-            transacoes_proximas = self._encontrar_transacoes_proximas(
-                extrato_df, data_contabil, tolerancia_dias * 2
-            )
-            
-            combinacoes = self._encontrar_combinacoes_soma(transacoes_proximas, valor_contabil)
-            
-            for combinacao in combinacoes:
-                if len(combinacao) > 1:
-                    ids_extrato = [trans['id'] for trans in combinacao]
-                    matches.append({
-                        'tipo_match': f'N:1', 'camada': 'ia_agrupamento',
-                        'ids_extrato': ids_extrato, 'ids_contabil': [contabil_row['id']],
-                        'valor_total': valor_contabil, 'confianca': 85,
-                        'explicacao': f"Agrupamento de {len(combinacao)} transações",
-                        'chave_match': f"IA_AGR_{contabil_row['id']}"
-                    })
+        ids_extrato = extrato_df['id'].tolist()
+        ids_contabil = contabil_df['id'].tolist()
+        centavos_contabil = centavos_absolutos(contabil_df)
+        tolerancias = (centavos_contabil * tolerancia_percentual).astype(np.int64)
+        
+        janela_partes = tolerancia_dias * FATOR_JANELA_AGRUPAMENTO
+        for pos_contabil, posicoes in self.agrupador.agrupar(contabil_df, extrato_df, tolerancias, janela_partes, prazo):
+            matches.append({
+                'tipo_match': 'N:1', 'camada': 'ia_agrupamento',
+                'ids_extrato': [ids_extrato[p] for p in posicoes.tolist()],
+                'ids_contabil': [ids_contabil[pos_contabil]],
+                'valor_total': centavos_para_valor(int(centavos_contabil[pos_contabil])), 'confianca': 85,
+                'explicacao': f"Agrupamento de {len(posicoes)} transações",
+                'chave_match': f"IA_AGR_{ids_contabil[pos_contabil]}"
+            })
         
         return matches
     
     def _matching_entidades_financeiras(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
-                                      tolerancia_dias: int, tolerancia_valor: float) -> List[Dict]:
-        """Matching baseado em entidades financeiras"""
-        matches = []
-        entidades_extrato = self._extrair_entidades_lote(extrato_df)
-        entidades_contabil = self._extrair_entidades_lote(contabil_df)
+                                      tolerancia_dias: int, tolerancia_valor: float,
+                                      estrategia_atribuicao: str = 'otima') -> List[Dict]:
+        """Matching baseado em entidades financeiras (só pares que compartilham alguma entidade)"""
+        # Pares candidatos: dentro das tolerâncias de valor e data e com alguma entidade em comum
+        pares = pares_na_janela(extrato_df, contabil_df, tolerancia_valor, tolerancia_dias, self.pares_candidatos)
+        if self.processos != 1:
+            escolhidos, pontuacoes, colunas = self._resolver_em_processos(
+                extrato_df, contabil_df, pares, _pontuar_entidades_lote, estrategia_atribuicao)
+            return self._montar_matches_entidades(extrato_df, contabil_df, colunas['pos_extrato'][escolhidos],
+                                                  colunas['pos_contabil'][escolhidos], pontuacoes)
+        return self._pontuar_entidades(extrato_df, contabil_df, pares, estrategia_atribuicao)
+    
+    def _pontuar_entidades(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, pares: pd.DataFrame,
+                           estrategia_atribuicao: str = 'otima') -> List[Dict]:
+        """Compatibilidade de entidades e atribuição 1:1 dos pares candidatos já filtrados"""
+        pos_extrato = pares['pos_extrato'].to_numpy()
+        pos_contabil = pares['pos_contabil'].to_numpy()
+        escolhidos, pontuacoes = self._escolher_entidades(
+            self._montar_matriz_semantica(extrato_df), self._montar_matriz_semantica(contabil_df),
+            pos_extrato, pos_contabil, pares['diff_dias'].to_numpy(), estrategia_atribuicao
+        )
+        return self._montar_matches_entidades(extrato_df, contabil_df, pos_extrato[escolhidos],
+                                              pos_contabil[escolhidos], pontuacoes)
+    
+    def _escolher_entidades(self, features_extrato: 'SemanticFeatureMatrix', features_contabil: 'SemanticFeatureMatrix',
+                            pos_extrato: np.ndarray, pos_contabil: np.ndarray, diff_dias: np.ndarray,
+                            estrategia_atribuicao: str = 'otima') -> Tuple[np.ndarray, np.ndarray]:
+        """Índices dos pares escolhidos e, de cada um, (confiança, compatibilidade de entidades)"""
+        entidades_extrato = features_extrato.entidades[pos_extrato]
+        entidades_contabil = features_contabil.entidades[pos_contabil]
+        comuns = ((entidades_extrato >= 0) & (entidades_extrato == entidades_contabil)).sum(axis=1)
+        # Só pares que compartilham alguma entidade
+        candidatos = np.flatnonzero(comuns > 0)
+        if len(candidatos) == 0:
+            return candidatos, np.zeros((0, 2))
+        comuns = comuns[candidatos]
+        entidades_extrato, entidades_contabil = entidades_extrato[candidatos], entidades_contabil[candidatos]
         
-        for id_extrato, entidades_ext in entidades_extrato.items():
-            extrato_row = extrato_df[extrato_df['id'] == id_extrato].iloc[0]
-            
-            for id_contabil, entidades_cont in entidades_contabil.items():
-                contabil_row = contabil_df[contabil_df['id'] == id_contabil].iloc[0]
-                
-                compatibilidade = self._calcular_compatibilidade_entidades(entidades_ext, entidades_cont)
-                
-                if compatibilidade >= 75:
-                    valor_extrato = abs(extrato_row.get('valor_original', extrato_row.get('valor', 0)))
-                    valor_contabil = abs(contabil_row.get('valor_original', contabil_row.get('valor', 0)))
-                    data_extrato = extrato_row.get('data')
-                    data_contabil = contabil_row.get('data')
-                    
-                    if self._verificar_tolerancias_basicas(valor_extrato, valor_contabil, data_extrato, data_contabil, tolerancia_valor, tolerancia_dias):
-                        confianca_final = (compatibilidade + 
-                                         (100 - (abs(valor_extrato - valor_contabil) / valor_extrato * 100)) + 
-                                         (100 - min(abs((data_extrato - data_contabil).days), 10) * 10)) / 3
-                        
-                        if confianca_final >= 70:
-                            matches.append({
-                                'tipo_match': '1:1', 'camada': 'ia_entidades',
-                                'ids_extrato': [id_extrato], 'ids_contabil': [id_contabil],
-                                'valor_total': valor_extrato, 'confianca': confianca_final,
-                                'explicacao': f"Match por entidades ({compatibilidade:.1f}%)",
-                                'chave_match': f"IA_ENT_{id_extrato}_{id_contabil}"
-                            })
+        centavos_extrato = features_extrato.centavos[pos_extrato[candidatos]]
+        centavos_contabil = features_contabil.centavos[pos_contabil[candidatos]]
+        # Compatibilidade: entidades iguais / entidades presentes em algum dos lados
+        presentes = ((entidades_extrato >= 0) | (entidades_contabil >= 0)).sum(axis=1)
+        compatibilidades = comuns / presentes * 100
+        confiancas = (compatibilidades +
+                      (100 - np.abs(centavos_extrato - centavos_contabil) / np.maximum(centavos_extrato, 1) * 100) +
+                      (100 - np.minimum(diff_dias[candidatos], 10) * 10)) / 3
+        
+        validos = np.flatnonzero((compatibilidades >= 75) & (confiancas >= 70))
+        escolhidos = validos[AssignmentSolver(estrategia_atribuicao).resolver(
+            pos_extrato[candidatos][validos], pos_contabil[candidatos][validos], confiancas[validos]
+        )]
+        return candidatos[escolhidos], np.column_stack([confiancas[escolhidos], compatibilidades[escolhidos]])
+    
+    def _montar_matches_entidades(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                                  pos_extrato: np.ndarray, pos_contabil: np.ndarray, pontuacoes: np.ndarray) -> List[Dict]:
+        """Matches 1:1 da estratégia de entidades; pontuacoes traz (confiança, compatibilidade) de cada par"""
+        matches = []
+        centavos_extrato = centavos_absolutos(extrato_df)
+        ids_extrato = extrato_df['id'].tolist()
+        ids_contabil = contabil_df['id'].tolist()
+        for pe, pc, (confianca, compatibilidade) in zip(pos_extrato.tolist(), pos_contabil.tolist(), pontuacoes.tolist()):
+            id_extrato, id_contabil = ids_extrato[pe], ids_contabil[pc]
+            matches.append({
+                'tipo_match': '1:1', 'camada': 'ia_entidades',
+                'ids_extrato': [id_extrato], 'ids_contabil': [id_contabil],
+                'valor_total': centavos_para_valor(int(centavos_extrato[pe])), 'confianca': float(confianca),
+                'explicacao': f"Match por entidades ({compatibilidade:.1f}%)",
+                'chave_match': f"IA_ENT_{id_extrato}_{id_contabil}"
+            })
         
         return matches
     
-    def _extrair_features_semanticas(self, descricao: str, valor: float) -> Dict[str, Any]:
-        """Extrai features semânticas da descrição"""
-        desc_lower = descricao.lower()
-        return {
-            'palavras_chave': self._extrair_palavras_chave(desc_lower),
-            'tipo_transacao': self._identificar_tipo_transacao(desc_lower),
-            'metodo_pagamento': self._identificar_metodo_pagamento(desc_lower),
-            'entidades': self._extrair_entidades(desc_lower),
-            'valor_categoria': self._categorizar_valor(valor)
-        }
+    def _features_descricao(self, descricao: str) -> Tuple:
+        """Features textuais de uma descrição, memorizadas em semantic_cache"""
+        features = self.semantic_cache.get(descricao)
+        if features is None:
+            desc_lower = descricao.lower()
+            entidades = self._extrair_entidades(desc_lower)
+            features = (
+                self._extrair_palavras_chave(desc_lower),
+                self._identificar_tipo_transacao(desc_lower),
+                self._identificar_metodo_pagamento(desc_lower),
+                tuple(entidades.get(campo, '') for campo in CAMPOS_ENTIDADE)
+            )
+            self.semantic_cache[descricao] = features
+        return features
     
-    def _calcular_similaridade_semantica_avancada(self, features1: Dict, features2: Dict,
-                                                desc1: str, desc2: str,
-                                                valor1: float, valor2: float,
-                                                data1, data2) -> float:
-        """Calcula similaridade semântica avançada"""
-        sim_palavras = self._calcular_similaridade_palavras_chave(features1['palavras_chave'], features2['palavras_chave'])
-        sim_tipo = 100 if features1['tipo_transacao'] == features2['tipo_transacao'] else 0
-        sim_metodo = 100 if features1['metodo_pagamento'] == features2['metodo_pagamento'] else 0
-        sim_entidades = self._calcular_similaridade_entidades(features1['entidades'], features2['entidades'])
+    def _codigo(self, campo: str, valor: str) -> int:
+        """Código inteiro estável (por instância) de um valor categórico"""
+        return self._codigos.setdefault((campo, valor), len(self._codigos))
+    
+    def _montar_matriz_semantica(self, df: pd.DataFrame) -> 'SemanticFeatureMatrix':
+        """Features semânticas de cada linha em arrays colunares (uma extração por descrição distinta)"""
+        indptr, tokens, n_palavras, tipos, metodos, entidades = [0], [], [], [], [], []
+        for descricao in descricoes_posicionais(df):
+            palavras, tipo, metodo, entidades_linha = self._features_descricao(descricao)
+            ids_palavras = sorted({self._codigo('palavra', p) for p in palavras})
+            tokens.extend(ids_palavras)
+            indptr.append(len(tokens))
+            n_palavras.append(len(palavras))
+            tipos.append(self._codigo('tipo', tipo))
+            metodos.append(self._codigo('metodo', metodo))
+            entidades.append([self._codigo(campo, v) if v else -1 for campo, v in zip(CAMPOS_ENTIDADE, entidades_linha)])
+        
+        centavos = centavos_absolutos(df)
+        return SemanticFeatureMatrix(
+            indptr=np.array(indptr, dtype=np.int64), tokens=np.array(tokens, dtype=np.int64),
+            n_palavras=np.array(n_palavras, dtype=np.int64),
+            tipo=np.array(tipos, dtype=np.int64), metodo=np.array(metodos, dtype=np.int64),
+            entidades=np.array(entidades, dtype=np.int64).reshape(len(df), len(CAMPOS_ENTIDADE)),
+            centavos=centavos,
+            # Faixas de _categorizar_valor (100, 1.000 e 10.000 reais) em centavos
+            categoria_valor=np.searchsorted([10_000, 100_000, 1_000_000], centavos, side='right')
+        )
+    
+    def _calcular_similaridade_semantica_pares(self, f1: 'SemanticFeatureMatrix', f2: 'SemanticFeatureMatrix',
+                                               pos1: np.ndarray, pos2: np.ndarray, diff_dias: np.ndarray) -> np.ndarray:
+        """Similaridade semântica avançada calculada de uma vez para todos os pares"""
+        if len(pos1) == 0:
+            return np.zeros(0)
+        sim_palavras = self._similaridade_palavras_pares(f1, f2, pos1, pos2)
+        sim_tipo = np.where(f1.tipo[pos1] == f2.tipo[pos2], 100, 0)
+        sim_metodo = np.where(f1.metodo[pos1] == f2.metodo[pos2], 100, 0)
         
-        diff_valor_percent = abs(valor1 - valor2) / max(valor1, valor2) * 100
-        sim_valor = max(0, 100 - diff_valor_percent)
+        entidades1, entidades2 = f1.entidades[pos1], f2.entidades[pos2]
+        n1, n2 = (entidades1 >= 0).sum(axis=1), (entidades2 >= 0).sum(axis=1)
+        comuns = ((entidades1 >= 0) & (entidades1 == entidades2)).sum(axis=1)
+        sim_entidades = np.where(np.minimum(n1, n2) > 0, comuns / np.maximum(np.maximum(n1, n2), 1) * 100, 0)
         
-        if hasattr(data1, 'strftime') and hasattr(data2, 'strftime'):
-            diff_dias = abs((data1 - data2).days)
-            sim_temporal = max(0, 100 - (diff_dias * 5))
-        else:
-            sim_temporal = 50
+        centavos1, centavos2 = f1.centavos[pos1], f2.centavos[pos2]
+        maior = np.maximum(centavos1, centavos2)
+        sim_valor = np.maximum(0, 100 - np.abs(centavos1 - centavos2) / np.maximum(maior, 1) * 100)
+        sim_temporal = np.maximum(0, 100 - diff_dias * 5)
         
         return (sim_palavras * 0.30 + sim_tipo * 0.20 + sim_metodo * 0.15 +
                 sim_entidades * 0.20 + sim_valor * 0.10 + sim_temporal * 0.05)
     
+    @staticmethod
+    def _similaridade_palavras_pares(f1: 'SemanticFeatureMatrix', f2: 'SemanticFeatureMatrix',
+                                     pos1: np.ndarray, pos2: np.ndarray) -> np.ndarray:
+        """Palavras-chave em comum / maior lista, por par, via busca ordenada de (linha, token)"""
+        par, posicao_token = expandir_janelas(f1.indptr[pos1], f1.indptr[pos1 + 1])
+        vocabulario = int(max(f1.tokens.max(initial=0), f2.tokens.max(initial=0))) + 1
+        linhas2 = np.repeat(np.arange(len(f2.n_palavras)), np.diff(f2.indptr))
+        chaves2 = linhas2 * vocabulario + f2.tokens  # já ordenadas: linhas crescentes, tokens ordenados
+        consultas = pos2[par] * vocabulario + f1.tokens[posicao_token]
+        encontrados = np.searchsorted(chaves2, consultas)
+        em_comum = (encontrados < len(chaves2)) & (chaves2[np.minimum(encontrados, len(chaves2) - 1)] == consultas)
+        comuns = np.bincount(par[em_comum], minlength=len(pos1))
+        
+        n1, n2 = f1.n_palavras[pos1], f2.n_palavras[pos2]
+        return np.where(np.minimum(n1, n2) > 0, comuns / np.maximum(np.maximum(n1, n2), 1) * 100, 0)
+    
     def _extrair_palavras_chave(self, texto: str) -> List[str]:
         """Extrai palavras-chave significativas"""
         stopwords = {'de', 'a', 'o', 'que', 'e', 'do', 'da', 'em', 'um', 'para', 'é', 'com', 'não', 'uma'}
@@ -283,28 +504,6 @@ class AIMatcher:
         elif valor < 10000: return 'grande'
         else: return 'muito_grande'
     
-    def _calcular_similaridade_palavras_chave(self, palavras1: List[str], palavras2: List[str]) -> float:
-        if not palavras1 or not palavras2: return 0.0
-        comuns = set(palavras1) & set(palavras2)
-        return len(comuns) / max(len(palavras1), len(palavras2)) * 100
-    
-    def _calcular_similaridade_entidades(self, entidades1: Dict, entidades2: Dict) -> float:
-        if not entidades1 or not entidades2: return 0.0
-        comuns = 0
-        for key in entidades1:
-            if key in entidades2 and entidades1[key] and entidades2[key]:
-                if entidades1[key] == entidades2[key]: comuns += 1
-        return comuns / max(len(entidades1), len(entidades2)) * 100
-    
-    def _verificar_tolerancias_basicas(self, valor1: float, valor2: float, data1, data2, 
-                                     tolerancia_valor: float, tolerancia_dias: int) -> bool:
-        """Verifica tolerâncias básicas de valor e data"""
-        diff_valor = abs(valor1 - valor2)
-        if diff_valor > tolerancia_valor: return False
-        if hasattr(data1, 'strftime') and hasattr(data2, 'strftime'):
-            if abs((data1 - data2).days) > tolerancia_dias: return False
-        return True
-
     def _identificar_padroes_temporais_df(self, df: pd.DataFrame) -> Dict[str, List]:
         """Identifica padrões temporais em um DataFrame"""
         padroes = {}
@@ -324,60 +523,38 @@ class AIMatcher:
         palavras_chave = '_'.join(self._extrair_palavras_chave(descricao.lower())[:3])
         return f"{tipo}_{categoria_valor}_{palavras_chave}"
 
-    def _encontrar_transacoes_proximas(self, df: pd.DataFrame, data_ref, tolerancia_dias: int) -> List[Dict]:
-        """Encontra transações próximas à data de referência"""
-        transacoes = []
-        for _, row in df.iterrows():
-            data_trans = row.get('data')
-            if hasattr(data_trans, 'strftime') and hasattr(data_ref, 'strftime'):
-                if abs((data_trans - data_ref).days) <= tolerancia_dias:
-                    transacoes.append({
-                        'id': row['id'], 'data': data_trans,
-                        'valor': abs(row.get('valor_original', row.get('valor', 0))),
-                        'descricao': row.get('descricao', '')
-                    })
-        return transacoes
 
-    def _encontrar_combinacoes_soma(self, transacoes: List[Dict], valor_alvo: float, 
-                                    tolerancia: float = 0.01) -> List[List[Dict]]:
-        """Encontra combinações de transações que somam o valor alvo"""
-        combinacoes_validas = []
-        valor_min = valor_alvo * (1 - tolerancia)
-        valor_max = valor_alvo * (1 + tolerancia)
-        
-        for r in range(2, min(6, len(transacoes) + 1)):
-            for combinacao in combinations(transacoes, r):
-                soma = sum(item['valor'] for item in combinacao)
-                if valor_min <= soma <= valor_max:
-                    combinacoes_validas.append(list(combinacao))
-        return combinacoes_validas
+def _pontuar_semantico_lote(colunas: Dict[str, np.ndarray], indices_pares: np.ndarray,
+                            estrategia_atribuicao: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Estratégia semântica de um lote de componentes (executada nos processos do ComponentParallelMatcher)"""
+    escolhidos, confiancas = AIMatcher()._escolher_semantico(
+        SemanticFeatureMatrix.das_colunas(colunas, 'extrato'), SemanticFeatureMatrix.das_colunas(colunas, 'contabil'),
+        colunas['pos_extrato'][indices_pares], colunas['pos_contabil'][indices_pares],
+        colunas['diff_dias'][indices_pares], estrategia_atribuicao
+    )
+    return indices_pares[escolhidos], confiancas
 
-    def _extrair_entidades_lote(self, df: pd.DataFrame) -> Dict[str, Dict]:
-        """Extrai entidades de um lote de dados"""
-        entidades_por_id = {}
-        for _, row in df.iterrows():
-            descricao = row.get('descricao', '')
-            entidades_por_id[row['id']] = self._extrair_entidades(descricao.lower())
-        return entidades_por_id
 
-    def _calcular_compatibilidade_entidades(self, entidades1: Dict, entidades2: Dict) -> float:
-        """Calcula compatibilidade entre conjuntos de entidades"""
-        if not entidades1 or not entidades2: return 0.0
-        compatibilidade, total_entidades = 0, 0
-        for key in set(entidades1.keys()) | set(entidades2.keys()):
-            if key in entidades1 and key in entidades2:
-                if entidades1[key] and entidades2[key]:
-                    if entidades1[key] == entidades2[key]: compatibilidade += 1
-                    total_entidades += 1
-            elif key in entidades1 and entidades1[key]: total_entidades += 1
-            elif key in entidades2 and entidades2[key]: total_entidades += 1
-        return (compatibilidade / total_entidades * 100) if total_entidades > 0 else 0.0
+def _pontuar_entidades_lote(colunas: Dict[str, np.ndarray], indices_pares: np.ndarray,
+                            estrategia_atribuicao: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Estratégia de entidades de um lote de componentes (executada nos processos do ComponentParallelMatcher)"""
+    escolhidos, pontuacoes = AIMatcher()._escolher_entidades(
+        SemanticFeatureMatrix.das_colunas(colunas, 'extrato'), SemanticFeatureMatrix.das_colunas(colunas, 'contabil'),
+        colunas['pos_extrato'][indices_pares], colunas['pos_contabil'][indices_pares],
+        colunas['diff_dias'][indices_pares], estrategia_atribuicao
+    )
+    return indices_pares[escolhidos], pontuacoes
+
 
 # Função de interface
 def matching_ia_avancado(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
                         nao_matchados_extrato: pd.DataFrame, nao_matchados_contabil: pd.DataFrame,
-                        tolerancia_dias: int = 3, tolerancia_valor: float = 0.05) -> Dict:
+                        tolerancia_dias: int = TOLERANCIA_DIAS_IA, tolerancia_valor: float = 0.05,
+                        estrategia_atribuicao: str = 'otima', blocagem_lsh: bool = False,
+                        pares_candidatos: CandidatePairs = None, ledger: MatchLedger = None,
+                        processos: int = 1, prazo_segundos: float = None) -> Dict:
     return AIMatcher().matching_avancado_com_ia(
         extrato_df, contabil_df, nao_matchados_extrato, nao_matchados_contabil,
-        tolerancia_dias, tolerancia_valor
+        tolerancia_dias, tolerancia_valor, estrategia_atribuicao, blocagem_lsh, pares_candidatos, ledger, processos,
+        prazo_segundos
     )
\ No newline at end of file
@@ -0,0 +1,99 @@
+# modules/assignment_solver.py
+import numpy as np
+from typing import Tuple
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    SCIPY_DISPONIVEL = True
+except ImportError:
+    SCIPY_DISPONIVEL = False
+
+ESTRATEGIAS_ATRIBUICAO = ('otima', 'gulosa')
+
+
+class AssignmentSolver:
+    """Atribuição 1:1 sobre o grafo esparso de pares candidatos
+
+    'otima' maximiza a soma das confianças resolvendo cada componente conexo
+    separadamente; 'gulosa' aceita os pares na ordem recebida (primeiro que couber).
+    """
+
+    def __init__(self, estrategia: str = 'otima', limite_celulas_componente: int = 4_000_000):
+        if estrategia not in ESTRATEGIAS_ATRIBUICAO:
+            raise ValueError(f"Estratégia de atribuição inválida: {estrategia}")
+        self.estrategia = estrategia
+        self.limite_celulas_componente = limite_celulas_componente
+
+    def resolver(self, pos_extrato: np.ndarray, pos_contabil: np.ndarray, pesos: np.ndarray) -> np.ndarray:
+        """Retorna os índices (na ordem de entrada) dos pares escolhidos"""
+        pos_extrato = np.asarray(pos_extrato, dtype=np.int64)
+        pos_contabil = np.asarray(pos_contabil, dtype=np.int64)
+        pesos = np.asarray(pesos, dtype=float)
+        if len(pesos) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        if self.estrategia == 'gulosa' or not SCIPY_DISPONIVEL:
+            return self._guloso(pos_extrato, pos_contabil, np.arange(len(pesos)))
+
+        linhas, n_linhas = self._compactar(pos_extrato)
+        colunas, n_colunas = self._compactar(pos_contabil)
+        componentes = self._componentes(linhas, colunas, n_linhas, n_colunas)
+
+        # Componentes com uma única aresta são resolvidos sem montar matriz
+        arestas_por_componente = np.bincount(componentes)
+        triviais = arestas_por_componente[componentes] == 1
+        escolhidos = [np.flatnonzero(triviais)]
+
+        restantes = np.flatnonzero(~triviais)
+        restantes = restantes[np.argsort(componentes[restantes], kind='mergesort')]
+        cortes = np.flatnonzero(np.diff(componentes[restantes])) + 1
+        for arestas in np.split(restantes, cortes):
+            if len(arestas):
+                escolhidos.append(self._resolver_componente(linhas[arestas], colunas[arestas], pesos[arestas], arestas))
+
+        return np.sort(np.concatenate(escolhidos))
+
+    def _resolver_componente(self, linhas: np.ndarray, colunas: np.ndarray,
+                             pesos: np.ndarray, arestas: np.ndarray) -> np.ndarray:
+        linhas_locais, n_linhas = self._compactar(linhas)
+        colunas_locais, n_colunas = self._compactar(colunas)
+
+        if n_linhas * n_colunas > self.limite_celulas_componente:
+            # Componente grande demais para matriz densa: guloso por maior confiança
+            ordem = np.argsort(-pesos, kind='mergesort')
+            return self._guloso(linhas[ordem], colunas[ordem], arestas[ordem])
+
+        # Ausência de aresta vale 0; arestas reais (pares únicos) têm peso estritamente positivo
+        matriz = np.zeros((n_linhas, n_colunas))
+        aresta_da_celula = np.full((n_linhas, n_colunas), -1, dtype=np.int64)
+        matriz[linhas_locais, colunas_locais] = np.maximum(pesos, 0) + 1e-9
+        aresta_da_celula[linhas_locais, colunas_locais] = arestas
+
+        i, j = linear_sum_assignment(matriz, maximize=True)
+        selecionadas = aresta_da_celula[i, j]
+        return selecionadas[selecionadas >= 0]
+
+    @staticmethod
+    def _guloso(pos_extrato: np.ndarray, pos_contabil: np.ndarray, arestas: np.ndarray) -> np.ndarray:
+        usados_extrato, usados_contabil, escolhidos = set(), set(), []
+        for e, c, k in zip(pos_extrato.tolist(), pos_contabil.tolist(), arestas.tolist()):
+            if e in usados_extrato or c in usados_contabil: continue
+            usados_extrato.add(e)
+            usados_contabil.add(c)
+            escolhidos.append(k)
+        return np.array(escolhidos, dtype=np.int64)
+
+    @staticmethod
+    def _compactar(posicoes: np.ndarray) -> Tuple[np.ndarray, int]:
+        unicos, compactas = np.unique(posicoes, return_inverse=True)
+        return compactas.ravel(), len(unicos)
+
+    @staticmethod
+    def _componentes(linhas: np.ndarray, colunas: np.ndarray, n_linhas: int, n_colunas: int) -> np.ndarray:
+        """Rótulo do componente conexo de cada aresta no grafo bipartido"""
+        n = n_linhas + n_colunas
+        grafo = coo_matrix((np.ones(len(linhas)), (linhas, colunas + n_linhas)), shape=(n, n))
+        _, rotulos = connected_components(grafo, directed=False)
+        return rotulos[linhas]
@@ -21,6 +21,12 @@ class ConfigManager:
                 "permite_n1": True,
                 "considera_taxas": True
             },
+            # Taxas por meio de pagamento: regex da descrição no extrato, MDR (%), tarifa fixa (R$) e janela de dias
+            "taxas": {
+                "cartao_credito": {"descricao": r"CIELO|REDECARD|\bREDE\b|STONE|GETNET|PAGSEGURO|CART[AÃ]O\s+CR[EÉ]D", "percentual": 3.0, "fixa": 0.0, "janela_dias": 2},
+                "cartao_debito": {"descricao": r"CART[AÃ]O\s+D[EÉ]B|MAESTRO|ELECTRON", "percentual": 1.5, "fixa": 0.0, "janela_dias": 2},
+                "boleto": {"descricao": r"BOLETO|LIQUIDA[CÇ][AÃ]O\s+COBRAN|COBRAN[CÇ]A", "percentual": 0.0, "fixa": 3.5, "janela_dias": 3}
+            },
             "processamento": {
                 "processar_pdf_ocr": False,
                 "tentar_multiplos_encodings": True,
@@ -93,6 +99,10 @@ class ConfigManager:
         """Obtém configurações de matching"""
         return self.get_config("matching")
     
+    def get_taxas_config(self) -> Dict[str, Dict[str, Any]]:
+        """Obtém a tabela de taxas por meio de pagamento (padrão se o arquivo não tiver a seção)"""
+        return self.get_config("taxas") or self.default_config["taxas"]
+    
     def get_report_config(self) -> Dict[str, Any]:
         """Obtém configurações de relatório"""
         return self.get_config("relatorio")
@@ -3,14 +3,63 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import re
-from difflib import SequenceMatcher
+import hashlib
 import logging
 from typing import Dict, List, Tuple, Any
+from modules.matching_engine import HashJoinEngine, SortMergeMatcher, FeeAwareMatcher, CandidatePairs, GroupSumMatcher, descricoes_posicionais, dia_ordinal, pares_na_janela
+from modules.assignment_solver import AssignmentSolver
+from modules.monetario import centavos_absolutos, centavos_para_valor, garantir_coluna_centavos
+from modules.text_similarity import TextSimilarity, similaridade_sequencematcher
+from modules.lsh_blocking import blocagem_por_lsh
+from modules.match_ledger import MatchLedger
+from modules.parallel_matching import ComponentParallelMatcher, colunas_de_textos, colunas_dos_pares, textos_das_colunas
+from modules.identificadores import codigo_barras_boleto, documentos_validos
 
 # Configurar logging apenas para erros
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
+# Padrões de cada identificador em ordem de prioridade (o grupo 1 é o valor extraído), aplicados ao texto em maiúsculas.
+# CPF/CNPJ fica de fora: precisa de todas as ocorrências para validar os dígitos verificadores (documentos_validos)
+PADROES_IDENTIFICADORES = {
+    'txid_pix': [r'([A-Z0-9]{8}-[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{12})',
+                 r'TXID[:\s]*([A-Z0-9]+)', r'ID[:\s]*([A-Z0-9]{32})'],
+    # End-to-end PIX: E + ISPB (8) + data/hora AAAAMMDDHHMM (12) + sequencial (11) = 32 caracteres
+    'e2e_pix': [r'(?<![A-Z0-9])(E\d{20}[A-Z0-9]{11})(?![A-Z0-9])'],
+    'nsu': [r'NSU[:\s]*(\d{6,})', r'NS\s*(\d{6,})', r'(\d{6,})\s*NSU'],
+    'nosso_numero': [r'NOSSO\s*N[ÚU]MERO[:\s]*(\d+)', r'NOSSO\s*NRO[:\s]*(\d+)', r'NN[:\s]*(\d+)'],
+    # Linha digitável de arrecadação (48), de boleto bancário (47) ou código de barras (44), a que aparecer primeiro
+    'codigo_barras': [r'(?<!\d)(8\d{10}[-\s]?\d\s?\d{11}[-\s]?\d\s?\d{11}[-\s]?\d\s?\d{11}[-\s]?\d'
+                      r'|\d{5}\.?\d{5}\s?\d{5}\.?\d{6}\s?\d{5}\.?\d{6}\s?\d\s?\d{14}|\d{44})(?!\d)']
+}
+
+# Normalização aplicada ao trecho extraído (vazio descarta o identificador)
+NORMALIZACAO_IDENTIFICADORES = {
+    'codigo_barras': codigo_barras_boleto
+}
+
+
+def _compilar_padroes_identificadores(padroes: Dict[str, List[str]]) -> 're.Pattern':
+    """Uma regex para todos os identificadores: um lookahead opcional por tipo, ancorado no início
+
+    Dentro de cada lookahead as alternativas '.*?padrão' são tentadas em ordem, então vale o primeiro
+    padrão que ocorre em qualquer ponto do texto (a mesma prioridade das buscas padrão a padrão).
+    O grupo de cada alternativa recebe o nome '<tipo>__<ordem>'.
+    """
+    tipos = []
+    for tipo, alternativas in padroes.items():
+        nomeadas = '|'.join('.*?' + re.sub(r'\((?!\?)', f'(?P<{tipo}__{ordem}>', padrao, count=1)
+                            for ordem, padrao in enumerate(alternativas))
+        tipos.append(f'(?:(?=(?:{nomeadas})))?')
+    return re.compile('(?s)^' + ''.join(tipos))
+
+
+REGEX_IDENTIFICADORES = _compilar_padroes_identificadores(PADROES_IDENTIFICADORES)
+
+# Colunas de identificadores já extraídas, por assinatura da coluna de descrições (reaproveitadas entre execuções)
+_cache_identificadores: Dict[str, pd.DataFrame] = {}
+LIMITE_CACHE_IDENTIFICADORES = 16
+
 # ADICIONAR IMPORT DO NOVO MODULO
 try:
     from modules.ai_matcher import matching_ia_avancado
@@ -24,51 +73,68 @@ class DataAnalyzer:
         self.matches_identificados = []
         self.excecoes = []
         self.audit_trail = []
+        self.join_engine = HashJoinEngine(camada='exata')
+        self.sort_merge = SortMergeMatcher(camada='exata')
+        self.agrupador = GroupSumMatcher()
+        self.pares_candidatos_heuristica = 0
+        self.estatisticas_lsh = {}
+        self.janela_documento_dias = 3
         
     def _garantir_coluna_id(self, df: pd.DataFrame, nome_df: str = "DataFrame") -> pd.DataFrame:
-        """Garante que o DataFrame tenha coluna 'id'"""
+        """Garante que o DataFrame tenha coluna 'id' e o valor em centavos inteiros"""
         df = df.copy()
         if 'id' not in df.columns:
             df['id'] = range(1, len(df) + 1)
-        return df
+        return garantir_coluna_centavos(df)
+
+    def matching_exato(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                       ledger: MatchLedger = None, tabela_taxas: Dict[str, Dict] = None,
+                       identificadores: bool = True, por_janela: bool = True) -> Dict:
+        """Camada 1: Matching exato usando identificadores únicos
 
-    def matching_exato(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> Dict:
-        """Camada 1: Matching exato usando identificadores únicos"""
+        identificadores liga as etapas 1-6 (sem limite de datas) e por_janela as etapas 7-9
+        (documento, valor e data, taxas), que só pareiam linhas próximas no tempo.
+        """
         extrato_df = self._garantir_coluna_id(extrato_df, "extrato_df")
         contabil_df = self._garantir_coluna_id(contabil_df, "contabil_df")
+        ledger = ledger or MatchLedger(extrato_df, contabil_df)
         
         matches = []
-        extrato_match_ids = set()
-        contabil_match_ids = set()
         
         extrato_df = self._normalizar_identificadores(extrato_df)
         contabil_df = self._normalizar_identificadores(contabil_df)
         
-        # 1. Matching por TXID PIX
-        matches_txid = self._match_por_txid(extrato_df, contabil_df)
-        matches.extend(matches_txid)
-        
-        # 2. Matching por NSU (cartões)
-        matches_nsu = self._match_por_nsu(extrato_df, contabil_df)
-        matches.extend(matches_nsu)
-        
-        # 3. Matching por Nosso Número (boletos)
-        matches_nosso_numero = self._match_por_nosso_numero(extrato_df, contabil_df)
-        matches.extend(matches_nosso_numero)
-        
-        # 4. Matching por valor e data exata (fallback)
-        matches_valor_exato = self._match_valor_data_exata(extrato_df, contabil_df, 
-                                                          extrato_match_ids, contabil_match_ids)
-        matches.extend(matches_valor_exato)
-        
-        # Atualizar IDs já matchados
-        for match in matches:
-            extrato_match_ids.update(match['ids_extrato'])
-            contabil_match_ids.update(match['ids_contabil'])
+        # 1-6. Matching por identificadores (FITID do OFX, TXID e end-to-end PIX, NSU de cartões,
+        # Nosso Número e código de barras de boletos)
+        etapas_identificadores = (self._match_por_fitid, self._match_por_txid, self._match_por_e2e_pix, self._match_por_nsu,
+                                  self._match_por_nosso_numero, self._match_por_codigo_barras) if identificadores else ()
+        for match_por_identificador in etapas_identificadores:
+            matches.extend(ledger.registrar(match_por_identificador(
+                ledger.nao_conciliados(extrato_df, 'extrato'),
+                ledger.nao_conciliados(contabil_df, 'contabil')
+            )))
+        
+        # 7. Matching por CPF/CNPJ com mesmo valor e datas próximas
+        if por_janela:
+            matches.extend(ledger.registrar(self._match_por_documento(
+                ledger.nao_conciliados(extrato_df, 'extrato'),
+                ledger.nao_conciliados(contabil_df, 'contabil')
+            )))
+        
+        # 8. Matching por valor e data exata (fallback)
+        if por_janela:
+            matches.extend(self._match_valor_data_exata(extrato_df, contabil_df, ledger))
+        
+        # 9. Matching por valor líquido de taxas (MDR de cartão, tarifa de boleto), se houver tabela
+        if por_janela and tabela_taxas:
+            matches.extend(ledger.registrar(FeeAwareMatcher(tabela_taxas).parear(
+                ledger.nao_conciliados(extrato_df, 'extrato'),
+                ledger.nao_conciliados(contabil_df, 'contabil')
+            )))
         
         # Identificar não matchados
-        nao_matchados_extrato = extrato_df[~extrato_df['id'].isin(extrato_match_ids)]
-        nao_matchados_contabil = contabil_df[~contabil_df['id'].isin(contabil_match_ids)]
+        nao_matchados_extrato = ledger.nao_conciliados(extrato_df, 'extrato')
+        nao_matchados_contabil = ledger.nao_conciliados(contabil_df, 'contabil')
         
         return {
             'matches': matches,
@@ -79,67 +145,78 @@ class DataAnalyzer:
     def matching_heuristico(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
                           nao_matchados_extrato: pd.DataFrame, nao_matchados_contabil: pd.DataFrame,
                           tolerancia_dias: int = 2, tolerancia_valor: float = 0.02,
-                          similaridade_minima: int = 80) -> Dict:
-        """Camada 2: Matching heurístico com tolerâncias"""
+                          similaridade_minima: int = 80, estrategia_atribuicao: str = 'otima',
+                          permite_1n: bool = True, permite_n1: bool = True,
+                          backend_similaridade: str = 'sequencematcher', blocagem_lsh: bool = False,
+                          pares_candidatos: CandidatePairs = None, ledger: MatchLedger = None,
+                          tolerancia_relativa: float = 0.0, processos: int = 1) -> Dict:
+        """Camada 2: Matching heurístico com tolerâncias
+
+        tolerancia_relativa (fração do valor de cada linha) dá a cada transação a sua tolerância de
+        valor; tolerancia_valor (R$) vira então o piso absoluto. Com processos != 1 o 1:1 é
+        resolvido por componentes conexos do grafo de pares em vários processos (None = todos os núcleos).
+        """
         matches = []
-        extrato_match_ids = set()
-        contabil_match_ids = set()
+        nao_matchados_extrato = garantir_coluna_centavos(nao_matchados_extrato)
+        nao_matchados_contabil = garantir_coluna_centavos(nao_matchados_contabil)
+        ledger = ledger or MatchLedger(nao_matchados_extrato, nao_matchados_contabil)
         
-        # 1. Matching 1:1 com tolerâncias
-        matches_1_1 = self._match_heuristico_1_1(
-            nao_matchados_extrato, nao_matchados_contabil,
-            tolerancia_dias, tolerancia_valor, similaridade_minima
-        )
-        matches.extend(matches_1_1)
+        def registrar(novos_matches):
+            matches.extend(ledger.registrar(novos_matches))
         
-        # 2. Matching 1:N (parcelamentos)
-        matches_1_n = self._match_1_n(
+        # 1. Matching 1:1 com tolerâncias
+        registrar(self._match_heuristico_1_1(
             nao_matchados_extrato, nao_matchados_contabil,
-            tolerancia_dias, tolerancia_valor
-        )
-        matches.extend(matches_1_n)
+            tolerancia_dias, tolerancia_valor, similaridade_minima, estrategia_atribuicao, backend_similaridade,
+            blocagem_lsh, pares_candidatos, tolerancia_relativa, processos
+        ))
+        
+        # 2. Matching 1:N (parcelamentos) sobre o que sobrou do 1:1
+        if permite_1n:
+            registrar(self._match_1_n(
+                ledger.nao_conciliados(nao_matchados_extrato, 'extrato'),
+                ledger.nao_conciliados(nao_matchados_contabil, 'contabil'),
+                tolerancia_dias, tolerancia_valor, tolerancia_relativa
+            ))
         
         # 3. Matching N:1 (consolidações)
-        matches_n_1 = self._match_n_1(
-            nao_matchados_extrato, nao_matchados_contabil,
-            tolerancia_dias, tolerancia_valor
-        )
-        matches.extend(matches_n_1)
-        
-        # Atualizar IDs matchados
-        for match in matches:
-            extrato_match_ids.update(match['ids_extrato'])
-            contabil_match_ids.update(match['ids_contabil'])
+        if permite_n1:
+            registrar(self._match_n_1(
+                ledger.nao_conciliados(nao_matchados_extrato, 'extrato'),
+                ledger.nao_conciliados(nao_matchados_contabil, 'contabil'),
+                tolerancia_dias, tolerancia_valor, tolerancia_relativa
+            ))
         
         # Identificar não matchados restantes
-        nao_matchados_extrato_final = nao_matchados_extrato[~nao_matchados_extrato['id'].isin(extrato_match_ids)]
-        nao_matchados_contabil_final = nao_matchados_contabil[~nao_matchados_contabil['id'].isin(contabil_match_ids)]
+        nao_matchados_extrato_final = ledger.nao_conciliados(nao_matchados_extrato, 'extrato')
+        nao_matchados_contabil_final = ledger.nao_conciliados(nao_matchados_contabil, 'contabil')
         
         return {
             'matches': matches,
             'nao_matchados_extrato': nao_matchados_extrato_final,
-            'nao_matchados_contabil': nao_matchados_contabil_final
+            'nao_matchados_contabil': nao_matchados_contabil_final,
+            'pares_candidatos': self.pares_candidatos_heuristica,
+            'blocagem_lsh': self.estatisticas_lsh
         }
     
     def matching_ia(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
-                   nao_matchados_extrato: pd.DataFrame, nao_matchados_contabil: pd.DataFrame) -> Dict:
-        """Camada 3: Matching com IA para casos complexos"""
+                   nao_matchados_extrato: pd.DataFrame, nao_matchados_contabil: pd.DataFrame,
+                   estrategia_atribuicao: str = 'otima', blocagem_lsh: bool = False,
+                   pares_candidatos: CandidatePairs = None, ledger: MatchLedger = None,
+                   processos: int = 1, prazo_segundos: float = None) -> Dict:
+        """Camada 3: Matching com IA para casos complexos (com prazo, maiores valores primeiro)"""
+        ledger = ledger or MatchLedger(nao_matchados_extrato, nao_matchados_contabil)
         resultados_ia = matching_ia_avancado(
-            extrato_df, contabil_df, nao_matchados_extrato, nao_matchados_contabil
+            extrato_df, contabil_df, nao_matchados_extrato, nao_matchados_contabil,
+            estrategia_atribuicao=estrategia_atribuicao, blocagem_lsh=blocagem_lsh,
+            pares_candidatos=pares_candidatos, ledger=ledger, processos=processos, prazo_segundos=prazo_segundos
         )
         
         matches = resultados_ia['matches']
         
         # Identificar exceções nos não matchados restantes
-        extrato_match_ids = set()
-        contabil_match_ids = set()
-        
-        for match in matches:
-            extrato_match_ids.update(match['ids_extrato'])
-            contabil_match_ids.update(match['ids_contabil'])
-        
-        nao_matchados_extrato_final = nao_matchados_extrato[~nao_matchados_extrato['id'].isin(extrato_match_ids)]
-        nao_matchados_contabil_final = nao_matchados_contabil[~nao_matchados_contabil['id'].isin(contabil_match_ids)]
+        nao_matchados_extrato_final = ledger.nao_conciliados(nao_matchados_extrato, 'extrato')
+        nao_matchados_contabil_final = ledger.nao_conciliados(nao_matchados_contabil, 'contabil')
         
         excecoes = self._identificar_excecoes_melhorado(
             nao_matchados_extrato_final, nao_matchados_contabil_final
@@ -196,231 +273,357 @@ class DataAnalyzer:
         """Normaliza identificadores para matching"""
         df = df.copy()
         if 'descricao' in df.columns:
-            df['txid_pix'] = df['descricao'].apply(self._extrair_txid_pix)
-            df['nsu'] = df['descricao'].apply(self._extrair_nsu)
-            df['nosso_numero'] = df['descricao'].apply(self._extrair_nosso_numero)
-            df['cpf_cnpj'] = df['descricao'].apply(self._extrair_cpf_cnpj)
+            identificadores = self._extrair_identificadores(df['descricao'])
+            for coluna in identificadores.columns:
+                df[coluna] = identificadores[coluna].to_numpy(copy=True)
         return df
     
+    def _extrair_identificadores(self, descricoes: pd.Series) -> pd.DataFrame:
+        """Todos os identificadores de uma vez, com uma regex compilada por descrição distinta"""
+        textos = descricoes.where(descricoes.map(lambda texto: isinstance(texto, str)), '').astype(str)
+        assinatura = hashlib.sha1(pd.util.hash_pandas_object(textos, index=False).to_numpy().tobytes()).hexdigest()
+        identificadores = _cache_identificadores.get(assinatura)
+        if identificadores is not None:
+            return identificadores
+        
+        codigos, distintos = pd.factorize(textos)
+        extraidos = pd.Series(distintos, dtype=object).str.upper().str.extract(REGEX_IDENTIFICADORES)
+        colunas = {}
+        for tipo in PADROES_IDENTIFICADORES:
+            # Só uma alternativa por tipo casa; as demais ficam NaN
+            grupos = extraidos.filter(regex=f'^{tipo}__')
+            valores = grupos.bfill(axis=1).iloc[:, 0].fillna('')
+            if tipo in NORMALIZACAO_IDENTIFICADORES:
+                valores = valores.map(NORMALIZACAO_IDENTIFICADORES[tipo])
+            colunas[tipo] = valores.to_numpy(dtype=object)[codigos]
+        colunas['cpf_cnpj'] = documentos_validos(distintos).to_numpy(dtype=object)[codigos]
+        identificadores = pd.DataFrame(colunas)
+        
+        if len(_cache_identificadores) >= LIMITE_CACHE_IDENTIFICADORES:
+            _cache_identificadores.pop(next(iter(_cache_identificadores)))
+        _cache_identificadores[assinatura] = identificadores
+        return identificadores
+    
     def _extrair_txid_pix(self, texto: str) -> str:
         """Extrai TXID de transações PIX"""
-        if not isinstance(texto, str): return ""
-        padroes = [
-            r'[A-Z0-9]{8}-[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{12}',
-            r'TXID[:\s]*([A-Z0-9]+)', r'ID[:\s]*([A-Z0-9]{32})'
-        ]
-        for padrao in padroes:
-            match = re.search(padrao, texto.upper())
-            if match: return match.group(0) if padrao.startswith('[A-Z]') else match.group(1)
-        return ""
+        return self._extrair_identificador_texto(texto, 'txid_pix')
     
     def _extrair_nsu(self, texto: str) -> str:
         """Extrai NSU de transações de cartão"""
-        if not isinstance(texto, str): return ""
-        padroes = [r'NSU[:\s]*(\d{6,})', r'NS\s*(\d{6,})', r'(\d{6,})\s*NSU']
-        for padrao in padroes:
-            match = re.search(padrao, texto.upper())
-            if match: return match.group(1)
-        return ""
+        return self._extrair_identificador_texto(texto, 'nsu')
     
     def _extrair_nosso_numero(self, texto: str) -> str:
         """Extrai Nosso Número de boletos"""
-        if not isinstance(texto, str): return ""
-        padroes = [r'NOSSO\s*N[ÚU]MERO[:\s]*(\d+)', r'NOSSO\s*NRO[:\s]*(\d+)', r'NN[:\s]*(\d+)']
-        for padrao in padroes:
-            match = re.search(padrao, texto.upper())
-            if match: return match.group(1)
-        return ""
+        return self._extrair_identificador_texto(texto, 'nosso_numero')
     
     def _extrair_cpf_cnpj(self, texto: str) -> str:
-        """Extrai CPF/CNPJ da descrição"""
+        """Extrai CPF/CNPJ válido da descrição (só dígitos)"""
+        return documentos_validos(pd.Series([texto]))[0]
+    
+    def _extrair_identificador_texto(self, texto: str, tipo: str) -> str:
+        """Um identificador de um único texto (mesma regex da extração em lote)"""
         if not isinstance(texto, str): return ""
-        cpf_match = re.search(r'(\d{3}\.\d{3}\.\d{3}-\d{2})|(\d{11})', texto)
-        if cpf_match: return cpf_match.group(0)
-        cnpj_match = re.search(r'(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})|(\d{14})', texto)
-        if cnpj_match: return cnpj_match.group(0)
-        return ""
+        grupos = REGEX_IDENTIFICADORES.match(texto.upper()).groupdict()
+        valor = next((valor for nome, valor in grupos.items() if nome.startswith(f'{tipo}__') and valor), "")
+        return NORMALIZACAO_IDENTIFICADORES[tipo](valor) if valor and tipo in NORMALIZACAO_IDENTIFICADORES else valor
+    
+    def _match_por_fitid(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
+        """Matching por FITID quando os dois lados vêm de OFX (na mesma conta, se informada nos dois)"""
+        if 'fitid' not in extrato_df.columns or 'fitid' not in contabil_df.columns:
+            return []
+        por_conta = 'conta_bancaria' in extrato_df.columns and 'conta_bancaria' in contabil_df.columns
+        return self.join_engine.juntar_por_chave(self._com_chave_fitid(extrato_df, por_conta),
+                                                 self._com_chave_fitid(contabil_df, por_conta),
+                                                 'chave_fitid', 'FITID', 'FITID')
+    
+    def _com_chave_fitid(self, df: pd.DataFrame, por_conta: bool) -> pd.DataFrame:
+        """FITID normalizado (prefixado pela conta: FITIDs só são únicos dentro de uma conta)"""
+        fitid = df['fitid'].fillna('').astype(str).str.strip()
+        if por_conta:
+            fitid = fitid.where(fitid == '', df['conta_bancaria'].astype(str) + ':' + fitid)
+        return df.assign(chave_fitid=fitid)
     
     def _match_por_txid(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
         """Matching por TXID PIX"""
-        matches = []
-        extrato_com_txid = extrato_df[extrato_df['txid_pix'] != ""]
-        contabil_com_txid = contabil_df[contabil_df['txid_pix'] != ""]
-        
-        for txid in extrato_com_txid['txid_pix'].unique():
-            if txid == "": continue
-            extrato_matches = extrato_com_txid[extrato_com_txid['txid_pix'] == txid]
-            contabil_matches = contabil_com_txid[contabil_com_txid['txid_pix'] == txid]
-            
-            if len(extrato_matches) > 0 and len(contabil_matches) > 0:
-                matches.append({
-                    'tipo_match': '1:1', 'camada': 'exata',
-                    'ids_extrato': extrato_matches['id'].tolist(),
-                    'ids_contabil': contabil_matches['id'].tolist(),
-                    'valor_total': extrato_matches['valor'].sum(),
-                    'confianca': 100,
-                    'explicacao': f"Match exato por TXID PIX: {txid}",
-                    'chave_match': f"TXID_{txid}"
-                })
-        return matches
+        return self.join_engine.juntar_por_chave(extrato_df, contabil_df, 'txid_pix', 'TXID PIX', 'TXID')
+    
+    def _match_por_e2e_pix(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
+        """Matching por identificador end-to-end PIX"""
+        return self.join_engine.juntar_por_chave(extrato_df, contabil_df, 'e2e_pix', 'E2E PIX', 'E2E')
     
     def _match_por_nsu(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
         """Matching por NSU"""
-        matches = []
-        extrato_com_nsu = extrato_df[extrato_df['nsu'] != ""]
-        contabil_com_nsu = contabil_df[contabil_df['nsu'] != ""]
-        
-        for nsu in extrato_com_nsu['nsu'].unique():
-            if nsu == "": continue
-            extrato_matches = extrato_com_nsu[extrato_com_nsu['nsu'] == nsu]
-            contabil_matches = contabil_com_nsu[contabil_com_nsu['nsu'] == nsu]
-            
-            if len(extrato_matches) > 0 and len(contabil_matches) > 0:
-                matches.append({
-                    'tipo_match': '1:1', 'camada': 'exata',
-                    'ids_extrato': extrato_matches['id'].tolist(),
-                    'ids_contabil': contabil_matches['id'].tolist(),
-                    'valor_total': extrato_matches['valor'].sum(),
-                    'confianca': 100,
-                    'explicacao': f"Match exato por NSU: {nsu}",
-                    'chave_match': f"NSU_{nsu}"
-                })
-        return matches
+        return self.join_engine.juntar_por_chave(extrato_df, contabil_df, 'nsu', 'NSU', 'NSU')
     
     def _match_por_nosso_numero(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
         """Matching por Nosso Número"""
-        matches = []
-        extrato_com_nn = extrato_df[extrato_df['nosso_numero'] != ""]
-        contabil_com_nn = contabil_df[contabil_df['nosso_numero'] != ""]
-        
-        for nn in extrato_com_nn['nosso_numero'].unique():
-            if nn == "": continue
-            extrato_matches = extrato_com_nn[extrato_com_nn['nosso_numero'] == nn]
-            contabil_matches = contabil_com_nn[contabil_com_nn['nosso_numero'] == nn]
-            
-            if len(extrato_matches) > 0 and len(contabil_matches) > 0:
-                matches.append({
-                    'tipo_match': '1:1', 'camada': 'exata',
-                    'ids_extrato': extrato_matches['id'].tolist(),
-                    'ids_contabil': contabil_matches['id'].tolist(),
-                    'valor_total': extrato_matches['valor'].sum(),
-                    'confianca': 100,
-                    'explicacao': f"Match exato por Nosso Número: {nn}",
-                    'chave_match': f"NN_{nn}"
-                })
-        return matches
+        return self.join_engine.juntar_por_chave(extrato_df, contabil_df, 'nosso_numero', 'Nosso Número', 'NN')
+    
+    def _match_por_codigo_barras(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
+        """Matching por código de barras de boleto (linha digitável normalizada)"""
+        return self.join_engine.juntar_por_chave(extrato_df, contabil_df, 'codigo_barras', 'Código de Barras', 'BOLETO')
+    
+    def _match_por_documento(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
+        """Matching por (CPF/CNPJ, valor em centavos) dentro da janela de datas"""
+        return self.join_engine.juntar_por_chave_e_janela(extrato_df, contabil_df, 'cpf_cnpj', self.janela_documento_dias,
+                                                          'CPF/CNPJ', 'DOC', confianca=98)
     
     def _match_valor_data_exata(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
-                           extrato_match_ids: set, contabil_match_ids: set) -> List[Dict]:
+                           ledger: MatchLedger) -> List[Dict]:
         """Matching por valor e data exata"""
-        matches = []
-        extrato_nao_match = extrato_df[~extrato_df['id'].isin(extrato_match_ids)]
-        contabil_nao_match = contabil_df[~contabil_df['id'].isin(contabil_match_ids)]
-        
-        for _, extrato_row in extrato_nao_match.iterrows():
-            if extrato_row['id'] in extrato_match_ids: continue
-            valor_extrato_abs = abs(extrato_row['valor'])
-            
-            contabil_correspondentes = contabil_nao_match[
-                (abs(contabil_nao_match['valor']) == valor_extrato_abs) &
-                (contabil_nao_match['data'] == extrato_row['data']) &
-                (~contabil_nao_match['id'].isin(contabil_match_ids))
-            ]
-            
-            if len(contabil_correspondentes) == 1:
-                contabil_row = contabil_correspondentes.iloc[0]
-                matches.append({
-                    'tipo_match': '1:1', 'camada': 'exata',
-                    'ids_extrato': [extrato_row['id']],
-                    'ids_contabil': [contabil_row['id']],
-                    'valor_total': valor_extrato_abs,
-                    'confianca': 95,
-                    'explicacao': f"Match exato por valor (R$ {valor_extrato_abs:.2f}) e data",
-                    'chave_match': f"VALOR_DATA_{valor_extrato_abs}_{extrato_row['data']}"
-                })
-                extrato_match_ids.add(extrato_row['id'])
-                contabil_match_ids.add(contabil_row['id'])
-        return matches
+        return ledger.registrar(self.sort_merge.parear_valor_data(
+            ledger.nao_conciliados(extrato_df, 'extrato'), ledger.nao_conciliados(contabil_df, 'contabil')
+        ))
 
     def _match_heuristico_1_1(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
-                            tolerancia_dias: int, tolerancia_valor: float, similaridade_minima: int) -> List[Dict]:
-        """Matching heurístico 1:1"""
+                            tolerancia_dias: int, tolerancia_valor: float, similaridade_minima: int,
+                            estrategia_atribuicao: str = 'otima',
+                            backend_similaridade: str = 'sequencematcher', blocagem_lsh: bool = False,
+                            pares_candidatos: CandidatePairs = None, tolerancia_relativa: float = 0.0,
+                            processos: int = 1) -> List[Dict]:
+        """Matching heurístico 1:1 sobre os pares candidatos (tabela compartilhada ou índice de janelas)"""
+        pares = pares_na_janela(extrato_df, contabil_df, tolerancia_valor, tolerancia_dias, pares_candidatos,
+                                tolerancia_relativa)
+        descricoes_extrato = descricoes_posicionais(extrato_df)
+        descricoes_contabil = descricoes_posicionais(contabil_df)
+        if blocagem_lsh:
+            # Só compara descrições de pares que também caíram em um bloco LSH comum
+            pares_lsh, self.estatisticas_lsh = blocagem_por_lsh(descricoes_extrato, descricoes_contabil)
+            pares = pares.merge(pares_lsh[['pos_extrato', 'pos_contabil']], on=['pos_extrato', 'pos_contabil'])
+        self.pares_candidatos_heuristica = len(pares)
+        
+        if processos != 1:
+            vetorizador = self._vetorizador_global(extrato_df, contabil_df, backend_similaridade, pares_candidatos)
+            pares = pares.reset_index(drop=True)
+            colunas = colunas_dos_pares(pares)
+            colunas['texto_extrato'], colunas['deslocamentos_extrato'] = colunas_de_textos(descricoes_extrato)
+            colunas['texto_contabil'], colunas['deslocamentos_contabil'] = colunas_de_textos(descricoes_contabil)
+            escolhidos, similaridades_escolhidos = ComponentParallelMatcher(processos).resolver(
+                colunas, len(extrato_df), len(contabil_df), _atribuir_heuristico_1_1_lote,
+                (similaridade_minima, estrategia_atribuicao, backend_similaridade, vetorizador)
+            )
+            similaridades = np.zeros(len(pares))
+            similaridades[escolhidos] = similaridades_escolhidos
+            return self._montar_matches_heuristicos(extrato_df, contabil_df, pares, escolhidos, similaridades)
+        return self._atribuir_heuristico_1_1(extrato_df, contabil_df, pares, similaridade_minima,
+                                             estrategia_atribuicao, backend_similaridade, pares_candidatos)
+    
+    def _atribuir_heuristico_1_1(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, pares: pd.DataFrame,
+                                 similaridade_minima: int, estrategia_atribuicao: str = 'otima',
+                                 backend_similaridade: str = 'sequencematcher', pares_candidatos: CandidatePairs = None,
+                                 vetorizador=None) -> List[Dict]:
+        """Similaridade e atribuição 1:1 dos pares candidatos já filtrados"""
+        escolhidos, similaridades = self._escolher_heuristico_1_1(
+            descricoes_posicionais(extrato_df), descricoes_posicionais(contabil_df), pares, similaridade_minima,
+            estrategia_atribuicao, backend_similaridade, pares_candidatos, vetorizador
+        )
+        return self._montar_matches_heuristicos(extrato_df, contabil_df, pares, escolhidos, similaridades)
+    
+    def _escolher_heuristico_1_1(self, descricoes_extrato: List[str], descricoes_contabil: List[str],
+                                 pares: pd.DataFrame, similaridade_minima: int, estrategia_atribuicao: str = 'otima',
+                                 backend_similaridade: str = 'sequencematcher', pares_candidatos: CandidatePairs = None,
+                                 vetorizador=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Posições dos pares escolhidos e similaridade de cada par (zero nos não pontuados)"""
+        pos_extrato = pares['pos_extrato'].to_numpy()
+        pos_contabil = pares['pos_contabil'].to_numpy()
+        textos = None if 'indice_par' in pares else TextSimilarity(backend_similaridade).ajustar(
+            descricoes_extrato, descricoes_contabil, vetorizador)
+        
+        def similaridade_pares(posicoes):
+            if textos is None:
+                # Similaridades calculadas sob demanda e reaproveitadas pela tabela compartilhada
+                return pares_candidatos.similaridades(pares['indice_par'].to_numpy()[posicoes], backend_similaridade)
+            return textos.similaridade_pares(pos_extrato[posicoes], pos_contabil[posicoes])
+        
+        if estrategia_atribuicao == 'gulosa':
+            # Primeiro candidato (na ordem do contábil) que atinge a similaridade mínima
+            escolhidos, similaridades = [], np.zeros(len(pares))
+            extrato_match_pos, contabil_match_pos = set(), set()
+            for k, (pe, pc) in enumerate(zip(pos_extrato.tolist(), pos_contabil.tolist())):
+                if pe in extrato_match_pos or pc in contabil_match_pos: continue
+                similaridades[k] = similaridade_pares([k])[0]
+                if similaridades[k] >= similaridade_minima:
+                    escolhidos.append(k)
+                    extrato_match_pos.add(pe)
+                    contabil_match_pos.add(pc)
+            escolhidos = np.array(escolhidos, dtype=np.int64)
+        else:
+            similaridades = similaridade_pares(np.arange(len(pares)))
+            validos = np.flatnonzero(similaridades >= similaridade_minima)
+            confiancas = self._calcular_confianca_heuristica(
+                pares['diff_dias'].to_numpy()[validos],
+                centavos_para_valor(pares['diff_centavos'].to_numpy()[validos]),
+                similaridades[validos]
+            )
+            escolhidos = validos[AssignmentSolver(estrategia_atribuicao).resolver(
+                pos_extrato[validos], pos_contabil[validos], confiancas
+            )]
+        return escolhidos, similaridades
+    
+    @staticmethod
+    def _vetorizador_global(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, backend_similaridade: str,
+                            pares_candidatos: CandidatePairs = None):
+        """Vetorizador TF-IDF ajustado uma vez sobre todas as descrições, para os lotes pontuarem como o serial"""
+        if backend_similaridade != 'tfidf':
+            return None
+        if pares_candidatos is not None:
+            return TextSimilarity('tfidf').ajustar(pares_candidatos.descricoes_extrato, pares_candidatos.descricoes_contabil).vetorizador
+        return TextSimilarity('tfidf').ajustar(descricoes_posicionais(extrato_df), descricoes_posicionais(contabil_df)).vetorizador
+    
+    def _montar_matches_heuristicos(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                                    pares: pd.DataFrame, escolhidos: np.ndarray, similaridades: np.ndarray) -> List[Dict]:
+        """Converte os pares escolhidos em matches 1:1 da camada heurística"""
         matches = []
-        extrato_match_ids = set()
-        contabil_match_ids = set()
-        
-        for _, extrato_row in extrato_df.iterrows():
-            if extrato_row['id'] in extrato_match_ids: continue
-            valor_extrato_abs = abs(extrato_row['valor'])
-            
-            contabil_candidatos = contabil_df[
-                (~contabil_df['id'].isin(contabil_match_ids)) &
-                (abs(abs(contabil_df['valor']) - valor_extrato_abs) <= tolerancia_valor)
-            ]
-            
-            for _, contabil_row in contabil_candidatos.iterrows():
-                if contabil_row['id'] in contabil_match_ids: continue
-                data_diff = abs((contabil_row['data'] - extrato_row['data']).days)
-                if data_diff > tolerancia_dias: continue
-                
-                similaridade = self._calcular_similaridade(
-                    extrato_row.get('descricao', ''), contabil_row.get('descricao', '')
-                )
-                
-                if similaridade >= similaridade_minima:
-                    diff_valor = abs(abs(contabil_row['valor']) - valor_extrato_abs)
-                    confianca = self._calcular_confianca_heuristica(data_diff, diff_valor, similaridade)
-                    
-                    matches.append({
-                        'tipo_match': '1:1', 'camada': 'heuristica',
-                        'ids_extrato': [extrato_row['id']],
-                        'ids_contabil': [contabil_row['id']],
-                        'valor_total': valor_extrato_abs,
-                        'confianca': confianca,
-                        'explicacao': f"Match por similaridade: {similaridade}%",
-                        'chave_match': f"HEUR_{extrato_row['id']}_{contabil_row['id']}"
-                    })
-                    extrato_match_ids.add(extrato_row['id'])
-                    contabil_match_ids.add(contabil_row['id'])
-                    break
+        ids_extrato = extrato_df['id'].tolist()
+        ids_contabil = contabil_df['id'].tolist()
+        centavos_extrato = centavos_absolutos(extrato_df)
+        valores_pares = pares[['pos_extrato', 'pos_contabil', 'diff_centavos', 'diff_dias']].to_numpy()
+        
+        for k in escolhidos.tolist():
+            pos_extrato, pos_contabil, diff_centavos, data_diff = valores_pares[k].tolist()
+            similaridade = similaridades[k]
+            confianca = float(self._calcular_confianca_heuristica(data_diff, centavos_para_valor(diff_centavos), similaridade))
+            matches.append({
+                'tipo_match': '1:1', 'camada': 'heuristica',
+                'ids_extrato': [ids_extrato[pos_extrato]],
+                'ids_contabil': [ids_contabil[pos_contabil]],
+                'valor_total': centavos_para_valor(int(centavos_extrato[pos_extrato])),
+                'confianca': confianca,
+                'explicacao': f"Match por similaridade: {similaridade}%",
+                'chave_match': f"HEUR_{ids_extrato[pos_extrato]}_{ids_contabil[pos_contabil]}"
+            })
         return matches
     
     def _match_1_n(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
-                  tolerancia_dias: int, tolerancia_valor: float) -> List[Dict]:
-        """Matching 1:N (parcelamentos)"""
-        return []  # Implementação simplificada
+                  tolerancia_dias: int, tolerancia_valor: float, tolerancia_relativa: float = 0.0) -> List[Dict]:
+        """Matching 1:N (parcelamentos): uma transação do extrato contra a soma de lançamentos"""
+        matches = []
+        ids_extrato = extrato_df['id'].tolist()
+        ids_contabil = contabil_df['id'].tolist()
+        for pos_extrato, posicoes, valor, confianca in self._agrupar_por_soma(
+                extrato_df, contabil_df, tolerancia_dias, tolerancia_valor, tolerancia_relativa):
+            matches.append({
+                'tipo_match': '1:N', 'camada': 'heuristica',
+                'ids_extrato': [ids_extrato[pos_extrato]],
+                'ids_contabil': [ids_contabil[p] for p in posicoes.tolist()],
+                'valor_total': valor,
+                'confianca': confianca,
+                'explicacao': f"Parcelamento: 1 transação = soma de {len(posicoes)} lançamentos",
+                'chave_match': f"HEUR_1N_{ids_extrato[pos_extrato]}"
+            })
+        return matches
     
     def _match_n_1(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
-                  tolerancia_dias: int, tolerancia_valor: float) -> List[Dict]:
-        """Matching N:1 (consolidações)"""
-        return []  # Implementação simplificada
+                  tolerancia_dias: int, tolerancia_valor: float, tolerancia_relativa: float = 0.0) -> List[Dict]:
+        """Matching N:1 (consolidações): um lançamento contábil contra a soma de transações"""
+        matches = []
+        ids_extrato = extrato_df['id'].tolist()
+        ids_contabil = contabil_df['id'].tolist()
+        for pos_contabil, posicoes, valor, confianca in self._agrupar_por_soma(
+                contabil_df, extrato_df, tolerancia_dias, tolerancia_valor, tolerancia_relativa):
+            matches.append({
+                'tipo_match': 'N:1', 'camada': 'heuristica',
+                'ids_extrato': [ids_extrato[p] for p in posicoes.tolist()],
+                'ids_contabil': [ids_contabil[pos_contabil]],
+                'valor_total': valor,
+                'confianca': confianca,
+                'explicacao': f"Consolidação: {len(posicoes)} transações = 1 lançamento",
+                'chave_match': f"HEUR_N1_{ids_contabil[pos_contabil]}"
+            })
+        return matches
+    
+    def _agrupar_por_soma(self, alvos_df: pd.DataFrame, partes_df: pd.DataFrame,
+                          tolerancia_dias: int, tolerancia_valor: float, tolerancia_relativa: float = 0.0) -> List[Tuple]:
+        """Grupos (posição do alvo, posições das partes, valor, confiança) cuja soma fecha com o alvo"""
+        centavos_alvos = centavos_absolutos(alvos_df)
+        # Tolerância de cada alvo: a soma das partes pode ficar até essa distância do valor do alvo
+        tolerancias = np.maximum(np.rint(centavos_alvos * tolerancia_relativa).astype(np.int64), int(round(tolerancia_valor * 100)))
+        centavos_partes = centavos_absolutos(partes_df)
+        dias_alvos = dia_ordinal(alvos_df['data'])
+        dias_partes = dia_ordinal(partes_df['data'])
+        
+        grupos = []
+        for pos_alvo, posicoes in self.agrupador.agrupar(alvos_df, partes_df, tolerancias, tolerancia_dias):
+            diff_centavos = abs(int(centavos_partes[posicoes].sum()) - int(centavos_alvos[pos_alvo]))
+            diff_dias = int(np.abs(dias_partes[posicoes] - dias_alvos[pos_alvo]).max())
+            confianca = self._calcular_confianca_agrupamento(diff_dias, centavos_para_valor(diff_centavos))
+            grupos.append((pos_alvo, posicoes, centavos_para_valor(int(centavos_alvos[pos_alvo])), confianca))
+        return grupos
     
     def _calcular_similaridade(self, texto1: str, texto2: str) -> float:
         """Calcula similaridade entre dois textos"""
-        if not texto1 or not texto2: return 0.0
-        return SequenceMatcher(None, texto1.lower(), texto2.lower()).ratio() * 100
+        return similaridade_sequencematcher(texto1, texto2)
     
-    def _calcular_confianca_heuristica(self, diff_dias: int, diff_valor: float, similaridade: float) -> float:
-        """Calcula confiança do match heurístico"""
-        confianca = 100
+    def _calcular_confianca_heuristica(self, diff_dias, diff_valor, similaridade):
+        """Calcula confiança do match heurístico (aceita escalares ou arrays)"""
+        confianca = 100.0
         confianca -= diff_dias * 5
         confianca -= diff_valor * 10
         confianca = confianca * (similaridade / 100)
-        return max(0, min(100, confianca))
+        return np.clip(confianca, 0, 100)
+    
+    def _calcular_confianca_agrupamento(self, diff_dias: int, diff_valor: float) -> float:
+        """Confiança de matches 1:N / N:1 (sem similaridade textual, parte de 85)"""
+        return float(np.clip(85 - diff_dias * 5 - diff_valor * 10, 0, 100))
+
+def _atribuir_heuristico_1_1_lote(colunas: Dict[str, np.ndarray], indices_pares: np.ndarray,
+                                  similaridade_minima: int, estrategia_atribuicao: str,
+                                  backend_similaridade: str, vetorizador) -> Tuple[np.ndarray, np.ndarray]:
+    """Heurística 1:1 de um lote de componentes (executada nos processos do ComponentParallelMatcher)
+
+    Só as descrições das linhas do lote são decodificadas das colunas compartilhadas.
+    """
+    linhas_extrato, local_extrato = np.unique(colunas['pos_extrato'][indices_pares], return_inverse=True)
+    linhas_contabil, local_contabil = np.unique(colunas['pos_contabil'][indices_pares], return_inverse=True)
+    pares = pd.DataFrame({'pos_extrato': local_extrato, 'pos_contabil': local_contabil})
+    escolhidos, similaridades = DataAnalyzer()._escolher_heuristico_1_1(
+        textos_das_colunas(colunas['texto_extrato'], colunas['deslocamentos_extrato'], linhas_extrato),
+        textos_das_colunas(colunas['texto_contabil'], colunas['deslocamentos_contabil'], linhas_contabil),
+        pares.assign(diff_centavos=colunas['diff_centavos'][indices_pares], diff_dias=colunas['diff_dias'][indices_pares]),
+        similaridade_minima, estrategia_atribuicao, backend_similaridade, vetorizador=vetorizador
+    )
+    return indices_pares[escolhidos], similaridades[escolhidos]
 
 # Funções de interface simplificadas
-def matching_exato(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> Dict:
-    return DataAnalyzer().matching_exato(extrato_df, contabil_df)
+def matching_exato(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, ledger: MatchLedger = None,
+                   tabela_taxas: Dict[str, Dict] = None, identificadores: bool = True, por_janela: bool = True) -> Dict:
+    return DataAnalyzer().matching_exato(extrato_df, contabil_df, ledger, tabela_taxas, identificadores, por_janela)
 
 def matching_heuristico(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
                        nao_matchados_extrato: pd.DataFrame, nao_matchados_contabil: pd.DataFrame,
-                       tolerancia_dias: int, tolerancia_valor: float, similaridade_minima: int) -> Dict:
+                       tolerancia_dias: int, tolerancia_valor: float, similaridade_minima: int,
+                       estrategia_atribuicao: str = 'otima', permite_1n: bool = True, permite_n1: bool = True,
+                       backend_similaridade: str = 'sequencematcher', blocagem_lsh: bool = False,
+                       pares_candidatos: CandidatePairs = None, ledger: MatchLedger = None,
+                       tolerancia_relativa: float = 0.0, processos: int = 1) -> Dict:
     return DataAnalyzer().matching_heuristico(extrato_df, contabil_df, nao_matchados_extrato, 
-                                      nao_matchados_contabil, tolerancia_dias, tolerancia_valor, similaridade_minima)
+                                      nao_matchados_contabil, tolerancia_dias, tolerancia_valor, similaridade_minima,
+                                      estrategia_atribuicao, permite_1n, permite_n1, backend_similaridade, blocagem_lsh,
+                                      pares_candidatos, ledger, tolerancia_relativa, processos)
 
 def matching_ia(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
-               nao_matchados_extrato: pd.DataFrame, nao_matchados_contabil: pd.DataFrame) -> Dict:
-    return DataAnalyzer().matching_ia(extrato_df, contabil_df, nao_matchados_extrato, nao_matchados_contabil)
+               nao_matchados_extrato: pd.DataFrame, nao_matchados_contabil: pd.DataFrame,
+               estrategia_atribuicao: str = 'otima', blocagem_lsh: bool = False,
+               pares_candidatos: CandidatePairs = None, ledger: MatchLedger = None, processos: int = 1,
+               prazo_segundos: float = None) -> Dict:
+    return DataAnalyzer().matching_ia(extrato_df, contabil_df, nao_matchados_extrato, nao_matchados_contabil,
+                                      estrategia_atribuicao, blocagem_lsh, pares_candidatos, ledger, processos,
+                                      prazo_segundos)
+
+def criar_ledger(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> MatchLedger:
+    """Ledger de conciliação único da análise, repassado às três camadas"""
+    analisador = DataAnalyzer()
+    return MatchLedger(analisador._garantir_coluna_id(extrato_df, "extrato_df"),
+                       analisador._garantir_coluna_id(contabil_df, "contabil_df"))
+
+def construir_pares_candidatos(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                               tolerancia_valor: float, tolerancia_dias: int,
+                               tolerancia_relativa: float = 0.0) -> CandidatePairs:
+    """Tabela de pares candidatos da análise, montada uma vez com as tolerâncias mais folgadas das camadas"""
+    analisador = DataAnalyzer()
+    return CandidatePairs(analisador._garantir_coluna_id(extrato_df, "extrato_df"),
+                          analisador._garantir_coluna_id(contabil_df, "contabil_df"),
+                          tolerancia_valor, tolerancia_dias, tolerancia_relativa)
 
 def consolidar_resultados(resultados_exato: Dict, resultados_heurístico: Dict, resultados_ia: Dict) -> Dict:
     matches = resultados_exato['matches'] + resultados_heurístico['matches'] + resultados_ia['matches']
@@ -433,7 +636,11 @@ def consolidar_resultados(resultados_exato: Dict, resultados_heurístico: Dict,
             'matches_exatos': len(resultados_exato['matches']),
             'matches_heuristicos': len(resultados_heurístico['matches']),
             'matches_ia': len(resultados_ia.get('matches', [])),
-            'total_excecoes': len(excecoes)
+            'total_excecoes': len(excecoes),
+            'pares_candidatos_heuristica': resultados_heurístico.get('pares_candidatos', 0),
+            'blocagem_lsh_heuristica': resultados_heurístico.get('blocagem_lsh', {}),
+            'blocagem_lsh_ia': resultados_ia.get('estatisticas_ia', {}).get('blocagem_lsh', {}),
+            'cobertura_ia': resultados_ia.get('estatisticas_ia', {}).get('cobertura', {})
         }
     }
 
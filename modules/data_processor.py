@@ -10,6 +10,7 @@ import os
 from urllib.parse import urlparse, parse_qs, unquote, urlencode, quote
 import warnings
 import base64
+from modules.monetario import valor_para_centavos
 warnings.filterwarnings('ignore')
 
 class CloudImporter:
@@ -305,9 +306,11 @@ def processar_extrato(df, col_data, col_valor, col_descricao):
     df_processed['data'] = pd.to_datetime(df_processed['data'], errors='coerce')
     df_processed = df_processed.dropna(subset=['data'])
     
-    # Processar valor
+    # Processar valor (centavos inteiros são a representação usada no matching)
     df_processed['valor'] = pd.to_numeric(df_processed['valor'], errors='coerce')
     df_processed = df_processed.dropna(subset=['valor'])
+    df_processed['valor_centavos'] = valor_para_centavos(df_processed['valor'])
+    df_processed['valor'] = df_processed['valor_centavos'] / 100
     
     # Adicionar ID único
     df_processed['id'] = range(1, len(df_processed) + 1)
@@ -339,9 +342,11 @@ def processar_contabil(df, col_data, col_valor, col_descricao):
     df_processed['data'] = pd.to_datetime(df_processed['data'], errors='coerce')
     df_processed = df_processed.dropna(subset=['data'])
     
-    # Processar valor
+    # Processar valor (centavos inteiros são a representação usada no matching)
     df_processed['valor'] = pd.to_numeric(df_processed['valor'], errors='coerce')
     df_processed = df_processed.dropna(subset=['valor'])
+    df_processed['valor_centavos'] = valor_para_centavos(df_processed['valor'])
+    df_processed['valor'] = df_processed['valor_centavos'] / 100
     
     # Adicionar ID único
     df_processed['id'] = range(1, len(df_processed) + 1)
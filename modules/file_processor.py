@@ -5,6 +5,7 @@ from datetime import datetime
 import logging
 import re
 from typing import Dict, List, Any
+from modules.monetario import valor_para_centavos
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -195,6 +196,7 @@ class FileProcessor:
             # Remover caracteres não numéricos e converter
             df['valor'] = df['valor'].astype(str).str.replace(r'[^\d,-]', '', regex=True)
             df['valor'] = df['valor'].str.replace(',', '.').astype(float)
+            df['valor_centavos'] = valor_para_centavos(df['valor'])
         
         # Limpar descrição
         if 'descricao' in df.columns:
@@ -211,6 +213,7 @@ class FileProcessor:
         # Converter valor (garantir positivo para contabilidade)
         if 'valor' in df.columns:
             df['valor'] = pd.to_numeric(df['valor'], errors='coerce').abs()
+            df['valor_centavos'] = valor_para_centavos(df['valor'])
         
         # Limpar descrição
         if 'descricao' in df.columns:
@@ -0,0 +1,116 @@
+# modules/identificadores.py
+import re
+import numpy as np
+import pandas as pd
+
+# Pesos do módulo 11 (2 a 9, da direita para a esquerda) usados por boletos e arrecadação
+PESOS_MODULO_11 = (2, 3, 4, 5, 6, 7, 8, 9)
+
+
+def codigo_barras_boleto(trecho: str) -> str:
+    """Código de barras (44 dígitos) de uma linha digitável ou código de barras; vazio se o DV não confere
+
+    Aceita a linha digitável de boleto bancário (47 dígitos), a de arrecadação/concessionárias
+    (48 dígitos, começa com 8) e o próprio código de barras, com ou sem pontos e espaços.
+    """
+    digitos = re.sub(r'\D', '', trecho or '')
+    if len(digitos) == 48 and digitos[0] == '8':
+        # Quatro blocos de 11 dígitos, cada um seguido do seu DV
+        codigo = ''.join(digitos[i:i + 11] for i in range(0, 48, 12))
+    elif len(digitos) == 47:
+        # Campos 1-3 trazem o campo livre (com DVs próprios), o 4 é o DV geral e o 5 fator + valor
+        codigo = digitos[0:4] + digitos[32] + digitos[33:47] + digitos[4:9] + digitos[10:20] + digitos[21:31]
+    elif len(digitos) == 44:
+        codigo = digitos
+    else:
+        return ''
+    return codigo if _dv_codigo_barras_confere(codigo) else ''
+
+
+def _dv_codigo_barras_confere(codigo: str) -> bool:
+    if codigo[0] == '8':
+        # Arrecadação: DV na 4ª posição, módulo 10 ou 11 conforme o identificador de valor
+        base, dv = codigo[:3] + codigo[4:], int(codigo[3])
+        if codigo[2] in '67':
+            return _modulo_10(base) == dv
+        if codigo[2] in '89':
+            resto = _soma_modulo_11(base) % 11
+            return (0 if resto in (0, 1) else 11 - resto) == dv
+        return False
+    # Boleto bancário: DV geral na 5ª posição, módulo 11 com 0, 10 e 11 virando 1
+    resto = _soma_modulo_11(codigo[:4] + codigo[5:]) % 11
+    calculado = 11 - resto
+    return (1 if calculado in (0, 10, 11) else calculado) == int(codigo[4])
+
+
+def _soma_modulo_11(digitos: str) -> int:
+    return sum(int(d) * PESOS_MODULO_11[i % 8] for i, d in enumerate(reversed(digitos)))
+
+
+def _modulo_10(digitos: str) -> int:
+    soma = 0
+    for i, d in enumerate(reversed(digitos)):
+        produto = int(d) * (2 if i % 2 == 0 else 1)
+        soma += produto // 10 + produto % 10
+    return (10 - soma % 10) % 10
+
+
+# CPF ou CNPJ, formatado ou só dígitos, sem fazer parte de uma sequência numérica maior
+PADRAO_DOCUMENTO = re.compile(r'(?<![0-9])([0-9]{3}\.[0-9]{3}\.[0-9]{3}-[0-9]{2}|[0-9]{2}\.[0-9]{3}\.[0-9]{3}/[0-9]{4}-[0-9]{2}|[0-9]{14}|[0-9]{11})(?![0-9])')
+PESOS_CPF = (np.arange(10, 1, -1), np.arange(11, 1, -1))
+PESOS_CNPJ = (np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]), np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]))
+
+
+def documentos_validos(textos: pd.Series) -> pd.Series:
+    """Primeiro CPF/CNPJ com dígitos verificadores válidos de cada texto (só dígitos; vazio se não houver)
+
+    Todas as ocorrências candidatas são extraídas de uma vez e os DVs calculados em matrizes
+    de dígitos, então números de conta ou de documento com 11/14 dígitos são descartados.
+    """
+    textos = pd.Series(textos, dtype=object).reset_index(drop=True)
+    resultado = pd.Series('', index=textos.index, dtype=object)
+    candidatos = textos.where(textos.map(lambda texto: isinstance(texto, str)), '').str.extractall(PADRAO_DOCUMENTO)
+    if candidatos.empty:
+        return resultado
+
+    digitos = candidatos[0].str.replace(r'[^0-9]', '', regex=True)
+    validos = np.zeros(len(digitos), dtype=bool)
+    tamanhos = digitos.str.len().to_numpy()
+    for tamanho, pesos in ((11, PESOS_CPF), (14, PESOS_CNPJ)):
+        linhas = np.flatnonzero(tamanhos == tamanho)
+        if len(linhas):
+            matriz = _matriz_digitos(digitos.iloc[linhas].tolist(), tamanho)
+            validos[linhas] = _dvs_conferem(matriz, pesos, cpf=tamanho == 11)
+
+    primeiros = digitos[validos].groupby(level=0).first()
+    resultado.iloc[primeiros.index.to_numpy()] = primeiros.to_numpy()
+    return resultado
+
+
+def _matriz_digitos(numeros: list, tamanho: int) -> np.ndarray:
+    return (np.frombuffer(''.join(numeros).encode('ascii'), dtype=np.uint8).reshape(-1, tamanho) - ord('0')).astype(np.int64)
+
+
+def _dvs_conferem(matriz: np.ndarray, pesos: tuple, cpf: bool) -> np.ndarray:
+    """Confere os dois DVs (módulo 11) de cada linha; sequências de um único dígito são inválidas"""
+    n = matriz.shape[1]
+    confere = (matriz != matriz[:, :1]).any(axis=1)
+    for posicao, pesos_dv in zip((n - 2, n - 1), pesos):
+        soma = matriz[:, :posicao] @ pesos_dv
+        if cpf:
+            dv = soma * 10 % 11 % 10
+        else:
+            resto = soma % 11
+            dv = np.where(resto < 2, 0, 11 - resto)
+        confere &= dv == matriz[:, posicao]
+    return confere
+
+
+def remover_fitids_duplicados(df: pd.DataFrame) -> tuple:
+    """Remove transações OFX repetidas (mesmo FITID na mesma conta) vindas de arquivos com períodos sobrepostos"""
+    if 'fitid' not in df.columns:
+        return df, 0
+    chaves = ['conta_bancaria', 'fitid'] if 'conta_bancaria' in df.columns else ['fitid']
+    preenchido = df['fitid'].notna() & (df['fitid'].astype(str).str.strip() != '')
+    duplicadas = preenchido & df.duplicated(subset=chaves, keep='first')
+    return df[~duplicadas].reset_index(drop=True), int(duplicadas.sum())
@@ -0,0 +1,228 @@
+# modules/lsh_blocking.py
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Sequence
+from modules.matching_engine import expandir_janelas
+
+try:
+    from scipy.sparse import csr_matrix
+    SCIPY_DISPONIVEL = True
+except ImportError:
+    SCIPY_DISPONIVEL = False
+
+PRIMO_MERSENNE = (1 << 31) - 1
+
+
+def normalizar_descricao(texto: str) -> str:
+    """Minúsculas, sem acentos e só com letras/dígitos separados por um espaço"""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', ' ', texto.lower()).strip()
+
+
+class MinHashLSH:
+    """Blocagem de descrições por MinHash + LSH em bandas
+
+    Cada descrição vira um conjunto de shingles de caracteres; as bandas da assinatura MinHash
+    agrupam em blocos as linhas com trechos de assinatura iguais. Só pares que caem em algum
+    bloco comum são verificados (Jaccard exato com scipy, estimado pela assinatura sem ele).
+    """
+
+    def __init__(self, limiar: float = 0.5, num_permutacoes: int = 128, bandas: int = None,
+                 tamanho_shingle: int = 3, frequencia_maxima: float = 0.05, semente: int = 42):
+        self.limiar = limiar
+        self.frequencia_maxima = frequencia_maxima
+        self.num_permutacoes = num_permutacoes
+        self.linhas_por_banda = (num_permutacoes // bandas) if bandas else self._linhas_por_banda(limiar, num_permutacoes)
+        self.bandas = num_permutacoes // self.linhas_por_banda
+        self.tamanho_shingle = tamanho_shingle
+        rng = np.random.default_rng(semente)
+        self._a = rng.integers(1, PRIMO_MERSENNE, num_permutacoes, dtype=np.int64)
+        self._b = rng.integers(0, PRIMO_MERSENNE, num_permutacoes, dtype=np.int64)
+        self._multiplicadores = rng.integers(1, 1 << 62, self.linhas_por_banda, dtype=np.int64).astype(np.uint64)
+        self._vocabulario = {}
+        self._shingles_cache = {}
+        self.estatisticas = {}
+
+    def pares(self, textos_a: Sequence[str], textos_b: Sequence[str]) -> pd.DataFrame:
+        """Pares (posição A, posição B) que compartilham um bloco e têm Jaccard >= limiar"""
+        shingles_a, shingles_b = self._preparar(textos_a, textos_b)
+        assinaturas_a, validos_a = self._assinaturas(shingles_a)
+        assinaturas_b, validos_b = self._assinaturas(shingles_b)
+
+        blocos, candidatos, chaves, pendentes = 0, 0, np.empty(0, np.int64), []
+        largura = max(len(shingles_b), 1)
+        linhas_por_banda = self.linhas_por_banda
+        linhas_validas_a, linhas_validas_b = np.flatnonzero(validos_a), np.flatnonzero(validos_b)
+        for banda in range(self.bandas):
+            colunas = slice(banda * linhas_por_banda, (banda + 1) * linhas_por_banda)
+            chaves_a = self._chave_banda(assinaturas_a[linhas_validas_a, colunas])
+            chaves_b = self._chave_banda(assinaturas_b[linhas_validas_b, colunas])
+            ordem_b = np.argsort(chaves_b, kind='mergesort')
+            chaves_b_ordenadas = chaves_b[ordem_b]
+            inicio = np.searchsorted(chaves_b_ordenadas, chaves_a, side='left')
+            fim = np.searchsorted(chaves_b_ordenadas, chaves_a, side='right')
+            # Um bloco por início de janela distinto no lado B ordenado
+            inicio_bloco = np.zeros(len(chaves_b_ordenadas) + 1, dtype=bool)
+            inicio_bloco[inicio[fim > inicio]] = True
+            blocos += int(inicio_bloco.sum())
+            linha, indice = expandir_janelas(inicio, fim)
+            candidatos += len(linha)
+            pendentes.append(linhas_validas_a[linha] * largura + linhas_validas_b[ordem_b[indice]])
+            # Deduplica periodicamente: a memória fica limitada aos pares distintos
+            if sum(len(p) for p in pendentes) > 4 * max(len(chaves), 1_000_000):
+                chaves, pendentes = np.unique(np.concatenate([chaves] + pendentes)), []
+
+        chaves = np.unique(np.concatenate([chaves] + pendentes))
+        pos_a, pos_b = np.divmod(chaves, largura)
+        if SCIPY_DISPONIVEL:
+            jaccard = self._jaccard_exato(shingles_a, shingles_b, pos_a, pos_b)
+        else:
+            jaccard = self._jaccard_estimado(assinaturas_a, assinaturas_b, pos_a, pos_b)
+        dentro = jaccard >= self.limiar
+
+        self.estatisticas = {
+            'bandas': self.bandas,
+            'linhas_por_banda': self.linhas_por_banda,
+            'blocos': int(blocos),
+            'pares_em_blocos': int(candidatos),
+            'pares_distintos': int(len(pos_a)),
+            'pares_acima_limiar': int(dentro.sum()),
+            'pares_forca_bruta': int(len(shingles_a) * len(shingles_b))
+        }
+        return pd.DataFrame({'pos_extrato': pos_a[dentro], 'pos_contabil': pos_b[dentro], 'jaccard': jaccard[dentro]})
+
+    def avaliar_recall(self, textos_a: Sequence[str], textos_b: Sequence[str], pares: pd.DataFrame,
+                       amostra: int = 500, semente: int = 0) -> Dict:
+        """Recall dos pares do LSH contra o Jaccard exato (força bruta) numa amostra de linhas de A
+
+        O Jaccard de referência é o dos shingles que sobram após o filtro de shingles frequentes
+        (o mesmo conjunto que o LSH vê), não o das descrições originais.
+        """
+        shingles_a, shingles_b = self._preparar(textos_a, textos_b)
+        linhas = np.arange(len(shingles_a))
+        if len(linhas) > amostra:
+            linhas = np.sort(np.random.default_rng(semente).choice(linhas, amostra, replace=False))
+
+        if SCIPY_DISPONIVEL:
+            pos_a, pos_b = self._forca_bruta_esparsa(shingles_a, shingles_b, linhas)
+        else:
+            pos_a, pos_b = self._forca_bruta(shingles_a, shingles_b, linhas)
+        largura = max(len(shingles_b), 1)
+        encontrados = pares['pos_extrato'].to_numpy(dtype=np.int64) * largura + pares['pos_contabil'].to_numpy(dtype=np.int64)
+        verdadeiros = len(pos_a)
+        recuperados = int(np.isin(pos_a * largura + pos_b, encontrados).sum())
+        return {
+            'linhas_avaliadas': int(len(linhas)),
+            'pares_verdadeiros': verdadeiros,
+            'pares_recuperados': recuperados,
+            'recall': recuperados / verdadeiros if verdadeiros else 1.0
+        }
+
+    def _forca_bruta_esparsa(self, shingles_a: List[frozenset], shingles_b: List[frozenset], linhas: np.ndarray):
+        """Pares com Jaccard >= limiar entre as linhas amostradas de A e todo B (interseções por produto esparso)"""
+        matriz_a = self._matriz_binaria([shingles_a[i] for i in linhas.tolist()])
+        matriz_b = self._matriz_binaria(shingles_b)
+        intersecao = (matriz_a @ matriz_b.T).tocoo()
+        tamanhos_a, tamanhos_b = np.diff(matriz_a.indptr), np.diff(matriz_b.indptr)
+        jaccard = intersecao.data / np.maximum(tamanhos_a[intersecao.row] + tamanhos_b[intersecao.col] - intersecao.data, 1)
+        dentro = jaccard >= self.limiar
+        return linhas[intersecao.row[dentro]].astype(np.int64), intersecao.col[dentro].astype(np.int64)
+
+    def _forca_bruta(self, shingles_a: List[frozenset], shingles_b: List[frozenset], linhas: np.ndarray):
+        pos_a, pos_b = [], []
+        for i in linhas.tolist():
+            if not shingles_a[i]: continue
+            for j, conjunto in enumerate(shingles_b):
+                if conjunto and len(shingles_a[i] & conjunto) / len(shingles_a[i] | conjunto) >= self.limiar:
+                    pos_a.append(i)
+                    pos_b.append(j)
+        return np.array(pos_a, dtype=np.int64), np.array(pos_b, dtype=np.int64)
+
+    @staticmethod
+    def _linhas_por_banda(limiar: float, num_permutacoes: int) -> int:
+        """Maior número de linhas por banda cujo ponto de inflexão (1/b)^(1/r) fica abaixo de 80% do limiar"""
+        melhor = 1
+        for linhas in range(1, num_permutacoes + 1):
+            if (1 / (num_permutacoes // linhas)) ** (1 / linhas) <= 0.8 * limiar:
+                melhor = linhas
+        return melhor
+
+    def _preparar(self, textos_a: Sequence[str], textos_b: Sequence[str]):
+        """Shingles dos dois lados sem os muito frequentes (boilerplate como 'pix recebido', 'ltda')"""
+        shingles_a = [self._shingles(t) for t in textos_a]
+        shingles_b = [self._shingles(t) for t in textos_b]
+        total = len(shingles_a) + len(shingles_b)
+        if total < 50 or not self._vocabulario:
+            return shingles_a, shingles_b
+        ids = np.fromiter((i for s in shingles_a + shingles_b for i in s), dtype=np.int64)
+        frequencias = np.bincount(ids, minlength=len(self._vocabulario))
+        frequentes = frozenset(np.flatnonzero(frequencias > self.frequencia_maxima * total).tolist())
+        if not frequentes:
+            return shingles_a, shingles_b
+        return [s - frequentes for s in shingles_a], [s - frequentes for s in shingles_b]
+
+    def _shingles(self, texto: str) -> frozenset:
+        """Ids dos shingles de caracteres da descrição normalizada (memorizados por texto)"""
+        shingles = self._shingles_cache.get(texto)
+        if shingles is None:
+            normalizado = normalizar_descricao(texto)
+            k = self.tamanho_shingle
+            trechos = {normalizado[i:i + k] for i in range(max(len(normalizado) - k + 1, 1))} if normalizado else set()
+            shingles = frozenset(self._vocabulario.setdefault(t, len(self._vocabulario)) for t in trechos)
+            self._shingles_cache[texto] = shingles
+        return shingles
+
+    def _assinaturas(self, shingles: List[frozenset], linhas_por_bloco: int = 2000):
+        """Assinaturas MinHash (linhas x permutações); linhas sem shingles ficam inválidas"""
+        tamanhos = np.array([len(s) for s in shingles], dtype=np.int64)
+        assinaturas = np.full((len(shingles), self.num_permutacoes), PRIMO_MERSENNE, dtype=np.int64)
+        validos = tamanhos > 0
+        for inicio in range(0, len(shingles), linhas_por_bloco):
+            bloco = slice(inicio, inicio + linhas_por_bloco)
+            tamanhos_bloco, validos_bloco = tamanhos[bloco], validos[bloco]
+            if not validos_bloco.any(): continue
+            ids = np.fromiter((i for s in shingles[bloco] for i in s), dtype=np.int64, count=int(tamanhos_bloco.sum()))
+            hashes = (ids[:, None] * self._a + self._b) % PRIMO_MERSENNE
+            inicios = np.cumsum(tamanhos_bloco) - tamanhos_bloco
+            assinaturas[inicio + np.flatnonzero(validos_bloco)] = np.minimum.reduceat(hashes, inicios[validos_bloco], axis=0)
+        return assinaturas, validos
+
+    def _chave_banda(self, trecho: np.ndarray) -> np.ndarray:
+        """Combina as linhas de uma banda em uma chave (colisões só acrescentam candidatos)"""
+        return (trecho.astype(np.uint64) * self._multiplicadores).sum(axis=1, dtype=np.uint64)
+
+    def _jaccard_exato(self, shingles_a: List[frozenset], shingles_b: List[frozenset],
+                       pos_a: np.ndarray, pos_b: np.ndarray) -> np.ndarray:
+        """Jaccard exato dos candidatos via produto linha a linha de matrizes binárias esparsas"""
+        matriz_a, matriz_b = self._matriz_binaria(shingles_a), self._matriz_binaria(shingles_b)
+        intersecao = np.asarray(matriz_a[pos_a].multiply(matriz_b[pos_b]).sum(axis=1)).ravel()
+        tamanhos_a = np.diff(matriz_a.indptr)[pos_a]
+        tamanhos_b = np.diff(matriz_b.indptr)[pos_b]
+        return intersecao / np.maximum(tamanhos_a + tamanhos_b - intersecao, 1)
+
+    def _matriz_binaria(self, shingles: List[frozenset]) -> 'csr_matrix':
+        tamanhos = np.array([len(s) for s in shingles], dtype=np.int64)
+        indices = np.fromiter((i for s in shingles for i in s), dtype=np.int64, count=int(tamanhos.sum()))
+        indptr = np.r_[0, np.cumsum(tamanhos)]
+        return csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                          shape=(len(shingles), len(self._vocabulario)))
+
+    @staticmethod
+    def _jaccard_estimado(assinaturas_a: np.ndarray, assinaturas_b: np.ndarray,
+                          pos_a: np.ndarray, pos_b: np.ndarray, bloco: int = 200_000) -> np.ndarray:
+        partes = [(assinaturas_a[pos_a[i:i + bloco]] == assinaturas_b[pos_b[i:i + bloco]]).mean(axis=1)
+                  for i in range(0, len(pos_a), bloco)]
+        return np.concatenate(partes) if partes else np.zeros(0)
+
+
+def blocagem_por_lsh(textos_a: Sequence[str], textos_b: Sequence[str], limiar: float = 0.3,
+                     amostra_recall: int = 0):
+    """Pares candidatos por LSH e estatísticas da blocagem (blocos, pares e, se amostra_recall > 0, recall amostral)"""
+    lsh = MinHashLSH(limiar=limiar)
+    pares = lsh.pares(textos_a, textos_b)
+    estatisticas = dict(lsh.estatisticas)
+    if amostra_recall:
+        estatisticas['recall_amostral'] = lsh.avaliar_recall(textos_a, textos_b, pares, amostra=amostra_recall)
+    return pares, estatisticas
@@ -0,0 +1,59 @@
+# modules/match_ledger.py
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+LADOS_CONCILIACAO = ('extrato', 'contabil')
+
+
+class MatchLedger:
+    """Estado de conciliação das linhas, compartilhado por todas as camadas de matching
+
+    Cada id distinto recebe um código denso (int32) e cada lado guarda uma máscara booleana de
+    linhas já conciliadas. Reivindicar um match custa O(1) por id e é recusado se tocar uma linha
+    já conciliada, então nenhuma camada ou estratégia concilia a mesma linha duas vezes.
+    """
+
+    def __init__(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame):
+        self._ids, self._codigos, self.conciliados = {}, {}, {}
+        for lado, df in zip(LADOS_CONCILIACAO, (extrato_df, contabil_df)):
+            # ids repetidos compartilham o código, como acontecia com o conjunto de ids casados
+            _, distintos = pd.factorize(df['id'], sort=False)
+            self._ids[lado] = pd.Index(distintos)
+            self._codigos[lado] = dict(zip(distintos.tolist(), range(len(distintos))))
+            self.conciliados[lado] = np.zeros(len(distintos), dtype=bool)
+
+    def codigos(self, lado: str, ids) -> np.ndarray:
+        """Códigos densos dos ids (-1 para ids fora do ledger)"""
+        return self._ids[lado].get_indexer(pd.Index(ids)).astype(np.int32)
+
+    def livres(self, df: pd.DataFrame, lado: str) -> np.ndarray:
+        """Máscara das linhas de df ainda não conciliadas"""
+        codigos = self.codigos(lado, df['id'])
+        livres = np.ones(len(df), dtype=bool)
+        conhecidos = codigos >= 0
+        livres[conhecidos] = ~self.conciliados[lado][codigos[conhecidos]]
+        return livres
+
+    def nao_conciliados(self, df: pd.DataFrame, lado: str) -> pd.DataFrame:
+        """Linhas de df ainda disponíveis para as próximas camadas"""
+        livres = self.livres(df, lado)
+        return df if livres.all() else df[livres]
+
+    def reivindicar(self, match: Dict) -> bool:
+        """Marca as linhas do match como conciliadas; recusa se alguma já estava"""
+        codigos = {}
+        for lado, chave in zip(LADOS_CONCILIACAO, ('ids_extrato', 'ids_contabil')):
+            codigos[lado] = [c for c in (self._codigos[lado].get(i, -1) for i in match[chave]) if c >= 0]
+            if self.conciliados[lado][codigos[lado]].any():
+                return False
+        for lado, codigos_lado in codigos.items():
+            self.conciliados[lado][codigos_lado] = True
+        return True
+
+    def registrar(self, matches: List[Dict]) -> List[Dict]:
+        """Reivindica os matches em ordem e devolve só os aceitos"""
+        return [match for match in matches if self.reivindicar(match)]
+
+    def total_conciliados(self, lado: str) -> int:
+        return int(self.conciliados[lado].sum())
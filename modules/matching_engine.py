@@ -0,0 +1,487 @@
+# modules/matching_engine.py
+import pandas as pd
+import numpy as np
+from time import perf_counter
+from typing import Dict, List, Tuple
+from modules.monetario import centavos_absolutos, centavos_para_valor, garantir_coluna_centavos
+from modules.subset_sum import SubsetSumSolver
+from modules.assignment_solver import AssignmentSolver
+
+
+def descricoes_posicionais(df: pd.DataFrame) -> List[str]:
+    """Lista de descrições na ordem das linhas (vazias quando ausentes)"""
+    if 'descricao' not in df.columns: return [''] * len(df)
+    return df['descricao'].fillna('').astype(str).tolist()
+
+
+def dia_ordinal(datas: pd.Series) -> np.ndarray:
+    """Converte datas para número de dias desde a época (descarta o horário)"""
+    return pd.to_datetime(datas).to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+
+
+def expandir_janelas(inicio: np.ndarray, fim: np.ndarray):
+    """Expande janelas [inicio, fim) em pares (linha, posição) sem laço Python"""
+    tamanhos = np.maximum(fim - inicio, 0)
+    total = int(tamanhos.sum())
+    linhas = np.repeat(np.arange(len(inicio)), tamanhos)
+    deslocamentos = np.arange(total) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+    return linhas, np.repeat(inicio, tamanhos) + deslocamentos
+
+
+def limites_tolerancia(centavos: np.ndarray, tolerancia_valor: float, tolerancia_relativa: float = 0.0):
+    """Janela [inferior, superior] de centavos compatíveis com cada valor
+
+    A tolerância relativa vale sobre o maior valor do par: |a - b| <= r * max(a, b) equivale a
+    |log a - log b| <= -log(1 - r), uma janela de largura fixa em escala logarítmica, que em
+    centavos vai de v * (1 - r) a v / (1 - r). A tolerância absoluta funciona como piso.
+    """
+    piso = int(round(tolerancia_valor * 100))
+    centavos = np.asarray(centavos, dtype=np.int64)
+    inferior, superior = centavos - piso, centavos + piso
+    if tolerancia_relativa > 0:
+        fator = 1 - min(float(tolerancia_relativa), 0.999)
+        inferior = np.minimum(inferior, np.ceil(centavos * fator - 1e-6).astype(np.int64))
+        superior = np.maximum(superior, np.floor(centavos / fator + 1e-6).astype(np.int64))
+    return inferior, superior
+
+
+def dentro_da_tolerancia(diff_centavos: np.ndarray, maior_centavos: np.ndarray,
+                         tolerancia_valor: float, tolerancia_relativa: float = 0.0) -> np.ndarray:
+    """Máscara dos pares com diferença até max(piso absoluto, tolerância relativa x maior valor do par)"""
+    limite = np.maximum(np.asarray(maior_centavos) * float(tolerancia_relativa) + 1e-6, int(round(tolerancia_valor * 100)))
+    return np.asarray(diff_centavos) <= limite
+
+
+class HashJoinEngine:
+    """Motor de junção por chave (hash join) usado pela camada exata"""
+
+    def __init__(self, camada: str = 'exata'):
+        self.camada = camada
+
+    def juntar_por_chave(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                         coluna_chave: str, rotulo: str, prefixo_chave: str,
+                         confianca: float = 100) -> List[Dict]:
+        """Agrupa os dois lados pela chave em uma única passada e emite grupos 1:1, 1:N, N:1 e N:M"""
+        if coluna_chave not in extrato_df.columns or coluna_chave not in contabil_df.columns:
+            return []
+
+        grupos_extrato = self._agrupar_por_chave(extrato_df, coluna_chave)
+        grupos_contabil = self._agrupar_por_chave(contabil_df, coluna_chave)
+        if grupos_extrato.empty or grupos_contabil.empty:
+            return []
+
+        grupos = grupos_extrato.join(grupos_contabil, how='inner', lsuffix='_extrato', rsuffix='_contabil')
+
+        matches = []
+        for chave, ids_extrato, valor_total, ids_contabil, _ in grupos.itertuples(name=None):
+            matches.append({
+                'tipo_match': self._tipo_por_multiplicidade(len(ids_extrato), len(ids_contabil)),
+                'camada': self.camada,
+                'ids_extrato': ids_extrato,
+                'ids_contabil': ids_contabil,
+                'valor_total': valor_total,
+                'confianca': confianca,
+                'explicacao': f"Match exato por {rotulo}: {chave}",
+                'chave_match': f"{prefixo_chave}_{chave}"
+            })
+        return matches
+
+    def juntar_por_chave_e_janela(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                                  coluna_chave: str, janela_dias: int, rotulo: str, prefixo_chave: str,
+                                  confianca: float = 100) -> List[Dict]:
+        """Hash join por (chave, centavos) com datas a até janela_dias; pares 1:1 pela menor distância de datas"""
+        if coluna_chave not in extrato_df.columns or coluna_chave not in contabil_df.columns:
+            return []
+
+        lado_extrato = self._chaves_com_valor(extrato_df, coluna_chave)
+        lado_contabil = self._chaves_com_valor(contabil_df, coluna_chave)
+        pares = lado_extrato.merge(lado_contabil, on=['chave', 'centavos'], suffixes=('_extrato', '_contabil'))
+        pares['diff_dias'] = (pares['dia_extrato'] - pares['dia_contabil']).abs()
+        pares = pares[pares['diff_dias'] <= janela_dias].sort_values(
+            ['diff_dias', 'posicao_extrato', 'posicao_contabil'], kind='mergesort')
+        if pares.empty:
+            return []
+
+        escolhidos = AssignmentSolver('gulosa').resolver(
+            pares['posicao_extrato'].to_numpy(), pares['posicao_contabil'].to_numpy(), np.ones(len(pares))
+        )
+        pares = pares.iloc[escolhidos].sort_values('posicao_extrato', kind='mergesort')
+
+        matches = []
+        colunas = ['chave', 'centavos', 'id_extrato', 'id_contabil', 'diff_dias']
+        for chave, centavos, id_extrato, id_contabil, diff_dias in pares[colunas].itertuples(index=False, name=None):
+            valor = centavos_para_valor(centavos)
+            matches.append({
+                'tipo_match': '1:1',
+                'camada': self.camada,
+                'ids_extrato': [id_extrato],
+                'ids_contabil': [id_contabil],
+                'valor_total': valor,
+                'confianca': confianca,
+                'explicacao': f"Match exato por {rotulo}: {chave} e valor (R$ {valor:.2f}), {diff_dias} dia(s) de diferença",
+                'chave_match': f"{prefixo_chave}_{chave}_{id_extrato}_{id_contabil}"
+            })
+        return matches
+
+    @staticmethod
+    def _chaves_com_valor(df: pd.DataFrame, coluna_chave: str) -> pd.DataFrame:
+        """Linhas com chave preenchida: chave, centavos absolutos, dia, posição e id"""
+        chaves = df[coluna_chave]
+        validos = (chaves.notna() & (chaves != "")).to_numpy()
+        return pd.DataFrame({
+            'chave': chaves.to_numpy()[validos],
+            'centavos': centavos_absolutos(df)[validos],
+            'dia': dia_ordinal(df['data'])[validos],
+            'posicao': np.flatnonzero(validos),
+            'id': df['id'].to_numpy()[validos]
+        })
+
+    def _agrupar_por_chave(self, df: pd.DataFrame, coluna_chave: str) -> pd.DataFrame:
+        """Agrupa ids e valores por chave, ignorando chaves vazias"""
+        df = garantir_coluna_centavos(df)
+        chaves = df[coluna_chave]
+        validos = df.loc[chaves.notna() & (chaves != ""), [coluna_chave, 'id', 'valor_centavos']]
+        grupos = validos.groupby(coluna_chave, sort=False).agg(ids=('id', list), valor_total=('valor_centavos', 'sum'))
+        grupos['valor_total'] = centavos_para_valor(grupos['valor_total'])
+        return grupos
+
+    @staticmethod
+    def _tipo_por_multiplicidade(n_extrato: int, n_contabil: int) -> str:
+        if n_extrato == 1 and n_contabil == 1: return '1:1'
+        if n_extrato == 1: return '1:N'
+        if n_contabil == 1: return 'N:1'
+        return 'N:M'
+
+
+class SortMergeMatcher:
+    """Matching exato por (centavos, dia) com pareamento ordenado de duplicatas"""
+
+    def __init__(self, camada: str = 'exata'):
+        self.camada = camada
+
+    def parear_valor_data(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
+        """Pareia linhas com mesmo valor e mesma data; a k-ésima ocorrência de um lado casa com a k-ésima do outro"""
+        if extrato_df.empty or contabil_df.empty:
+            return []
+
+        chaves_extrato = self._chaves_ordenadas(extrato_df)
+        chaves_contabil = self._chaves_ordenadas(contabil_df)
+        pares = chaves_extrato.merge(chaves_contabil, on=['centavos', 'dia', 'ocorrencia'],
+                                     suffixes=('_extrato', '_contabil'))
+        pares = pares.sort_values(['posicao_extrato'], kind='mergesort')
+
+        matches = []
+        colunas = ['centavos', 'dia', 'ocorrencia', 'id_extrato', 'total_extrato', 'id_contabil', 'total_contabil']
+        for centavos, dia, ocorrencia, id_extrato, total_extrato, id_contabil, total_contabil in pares[colunas].itertuples(
+                index=False, name=None):
+            valor = centavos_para_valor(centavos)
+            data_str = np.datetime64(int(dia), 'D')
+            duplicado = total_extrato > 1 or total_contabil > 1
+            explicacao = f"Match exato por valor (R$ {valor:.2f}) e data"
+            if duplicado:
+                explicacao += f" - ocorrência {ocorrencia + 1} de {max(total_extrato, total_contabil)}"
+            matches.append({
+                'tipo_match': '1:1', 'camada': self.camada,
+                'ids_extrato': [id_extrato],
+                'ids_contabil': [id_contabil],
+                'valor_total': valor,
+                'confianca': 90 if duplicado else 95,
+                'explicacao': explicacao,
+                'chave_match': f"VALOR_DATA_{valor}_{data_str}_{ocorrencia + 1}" if duplicado else f"VALOR_DATA_{valor}_{data_str}"
+            })
+        return matches
+
+    def _chaves_ordenadas(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Ordena por (centavos, dia, ordem original) e numera as ocorrências de cada chave"""
+        chaves = pd.DataFrame({
+            'centavos': centavos_absolutos(df),
+            'dia': dia_ordinal(df['data']),
+            'posicao': np.arange(len(df)),
+            'id': df['id'].to_numpy()
+        })
+        chaves = chaves.sort_values(['centavos', 'dia', 'posicao'], kind='mergesort')
+        grupos = chaves.groupby(['centavos', 'dia'], sort=False)
+        chaves['ocorrencia'] = grupos.cumcount()
+        chaves['total'] = grupos['posicao'].transform('size')
+        return chaves
+
+
+class FeeAwareMatcher:
+    """Matching de liquidações líquidas de taxa (MDR de cartão, tarifa de boleto) contra o valor bruto do ERP
+
+    A tabela de taxas traz, por meio de pagamento, a regex que o reconhece na descrição do extrato,
+    o percentual, a tarifa fixa e a janela de dias. Cada lançamento contábil vira uma chave
+    (meio, centavos líquidos esperados) - arredondando para baixo e para cima - e o extrato é
+    casado por hash join nessa chave, sem afrouxar a tolerância de valor das outras camadas.
+    """
+
+    def __init__(self, tabela_taxas: Dict[str, Dict], camada: str = 'exata', confianca: float = 90):
+        self.tabela_taxas = tabela_taxas or {}
+        self.camada = camada
+        self.confianca = confianca
+
+    def parear(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[Dict]:
+        """Pares 1:1 (extrato líquido, contábil bruto) pela menor distância de datas"""
+        if extrato_df.empty or contabil_df.empty or not self.tabela_taxas:
+            return []
+
+        lado_extrato = self._extrato_por_meio(extrato_df)
+        lado_contabil = self._liquidos_esperados(contabil_df)
+        if lado_extrato.empty or lado_contabil.empty:
+            return []
+        pares = lado_extrato.merge(lado_contabil, on=['meio', 'centavos'], suffixes=('_extrato', '_contabil'))
+        pares['diff_dias'] = (pares['dia_extrato'] - pares['dia_contabil']).abs()
+        pares = pares[pares['diff_dias'] <= pares['janela_dias']].sort_values(
+            ['diff_dias', 'posicao_extrato', 'posicao_contabil'], kind='mergesort')
+        if pares.empty:
+            return []
+
+        escolhidos = AssignmentSolver('gulosa').resolver(
+            pares['posicao_extrato'].to_numpy(), pares['posicao_contabil'].to_numpy(), np.ones(len(pares))
+        )
+        pares = pares.iloc[escolhidos].sort_values('posicao_extrato', kind='mergesort')
+
+        matches = []
+        colunas = ['meio', 'centavos', 'bruto', 'id_extrato', 'id_contabil', 'diff_dias']
+        for meio, centavos, bruto, id_extrato, id_contabil, diff_dias in pares[colunas].itertuples(index=False, name=None):
+            liquido, valor_bruto = centavos_para_valor(centavos), centavos_para_valor(bruto)
+            matches.append({
+                'tipo_match': '1:1',
+                'camada': self.camada,
+                'ids_extrato': [id_extrato],
+                'ids_contabil': [id_contabil],
+                'valor_total': liquido,
+                'confianca': self.confianca,
+                'explicacao': f"Match por valor líquido de taxa ({meio}): bruto R$ {valor_bruto:.2f} - taxa "
+                              f"R$ {valor_bruto - liquido:.2f} = R$ {liquido:.2f}, {diff_dias} dia(s) de diferença",
+                'chave_match': f"TAXA_{meio}_{id_extrato}_{id_contabil}"
+            })
+        return matches
+
+    def _extrato_por_meio(self, extrato_df: pd.DataFrame) -> pd.DataFrame:
+        """Linhas do extrato cuja descrição reconhece um meio de pagamento (uma linha por meio reconhecido)"""
+        descricoes = pd.Series(descricoes_posicionais(extrato_df))
+        centavos, dias, ids = centavos_absolutos(extrato_df), dia_ordinal(extrato_df['data']), extrato_df['id'].to_numpy()
+        partes = []
+        for meio, taxa in self.tabela_taxas.items():
+            if not taxa.get('descricao'):
+                continue
+            posicoes = np.flatnonzero(descricoes.str.contains(taxa['descricao'], case=False, regex=True).to_numpy())
+            partes.append(pd.DataFrame({'meio': meio, 'centavos': centavos[posicoes], 'dia': dias[posicoes],
+                                        'posicao': posicoes, 'id': ids[posicoes]}))
+        return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+    def _liquidos_esperados(self, contabil_df: pd.DataFrame) -> pd.DataFrame:
+        """Centavos líquidos esperados de cada lançamento em cada meio (piso e teto do valor com taxa)"""
+        brutos, dias, ids = centavos_absolutos(contabil_df), dia_ordinal(contabil_df['data']), contabil_df['id'].to_numpy()
+        posicoes = np.arange(len(contabil_df))
+        partes = []
+        for meio, taxa in self.tabela_taxas.items():
+            liquido = brutos * (1 - float(taxa.get('percentual', 0)) / 100) - round(float(taxa.get('fixa', 0)) * 100)
+            for arredondado in np.unique(np.stack([np.floor(liquido + 1e-6), np.ceil(liquido - 1e-6)]), axis=0):
+                validos = (arredondado > 0) & (arredondado != brutos)
+                partes.append(pd.DataFrame({'meio': meio, 'centavos': arredondado[validos].astype(np.int64),
+                                            'bruto': brutos[validos], 'dia': dias[validos], 'posicao': posicoes[validos],
+                                            'id': ids[validos], 'janela_dias': int(taxa.get('janela_dias', 2))}))
+        return pd.concat(partes, ignore_index=True).drop_duplicates(['meio', 'centavos', 'posicao'])
+
+
+class CandidateIndex:
+    """Índice de candidatos: valores ordenados por balde de data com janelas via searchsorted"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.centavos = centavos_absolutos(df)
+        self.dias = dia_ordinal(df['data'])
+        self._ordem = np.lexsort((self.centavos, self.dias))
+        self._base = int(self.centavos.max()) + 1 if len(df) else 1
+        self._chaves = self.dias[self._ordem] * self._base + self.centavos[self._ordem]
+
+    def pares(self, df: pd.DataFrame, tolerancia_valor: float, tolerancia_dias: int,
+              tolerancia_relativa: float = 0.0) -> pd.DataFrame:
+        """Retorna os pares (posição consulta, posição índice) dentro das tolerâncias de valor e data
+
+        tolerancia_valor é absoluta (R$); com tolerancia_relativa > 0 cada linha tem a sua janela
+        de valor, proporcional ao valor, e a absoluta passa a ser o piso.
+        """
+        centavos = centavos_absolutos(df)
+        dias = dia_ordinal(df['data'])
+        tolerancia_dias = int(tolerancia_dias)
+
+        if len(df) == 0 or len(self._chaves) == 0:
+            return self._montar_pares(np.empty(0, np.int64), np.empty(0, np.int64), centavos, dias)
+
+        limite_inferior, limite_superior = limites_tolerancia(centavos, tolerancia_valor, tolerancia_relativa)
+        limite_inferior = np.clip(limite_inferior, 0, self._base - 1)
+        limite_superior = np.clip(limite_superior, 0, self._base - 1)
+
+        posicoes_consulta, posicoes_indice = [], []
+        for deslocamento in range(-tolerancia_dias, tolerancia_dias + 1):
+            dia_alvo = dias + deslocamento
+            inicio = np.searchsorted(self._chaves, dia_alvo * self._base + limite_inferior, side='left')
+            fim = np.searchsorted(self._chaves, dia_alvo * self._base + limite_superior, side='right')
+            consulta, indice = expandir_janelas(inicio, fim)
+            posicoes_consulta.append(consulta)
+            posicoes_indice.append(self._ordem[indice])
+
+        consulta = np.concatenate(posicoes_consulta)
+        indice = np.concatenate(posicoes_indice)
+        # Janelas recortadas nas bordas podem trazer valores fora da tolerância
+        dentro = dentro_da_tolerancia(np.abs(centavos[consulta] - self.centavos[indice]),
+                                      np.maximum(centavos[consulta], self.centavos[indice]),
+                                      tolerancia_valor, tolerancia_relativa)
+        return self._montar_pares(consulta[dentro], indice[dentro], centavos, dias)
+
+    def _montar_pares(self, consulta: np.ndarray, indice: np.ndarray,
+                      centavos: np.ndarray, dias: np.ndarray) -> pd.DataFrame:
+        ordem = np.lexsort((indice, consulta))
+        consulta, indice = consulta[ordem], indice[ordem]
+        return pd.DataFrame({
+            'pos_extrato': consulta,
+            'pos_contabil': indice,
+            'diff_centavos': np.abs(centavos[consulta] - self.centavos[indice]),
+            'diff_dias': np.abs(dias[consulta] - self.dias[indice])
+        })
+
+
+class GroupSumMatcher:
+    """Agrupamento por soma: um lançamento contra vários do outro lado dentro de uma janela de datas"""
+
+    def __init__(self, solver: SubsetSumSolver = None):
+        self.solver = solver or SubsetSumSolver()
+        self.alvos_processados = np.zeros(0, dtype=np.int64)
+
+    def agrupar(self, alvos_df: pd.DataFrame, partes_df: pd.DataFrame,
+                tolerancia_centavos, janela_dias: int, prazo: float = None) -> List[Tuple[int, np.ndarray]]:
+        """Retorna (posição do alvo, posições das partes) sem reutilizar partes entre grupos
+
+        Com prazo (instante de perf_counter), os alvos que faltam quando ele passa ficam de fora;
+        as posições dos alvos examinados ficam em alvos_processados.
+        """
+        self.alvos_processados = np.arange(len(alvos_df))
+        if alvos_df.empty or len(partes_df) < 2:
+            return []
+
+        centavos_partes = centavos_absolutos(partes_df)
+        dias_partes = dia_ordinal(partes_df['data'])
+        ordem_dias = np.argsort(dias_partes, kind='mergesort')
+        dias_ordenados = dias_partes[ordem_dias]
+        partes_usadas = np.zeros(len(partes_df), dtype=bool)
+
+        centavos_alvos = centavos_absolutos(alvos_df)
+        dias_alvos = dia_ordinal(alvos_df['data'])
+        tolerancias = np.broadcast_to(np.asarray(tolerancia_centavos, dtype=np.int64), centavos_alvos.shape)
+        inicios = np.searchsorted(dias_ordenados, dias_alvos - janela_dias, side='left')
+        fins = np.searchsorted(dias_ordenados, dias_alvos + janela_dias, side='right')
+
+        grupos = []
+        # Alvos maiores primeiro: são os que mais dependem de vários itens pequenos
+        ordem_alvos = np.argsort(-centavos_alvos, kind='mergesort')
+        self.alvos_processados = ordem_alvos
+        for indice, pos_alvo in enumerate(ordem_alvos.tolist()):
+            if prazo is not None and perf_counter() >= prazo:
+                self.alvos_processados = ordem_alvos[:indice]
+                break
+            alvo, tolerancia = int(centavos_alvos[pos_alvo]), int(tolerancias[pos_alvo])
+            vizinhos = ordem_dias[inicios[pos_alvo]:fins[pos_alvo]]
+            vizinhos = vizinhos[~partes_usadas[vizinhos] & (centavos_partes[vizinhos] <= alvo + tolerancia)]
+            if len(vizinhos) < 2:
+                continue
+            # Os mais próximos em data têm prioridade quando a vizinhança excede o limite de candidatos
+            vizinhos = vizinhos[np.argsort(np.abs(dias_partes[vizinhos] - dias_alvos[pos_alvo]), kind='mergesort')]
+
+            grupo = self.solver.melhor_grupo(centavos_partes[vizinhos], alvo, tolerancia)
+            if grupo is None:
+                continue
+            posicoes = np.sort(vizinhos[grupo])
+            partes_usadas[posicoes] = True
+            grupos.append((pos_alvo, posicoes))
+        return grupos
+
+
+class CandidatePairs:
+    """Tabela colunar única de pares candidatos (extrato x contábil) compartilhada pelas camadas
+
+    Construída uma vez por análise com as tolerâncias mais folgadas; cada camada filtra os pares
+    das linhas que ainda recebe, nas suas próprias tolerâncias, sem reprocessar os DataFrames.
+    A similaridade de texto é calculada sob demanda e guardada por backend.
+    """
+
+    def __init__(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                 tolerancia_valor: float, tolerancia_dias: int, tolerancia_relativa: float = 0.0):
+        self.tolerancia_centavos = int(round(tolerancia_valor * 100))
+        self.tolerancia_relativa = float(tolerancia_relativa)
+        self.tolerancia_dias = int(tolerancia_dias)
+        self.ids_extrato = pd.Index(extrato_df['id'])
+        self.ids_contabil = pd.Index(contabil_df['id'])
+        self.descricoes_extrato = descricoes_posicionais(extrato_df)
+        self.descricoes_contabil = descricoes_posicionais(contabil_df)
+
+        pares = CandidateIndex(contabil_df).pares(extrato_df, tolerancia_valor, tolerancia_dias, tolerancia_relativa)
+        self.pos_extrato = pares['pos_extrato'].to_numpy()
+        self.pos_contabil = pares['pos_contabil'].to_numpy()
+        self.diff_centavos = pares['diff_centavos'].to_numpy()
+        self.maior_centavos = np.maximum(centavos_absolutos(extrato_df)[self.pos_extrato],
+                                         centavos_absolutos(contabil_df)[self.pos_contabil])
+        self.diff_dias = pares['diff_dias'].to_numpy()
+        self._similaridades = {}
+        self._textos = {}
+
+    def __len__(self) -> int:
+        return len(self.pos_extrato)
+
+    def cobre(self, tolerancia_valor: float, tolerancia_dias: int, tolerancia_relativa: float = 0.0) -> bool:
+        """Indica se a tabela contém todos os pares dessas tolerâncias (ids únicos e janelas mais largas)"""
+        return (self.ids_extrato.is_unique and self.ids_contabil.is_unique
+                and int(round(tolerancia_valor * 100)) <= self.tolerancia_centavos
+                and float(tolerancia_relativa) <= self.tolerancia_relativa
+                and int(tolerancia_dias) <= self.tolerancia_dias)
+
+    def filtrar(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                tolerancia_valor: float, tolerancia_dias: int, tolerancia_relativa: float = 0.0) -> pd.DataFrame:
+        """Pares entre as linhas recebidas (posições locais) dentro das tolerâncias, no formato do CandidateIndex"""
+        local_extrato = self._posicoes_locais(self.ids_extrato, extrato_df)
+        local_contabil = self._posicoes_locais(self.ids_contabil, contabil_df)
+        pe, pc = local_extrato[self.pos_extrato], local_contabil[self.pos_contabil]
+        dentro = np.flatnonzero((pe >= 0) & (pc >= 0)
+                                & dentro_da_tolerancia(self.diff_centavos, self.maior_centavos,
+                                                       tolerancia_valor, tolerancia_relativa)
+                                & (self.diff_dias <= int(tolerancia_dias)))
+        dentro = dentro[np.lexsort((pc[dentro], pe[dentro]))]
+        return pd.DataFrame({
+            'pos_extrato': pe[dentro],
+            'pos_contabil': pc[dentro],
+            'diff_centavos': self.diff_centavos[dentro],
+            'diff_dias': self.diff_dias[dentro],
+            'indice_par': dentro
+        })
+
+    def similaridades(self, indices_pares: np.ndarray, backend: str = 'sequencematcher') -> np.ndarray:
+        """Similaridade de texto dos pares indicados, calculando só os que ainda não foram vistos"""
+        from modules.text_similarity import TextSimilarity
+        if backend not in self._similaridades:
+            self._similaridades[backend] = np.full(len(self), np.nan)
+            self._textos[backend] = TextSimilarity(backend).ajustar(self.descricoes_extrato, self.descricoes_contabil)
+        cache = self._similaridades[backend]
+        indices_pares = np.asarray(indices_pares, dtype=np.int64)
+        faltantes = np.unique(indices_pares[np.isnan(cache[indices_pares])])
+        if len(faltantes):
+            cache[faltantes] = self._textos[backend].similaridade_pares(self.pos_extrato[faltantes], self.pos_contabil[faltantes])
+        return cache[indices_pares]
+
+    @staticmethod
+    def _posicoes_locais(ids_base: pd.Index, df: pd.DataFrame) -> np.ndarray:
+        """Para cada posição da base, a posição da mesma linha em df (-1 se ausente)"""
+        locais = np.full(len(ids_base), -1, dtype=np.int64)
+        na_base = ids_base.get_indexer(df['id'])
+        presentes = na_base >= 0
+        locais[na_base[presentes]] = np.flatnonzero(presentes)
+        return locais
+
+
+def pares_na_janela(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, tolerancia_valor: float,
+                    tolerancia_dias: int, pares_candidatos: 'CandidatePairs' = None,
+                    tolerancia_relativa: float = 0.0) -> pd.DataFrame:
+    """Pares candidatos dentro das tolerâncias: filtra a tabela compartilhada ou, sem ela, indexa os frames"""
+    if pares_candidatos is not None and pares_candidatos.cobre(tolerancia_valor, tolerancia_dias, tolerancia_relativa):
+        return pares_candidatos.filtrar(extrato_df, contabil_df, tolerancia_valor, tolerancia_dias, tolerancia_relativa)
+    return CandidateIndex(contabil_df).pares(extrato_df, tolerancia_valor, tolerancia_dias, tolerancia_relativa)
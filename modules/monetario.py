@@ -0,0 +1,35 @@
+# modules/monetario.py
+import pandas as pd
+import numpy as np
+
+
+def valor_para_centavos(valores: pd.Series) -> pd.Series:
+    """Converte valores monetários para centavos inteiros (int64, com sinal; inválidos viram 0)"""
+    numeros = pd.to_numeric(valores, errors='coerce').fillna(0).to_numpy(dtype=float)
+    return pd.Series(np.rint(numeros * 100).astype(np.int64), index=valores.index)
+
+
+def centavos_para_valor(centavos) -> float:
+    """Converte centavos inteiros para reais (apenas para exibição)"""
+    return centavos / 100
+
+
+def garantir_coluna_centavos(df: pd.DataFrame) -> pd.DataFrame:
+    """Garante a coluna 'valor_centavos' derivada de 'valor'
+
+    Uma coluna existente que não bate mais com 'valor' (editado depois da primeira chamada)
+    é recalculada; sem 'valor', a coluna existente é mantida.
+    """
+    if 'valor' not in df.columns:
+        return df
+    centavos = valor_para_centavos(df['valor'])
+    if 'valor_centavos' in df.columns and np.array_equal(df['valor_centavos'].to_numpy(), centavos.to_numpy()):
+        return df
+    df = df.copy()
+    df['valor_centavos'] = centavos
+    return df
+
+
+def centavos_absolutos(df: pd.DataFrame) -> np.ndarray:
+    """Centavos absolutos posicionais de 'valor' ('valor_centavos' só quando não há 'valor')"""
+    return np.abs(garantir_coluna_centavos(df)['valor_centavos'].to_numpy(dtype=np.int64))
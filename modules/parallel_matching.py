@@ -0,0 +1,485 @@
+# modules/parallel_matching.py
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterator, List, Tuple
+from modules.matching_engine import dia_ordinal
+
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    SCIPY_DISPONIVEL = True
+except ImportError:
+    SCIPY_DISPONIVEL = False
+
+
+class ComponentParallelMatcher:
+    """Resolve o grafo bipartido de pares candidatos por componentes conexos, em processos
+
+    Linhas de componentes diferentes não têm nenhum par em comum, então cada componente pode ser
+    pontuado e atribuído sozinho com o mesmo resultado do grafo inteiro. Os componentes são
+    reunidos em lotes de tamanho fixo (independente do número de processos) e os pares escolhidos
+    voltam na ordem das linhas do extrato, como na execução serial.
+    """
+
+    def __init__(self, processos: int = None, linhas_por_lote: int = 2000, pares_minimos: int = 20000):
+        self.processos = processos
+        self.linhas_por_lote = linhas_por_lote
+        self.pares_minimos = pares_minimos
+
+    def componentes(self, pares: pd.DataFrame, n_extrato: int, n_contabil: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rótulo do componente de cada linha do extrato e do contábil (-1 para linhas sem pares)"""
+        pos_extrato = pares['pos_extrato'].to_numpy(dtype=np.int64)
+        pos_contabil = pares['pos_contabil'].to_numpy(dtype=np.int64)
+        # Nós 0..n_extrato-1 são o extrato e os seguintes o contábil
+        grafo = coo_matrix((np.ones(len(pares), dtype=np.int8), (pos_extrato, n_extrato + pos_contabil)),
+                           shape=(n_extrato + n_contabil, n_extrato + n_contabil))
+        _, rotulos = connected_components(grafo, directed=False)
+        com_pares = np.zeros(n_extrato + n_contabil, dtype=bool)
+        com_pares[pos_extrato] = True
+        com_pares[n_extrato + pos_contabil] = True
+        rotulos = np.where(com_pares, rotulos, -1)
+        return rotulos[:n_extrato], rotulos[n_extrato:]
+
+    def lotes(self, rotulos_extrato: np.ndarray, rotulos_contabil: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Posições (extrato, contábil) de cada lote: componentes inteiros, na ordem de aparição"""
+        rotulos = np.concatenate([rotulos_extrato, rotulos_contabil])
+        validos = rotulos[rotulos >= 0]
+        if len(validos) == 0:
+            return []
+        distintos, primeira = np.unique(validos, return_index=True)
+        tamanhos = np.bincount(np.searchsorted(distintos, validos), minlength=len(distintos))
+        ordem = np.argsort(primeira, kind='mergesort')
+        # Lote de cada componente pelo total acumulado de linhas
+        lote_ordenado = (np.cumsum(tamanhos[ordem]) - tamanhos[ordem]) // self.linhas_por_lote
+        lote = np.empty(len(distintos), dtype=np.int64)
+        lote[ordem] = lote_ordenado
+
+        lote_extrato = np.full(len(rotulos_extrato), -1, dtype=np.int64)
+        lote_contabil = np.full(len(rotulos_contabil), -1, dtype=np.int64)
+        com_pares = rotulos_extrato >= 0
+        lote_extrato[com_pares] = lote[np.searchsorted(distintos, rotulos_extrato[com_pares])]
+        com_pares = rotulos_contabil >= 0
+        lote_contabil[com_pares] = lote[np.searchsorted(distintos, rotulos_contabil[com_pares])]
+        return [(np.flatnonzero(lote_extrato == k), np.flatnonzero(lote_contabil == k))
+                for k in range(int(lote.max()) + 1)]
+
+    def resolver(self, colunas: Dict[str, np.ndarray], n_extrato: int, n_contabil: int,
+                 funcao: Callable, argumentos: tuple = ()) -> Tuple[np.ndarray, np.ndarray]:
+        """Aplica funcao(colunas, indices_pares, *argumentos) a cada lote e junta os escolhidos
+
+        colunas traz os pares em posições globais ('pos_extrato', 'pos_contabil', 'diff_centavos',
+        'diff_dias') e as demais colunas numéricas de que funcao precisa; funcao (de nível de módulo)
+        devolve os índices dos pares escolhidos e as suas pontuações. As colunas vão aos processos
+        por memória compartilhada e os escolhidos voltam na ordem das linhas do extrato. Abaixo de
+        pares_minimos, ou sem scipy, roda uma vez no processo atual.
+        """
+        todos = np.arange(len(colunas['pos_extrato']), dtype=np.int64)
+        if not SCIPY_DISPONIVEL or self.processos == 1 or len(todos) < self.pares_minimos:
+            return funcao(colunas, todos, *argumentos)
+
+        lotes = self._pares_por_lote(colunas['pos_extrato'], colunas['pos_contabil'], n_extrato, n_contabil)
+        if len(lotes) < 2:
+            return funcao(colunas, todos, *argumentos)
+
+        with SharedColumns(colunas) as compartilhadas, ProcessPoolExecutor(max_workers=self.processos) as executor:
+            futuros = [executor.submit(_resolver_lote, funcao, compartilhadas.descritor, indices, argumentos)
+                       for indices in lotes]
+            resultados = [futuro.result() for futuro in futuros]
+        escolhidos = np.concatenate([indices for indices, _ in resultados])
+        pontuacoes = np.concatenate([pontuacao for _, pontuacao in resultados])
+        ordem = np.argsort(colunas['pos_extrato'][escolhidos], kind='mergesort')
+        return escolhidos[ordem], pontuacoes[ordem]
+
+    def _pares_por_lote(self, pos_extrato: np.ndarray, pos_contabil: np.ndarray,
+                        n_extrato: int, n_contabil: int) -> List[np.ndarray]:
+        """Índices dos pares de cada lote (as duas pontas de um par estão sempre no mesmo componente)"""
+        pares = pd.DataFrame({'pos_extrato': pos_extrato, 'pos_contabil': pos_contabil})
+        lotes = self.lotes(*self.componentes(pares, n_extrato, n_contabil))
+        lote_linha = np.full(n_extrato, -1, dtype=np.int64)
+        for k, (linhas_extrato, _) in enumerate(lotes):
+            lote_linha[linhas_extrato] = k
+        lote_par = lote_linha[pos_extrato]
+        ordem = np.argsort(lote_par, kind='mergesort')
+        return np.split(ordem, np.cumsum(np.bincount(lote_par, minlength=len(lotes)))[:-1])
+
+
+class SharedColumns:
+    """Colunas numéricas copiadas uma vez para um bloco de multiprocessing.shared_memory
+
+    Os processos recebem só o descritor (nome do bloco e dtype, forma e deslocamento de cada
+    coluna) e montam arrays sobre o próprio bloco, sem cópia nem pickle dos DataFrames. O bloco
+    é liberado na saída do with.
+    """
+
+    ALINHAMENTO = 64
+
+    def __init__(self, colunas: Dict[str, np.ndarray]):
+        colunas = {chave: np.ascontiguousarray(array) for chave, array in colunas.items()}
+        layout, tamanho = [], 0
+        for chave, array in colunas.items():
+            tamanho = -(-tamanho // self.ALINHAMENTO) * self.ALINHAMENTO
+            layout.append((chave, array.dtype.str, array.shape, tamanho))
+            tamanho += array.nbytes
+        self.bloco = shared_memory.SharedMemory(create=True, size=max(tamanho, 1))
+        for chave, dtype, forma, deslocamento in layout:
+            np.ndarray(forma, dtype, buffer=self.bloco.buf, offset=deslocamento)[...] = colunas[chave]
+        self.descritor = (self.bloco.name, layout)
+
+    def __enter__(self) -> 'SharedColumns':
+        return self
+
+    def __exit__(self, *excecao):
+        self.bloco.close()
+        self.bloco.unlink()
+
+
+@contextmanager
+def colunas_anexadas(descritor: tuple) -> Iterator[Dict[str, np.ndarray]]:
+    """Arrays sobre o bloco compartilhado descrito por SharedColumns.descritor (somente leitura)"""
+    nome, layout = descritor
+    bloco = shared_memory.SharedMemory(name=nome)
+    colunas = {}
+    for chave, dtype, forma, deslocamento in layout:
+        colunas[chave] = np.ndarray(forma, dtype, buffer=bloco.buf, offset=deslocamento)
+        colunas[chave].flags.writeable = False
+    try:
+        yield colunas
+    finally:
+        # Nenhuma view pode sobreviver ao close do bloco
+        colunas.clear()
+        bloco.close()
+
+
+def _resolver_lote(funcao: Callable, descritor: tuple, indices_pares: np.ndarray,
+                   argumentos: tuple) -> Tuple[np.ndarray, np.ndarray]:
+    with colunas_anexadas(descritor) as colunas:
+        escolhidos, pontuacoes = funcao(colunas, indices_pares, *argumentos)
+        return np.array(escolhidos, dtype=np.int64), np.array(pontuacoes, dtype=float)
+
+
+def colunas_dos_pares(pares: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Colunas dos pares candidatos no formato de ComponentParallelMatcher.resolver"""
+    return {coluna: pares[coluna].to_numpy(dtype=np.int64)
+            for coluna in ('pos_extrato', 'pos_contabil', 'diff_centavos', 'diff_dias')}
+
+
+def colunas_de_textos(textos: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Textos como bytes UTF-8 concatenados e os deslocamentos de cada um (n + 1)"""
+    codificados = [texto.encode('utf-8') for texto in textos]
+    deslocamentos = np.zeros(len(codificados) + 1, dtype=np.int64)
+    np.cumsum([len(texto) for texto in codificados], out=deslocamentos[1:])
+    return np.frombuffer(b''.join(codificados), dtype=np.uint8), deslocamentos
+
+
+def textos_das_colunas(dados: np.ndarray, deslocamentos: np.ndarray, posicoes: np.ndarray) -> List[str]:
+    """Decodifica só os textos das posições pedidas"""
+    return [bytes(dados[inicio:fim]).decode('utf-8')
+            for inicio, fim in zip(deslocamentos[posicoes].tolist(), deslocamentos[np.asarray(posicoes) + 1].tolist())]
+
+
+# Janela de datas dos pares candidatos compartilhados pelas camadas heurística e IA
+TOLERANCIA_DIAS_PARES = 3
+
+# Parâmetros das três camadas, os mesmos fixados na página de análise
+PARAMETROS_CONCILIACAO_PADRAO = {
+    'tolerancia_dias': 2,
+    'tolerancia_valor': 0.01,
+    'tolerancia_relativa': 0.02,
+    'similaridade_minima': 70,
+    'estrategia_atribuicao': 'otima',
+    'estrategia_atribuicao_ia': 'otima',
+    'permite_1n': True,
+    'permite_n1': True,
+    'backend_similaridade': 'sequencematcher',
+    'blocagem_lsh': False,
+    'tabela_taxas': None,
+    'prazo_ia_segundos': None
+}
+
+
+class AccountBatchReconciler:
+    """Conciliação em lote de várias contas bancárias, uma conta por processo
+
+    Linhas de contas diferentes nunca casam entre si, então cada conta com extrato (B_) e
+    contábil (C_) passa pelas camadas exata, heurística e IA sozinha. As contas mais volumosas
+    são enviadas primeiro e os resultados voltam ordenados pelo número da conta.
+    """
+
+    def __init__(self, processos: int = None, coluna_conta: str = 'conta_bancaria', **parametros):
+        self.processos = processos
+        self.coluna_conta = coluna_conta
+        self.parametros = {**PARAMETROS_CONCILIACAO_PADRAO, **parametros}
+
+    def contas(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> List[str]:
+        """Contas presentes nos dois lados, em ordem"""
+        if self.coluna_conta not in extrato_df.columns or self.coluna_conta not in contabil_df.columns:
+            return []
+        return sorted(set(extrato_df[self.coluna_conta].astype(str)) & set(contabil_df[self.coluna_conta].astype(str)))
+
+    def conciliar(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> Dict:
+        """Resultados por conta, resumo por conta (DataFrame) e totais do lote"""
+        contas = self.contas(extrato_df, contabil_df)
+        contas_extrato = extrato_df[self.coluna_conta].astype(str) if self.coluna_conta in extrato_df.columns else pd.Series(dtype=str)
+        contas_contabil = contabil_df[self.coluna_conta].astype(str) if self.coluna_conta in contabil_df.columns else pd.Series(dtype=str)
+        tarefas = {conta: (extrato_df[(contas_extrato == conta).to_numpy()], contabil_df[(contas_contabil == conta).to_numpy()])
+                   for conta in contas}
+
+        if self.processos == 1 or len(tarefas) < 2:
+            resultados = {conta: conciliar_conta(extrato, contabil, self.parametros) for conta, (extrato, contabil) in tarefas.items()}
+        else:
+            # Maiores primeiro, para a última conta a terminar não ser uma das grandes
+            ordem = sorted(tarefas, key=lambda conta: -(len(tarefas[conta][0]) + len(tarefas[conta][1])))
+            with ProcessPoolExecutor(max_workers=self.processos) as executor:
+                futuros = {conta: executor.submit(conciliar_conta, *tarefas[conta], self.parametros) for conta in ordem}
+                resultados = {conta: futuros[conta].result() for conta in contas}
+
+        ignoradas = sorted((set(contas_extrato) ^ set(contas_contabil)) - set(contas))
+        resumo = self._resumo(resultados)
+        return {'contas': resultados, 'resumo': resumo, 'totais': self._totais(resumo), 'contas_ignoradas': ignoradas}
+
+    @staticmethod
+    def _resumo(resultados: Dict[str, Dict]) -> pd.DataFrame:
+        linhas = []
+        for conta, resultado in resultados.items():
+            estatisticas = resultado['resultados']['estatisticas']
+            linhas.append({
+                'conta': conta,
+                'transacoes_extrato': resultado['transacoes_extrato'],
+                'lancamentos_contabeis': resultado['lancamentos_contabeis'],
+                'matches': estatisticas['total_matches'],
+                'matches_exatos': estatisticas['matches_exatos'],
+                'matches_heuristicos': estatisticas['matches_heuristicos'],
+                'matches_ia': estatisticas['matches_ia'],
+                'extrato_conciliado': resultado['transacoes_extrato'] - len(resultado['nao_matchados_extrato']),
+                'excecoes': estatisticas['total_excecoes'],
+                'tempo_segundos': round(resultado['tempo_segundos'], 2)
+            })
+        colunas = ['conta', 'transacoes_extrato', 'lancamentos_contabeis', 'matches', 'matches_exatos',
+                   'matches_heuristicos', 'matches_ia', 'extrato_conciliado', 'excecoes', 'tempo_segundos']
+        resumo = pd.DataFrame(linhas, columns=colunas)
+        resumo['cobertura_extrato'] = (resumo['extrato_conciliado'] / resumo['transacoes_extrato'].clip(lower=1) * 100).round(1)
+        return resumo
+
+    @staticmethod
+    def _totais(resumo: pd.DataFrame) -> Dict:
+        totais = {coluna: int(resumo[coluna].sum()) for coluna in
+                  ('transacoes_extrato', 'lancamentos_contabeis', 'matches', 'extrato_conciliado', 'excecoes')}
+        totais['contas'] = len(resumo)
+        totais['cobertura_extrato'] = round(totais['extrato_conciliado'] / max(totais['transacoes_extrato'], 1) * 100, 1)
+        return totais
+
+
+def conciliar_conta(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, parametros: Dict,
+                    identificadores: bool = True) -> Dict:
+    """Camadas exata, heurística e IA de uma conta (executada nos processos do AccountBatchReconciler)
+
+    identificadores=False pula as etapas exatas por identificador, já feitas sobre a conta inteira
+    quando a conta é conciliada em fatias de datas.
+    """
+    import modules.data_analyzer as analyzer
+    from time import perf_counter
+
+    inicio = perf_counter()
+    extrato_df, contabil_df = _preparar_frames(extrato_df, contabil_df)
+
+    p = parametros
+    ledger = analyzer.criar_ledger(extrato_df, contabil_df)
+    pares_candidatos = analyzer.construir_pares_candidatos(
+        extrato_df, contabil_df, tolerancia_valor=max(p['tolerancia_valor'], 0.05),
+        tolerancia_dias=TOLERANCIA_DIAS_PARES, tolerancia_relativa=p['tolerancia_relativa']
+    )
+    resultados_exato = analyzer.matching_exato(extrato_df, contabil_df, ledger=ledger, tabela_taxas=p['tabela_taxas'],
+                                               identificadores=identificadores)
+    resultados_heuristico = analyzer.matching_heuristico(
+        extrato_df, contabil_df, resultados_exato['nao_matchados_extrato'], resultados_exato['nao_matchados_contabil'],
+        tolerancia_dias=p['tolerancia_dias'], tolerancia_valor=p['tolerancia_valor'],
+        similaridade_minima=p['similaridade_minima'], estrategia_atribuicao=p['estrategia_atribuicao'],
+        permite_1n=p['permite_1n'], permite_n1=p['permite_n1'], backend_similaridade=p['backend_similaridade'],
+        blocagem_lsh=p['blocagem_lsh'], pares_candidatos=pares_candidatos, ledger=ledger,
+        tolerancia_relativa=p['tolerancia_relativa']
+    )
+    resultados_ia = analyzer.matching_ia(
+        extrato_df, contabil_df, resultados_heuristico['nao_matchados_extrato'], resultados_heuristico['nao_matchados_contabil'],
+        estrategia_atribuicao=p['estrategia_atribuicao_ia'], blocagem_lsh=p['blocagem_lsh'],
+        pares_candidatos=pares_candidatos, ledger=ledger, prazo_segundos=p['prazo_ia_segundos']
+    )
+    return {
+        'resultados': analyzer.consolidar_resultados(resultados_exato, resultados_heuristico, resultados_ia),
+        'nao_matchados_extrato': ledger.nao_conciliados(extrato_df, 'extrato'),
+        'nao_matchados_contabil': ledger.nao_conciliados(contabil_df, 'contabil'),
+        'transacoes_extrato': len(extrato_df),
+        'lancamentos_contabeis': len(contabil_df),
+        'tempo_segundos': perf_counter() - inicio
+    }
+
+
+# Ordem de preferência das camadas quando matches de fatias vizinhas disputam a mesma linha
+PRIORIDADE_CAMADAS = {'exata': 0, 'heuristica': 1}
+
+
+class DateShardedMatcher:
+    """Conciliação de uma conta grande em fatias de datas processadas em paralelo
+
+    As etapas exatas por identificador (FITID, PIX, NSU, boletos) não têm limite de datas e rodam
+    antes, uma vez sobre a conta inteira; as fatias recebem só as linhas que elas deixaram livres.
+    Cada fatia [início, fim) recebe também as linhas de um halo de halo_dias (a maior tolerância
+    de datas das camadas) de cada lado, para que pares que cruzam a fronteira sejam vistos. Uma
+    fatia só fica com os matches ancorados (linha do extrato mais antiga) no seu núcleo; quando
+    matches de fatias vizinhas disputam uma linha do halo, vence a camada mais forte, depois a
+    maior confiança e depois a fatia anterior. As linhas livres perto das fronteiras passam por
+    uma última rodada serial.
+    """
+
+    def __init__(self, processos: int = None, dias_por_fatia: int = 7, halo_dias: int = None, **parametros):
+        self.processos = processos
+        self.dias_por_fatia = dias_por_fatia
+        self.parametros = {**PARAMETROS_CONCILIACAO_PADRAO, **parametros}
+        self.halo_dias = self.maior_tolerancia_dias() if halo_dias is None else halo_dias
+
+    def maior_tolerancia_dias(self) -> int:
+        """Maior janela de datas usada por alguma camada fatiada
+
+        Pares candidatos, documentos, heurística, taxas (janela de cada meio) e IA, cujo
+        agrupamento N:1 busca as partes em FATOR_JANELA_AGRUPAMENTO vezes a tolerância da camada.
+        """
+        import modules.data_analyzer as analyzer
+        from modules.ai_matcher import FATOR_JANELA_AGRUPAMENTO, TOLERANCIA_DIAS_IA
+
+        janelas_taxas = [regra.get('janela_dias', 0) for regra in (self.parametros['tabela_taxas'] or {}).values()]
+        return int(max([TOLERANCIA_DIAS_PARES, analyzer.DataAnalyzer().janela_documento_dias,
+                        self.parametros['tolerancia_dias'], TOLERANCIA_DIAS_IA * FATOR_JANELA_AGRUPAMENTO,
+                        *janelas_taxas]))
+
+    def fatias(self, dias: np.ndarray) -> List[Tuple[int, int]]:
+        """Intervalos [início, fim) de dias que cobrem o período"""
+        if len(dias) == 0:
+            return []
+        inicio, fim = int(dias.min()), int(dias.max()) + 1
+        return [(d, min(d + self.dias_por_fatia, fim)) for d in range(inicio, fim, self.dias_por_fatia)]
+
+    def conciliar(self, extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> Dict:
+        """Mesmo formato de conciliar_conta, com o número de fatias e de conflitos resolvidos"""
+        import modules.data_analyzer as analyzer
+        from modules.match_ledger import MatchLedger
+        from time import perf_counter
+
+        inicio_execucao = perf_counter()
+        extrato_df, contabil_df = _preparar_frames(extrato_df, contabil_df)
+        dias_extrato, dias_contabil = dia_ordinal(extrato_df['data']), dia_ordinal(contabil_df['data'])
+        fatias = self.fatias(np.concatenate([dias_extrato, dias_contabil]))
+        if len(fatias) < 2:
+            return conciliar_conta(extrato_df, contabil_df, self.parametros)
+
+        # Identificadores pareiam linhas a qualquer distância de datas: hash join único sobre a conta
+        ledger = MatchLedger(extrato_df, contabil_df)
+        matches = analyzer.matching_exato(extrato_df, contabil_df, ledger=ledger, por_janela=False)['matches']
+        livres_extrato, livres_contabil = ledger.livres(extrato_df, 'extrato'), ledger.livres(contabil_df, 'contabil')
+
+        tarefas = []
+        for inicio, fim in fatias:
+            tarefas.append((
+                extrato_df[livres_extrato & (dias_extrato >= inicio - self.halo_dias) & (dias_extrato < fim + self.halo_dias)],
+                contabil_df[livres_contabil & (dias_contabil >= inicio - self.halo_dias) & (dias_contabil < fim + self.halo_dias)],
+                self.parametros,
+                False
+            ))
+        if self.processos == 1:
+            resultados = [conciliar_conta(*tarefa) for tarefa in tarefas]
+        else:
+            with ProcessPoolExecutor(max_workers=self.processos) as executor:
+                resultados = list(executor.map(conciliar_conta, *zip(*tarefas)))
+
+        # Cada fatia fica com os matches ancorados no seu núcleo
+        dia_extrato = dict(zip(extrato_df['id'].tolist(), dias_extrato.tolist()))
+        dia_contabil = dict(zip(contabil_df['id'].tolist(), dias_contabil.tolist()))
+        candidatos = []
+        for indice_fatia, ((inicio, fim), resultado) in enumerate(zip(fatias, resultados)):
+            for ordem, match in enumerate(resultado['resultados']['matches']):
+                dias = [dia_extrato[i] for i in match['ids_extrato']] or [dia_contabil[i] for i in match['ids_contabil']]
+                if inicio <= min(dias) < fim:
+                    candidatos.append((PRIORIDADE_CAMADAS.get(match['camada'], 2), -float(match['confianca']),
+                                       indice_fatia, ordem, match))
+        candidatos.sort(key=lambda candidato: candidato[:4])
+        registrados = ledger.registrar([candidato[-1] for candidato in candidatos])
+        conflitos = len(candidatos) - len(registrados)
+        matches.extend(registrados)
+
+        # Linhas livres perto das fronteiras podiam ter par no matches recusado: última rodada serial
+        fronteiras = np.array([inicio for inicio, _ in fatias[1:]])
+        perto_extrato = self._perto_das_fronteiras(dias_extrato, fronteiras) & ledger.livres(extrato_df, 'extrato')
+        perto_contabil = self._perto_das_fronteiras(dias_contabil, fronteiras) & ledger.livres(contabil_df, 'contabil')
+        if perto_extrato.any() and perto_contabil.any():
+            reparo = conciliar_conta(extrato_df[perto_extrato], contabil_df[perto_contabil], self.parametros,
+                                     identificadores=False)
+            matches.extend(ledger.registrar(reparo['resultados']['matches']))
+
+        nao_matchados_extrato = ledger.nao_conciliados(extrato_df, 'extrato')
+        nao_matchados_contabil = ledger.nao_conciliados(contabil_df, 'contabil')
+        excecoes = analyzer.DataAnalyzer()._identificar_excecoes_melhorado(nao_matchados_extrato, nao_matchados_contabil)
+        camadas = pd.Series([match['camada'] for match in matches], dtype=object)
+        return {
+            'resultados': {
+                'matches': matches,
+                'excecoes': excecoes,
+                'estatisticas': {
+                    'total_matches': len(matches),
+                    'matches_exatos': int((camadas == 'exata').sum()),
+                    'matches_heuristicos': int((camadas == 'heuristica').sum()),
+                    'matches_ia': int(camadas.str.startswith('ia').sum()),
+                    'total_excecoes': len(excecoes)
+                }
+            },
+            'nao_matchados_extrato': nao_matchados_extrato,
+            'nao_matchados_contabil': nao_matchados_contabil,
+            'transacoes_extrato': len(extrato_df),
+            'lancamentos_contabeis': len(contabil_df),
+            'fatias': len(fatias),
+            'conflitos_halo': conflitos,
+            'tempo_segundos': perf_counter() - inicio_execucao
+        }
+
+    def _perto_das_fronteiras(self, dias: np.ndarray, fronteiras: np.ndarray) -> np.ndarray:
+        """Linhas a até 2 halos de alguma fronteira entre fatias"""
+        posicoes = np.searchsorted(fronteiras, dias)
+        anterior = np.abs(dias - fronteiras[np.clip(posicoes - 1, 0, len(fronteiras) - 1)])
+        seguinte = np.abs(dias - fronteiras[np.clip(posicoes, 0, len(fronteiras) - 1)])
+        return np.minimum(anterior, seguinte) <= 2 * self.halo_dias
+
+
+def _preparar_frames(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Frames de uma conta prontos para as camadas: tipados, sem transferências internas e com id e centavos"""
+    import modules.data_analyzer as analyzer
+
+    extrato_df, contabil_df = _preparar_conta(extrato_df), _preparar_conta(contabil_df)
+    if 'transferencia_interna' in extrato_df.columns:
+        # Transferências entre contas próprias não têm contrapartida contábil a buscar
+        extrato_df = extrato_df[~extrato_df['transferencia_interna'].fillna(False).astype(bool)].reset_index(drop=True)
+    analisador = analyzer.DataAnalyzer()
+    return (analisador._garantir_coluna_id(extrato_df, "extrato_df"),
+            analisador._garantir_coluna_id(contabil_df, "contabil_df"))
+
+
+def _preparar_conta(df: pd.DataFrame) -> pd.DataFrame:
+    """Datas e valores tipados, linhas inválidas fora e um id por linha (arquivos da conta numeram ids do 1)"""
+    df = df.copy()
+    df['data'] = pd.to_datetime(df['data'], errors='coerce')
+    df['valor'] = pd.to_numeric(df['valor'], errors='coerce')
+    df = df.dropna(subset=['data', 'valor']).reset_index(drop=True)
+    if 'id' not in df.columns or not df['id'].is_unique:
+        df['id'] = range(1, len(df) + 1)
+    return df
+
+
+def conciliar_contas_em_lote(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, processos: int = None,
+                             **parametros) -> Dict:
+    """Concilia todas as contas com extrato e contábil; parâmetros ausentes usam PARAMETROS_CONCILIACAO_PADRAO"""
+    return AccountBatchReconciler(processos, **parametros).conciliar(extrato_df, contabil_df)
+
+
+def conciliar_conta_por_periodo(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame, processos: int = None,
+                                dias_por_fatia: int = 7, halo_dias: int = None, **parametros) -> Dict:
+    """Concilia uma conta grande em fatias de datas paralelas (halo = maior tolerância de datas)"""
+    return DateShardedMatcher(processos, dias_por_fatia, halo_dias, **parametros).conciliar(extrato_df, contabil_df)
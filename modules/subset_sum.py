@@ -0,0 +1,101 @@
+# modules/subset_sum.py
+from bisect import bisect_left, bisect_right
+from time import perf_counter
+from typing import List, Optional, Sequence
+
+
+class SubsetSumSolver:
+    """Busca limitada de subconjuntos cuja soma em centavos atinge um valor alvo
+
+    Branch-and-bound sobre os valores ordenados: os primeiros itens do grupo são
+    escolhidos em profundidade com poda por limites de soma mínima/máxima e o último
+    item é localizado por busca binária (encontro no meio entre prefixo e alvo).
+    """
+
+    def __init__(self, tamanho_maximo: int = 5, orcamento_segundos: float = 0.05, max_candidatos: int = 40):
+        self.tamanho_maximo = tamanho_maximo
+        self.orcamento_segundos = orcamento_segundos
+        self.max_candidatos = max_candidatos
+
+    def melhor_grupo(self, centavos: Sequence[int], alvo: int, tolerancia: int = 0,
+                     tamanho_minimo: int = 2) -> Optional[List[int]]:
+        """Índices (em `centavos`) do grupo mais próximo do alvo; menor diferença e depois menos itens"""
+        limite_inferior, limite_superior = alvo - tolerancia, alvo + tolerancia
+        candidatos = [(int(v), i) for i, v in enumerate(centavos) if 0 < int(v) <= limite_superior]
+        candidatos = sorted(candidatos[:self.max_candidatos])
+        valores = [v for v, _ in candidatos]
+        if len(valores) < tamanho_minimo:
+            return None
+
+        acumulado = [0]
+        for v in valores:
+            acumulado.append(acumulado[-1] + v)
+
+        busca = _Busca(valores, acumulado, alvo, limite_inferior, limite_superior,
+                       perf_counter() + self.orcamento_segundos)
+        for tamanho in range(tamanho_minimo, min(self.tamanho_maximo, len(valores)) + 1):
+            # A menor soma possível com `tamanho` itens já passa do limite: grupos maiores também passam
+            if acumulado[tamanho] > limite_superior or busca.esgotada():
+                break
+            busca.explorar(0, tamanho, 0, [])
+            if busca.melhor is not None and busca.melhor[0] == 0:
+                break
+
+        if busca.melhor is None:
+            return None
+        return [candidatos[p][1] for p in busca.melhor[2]]
+
+
+class _Busca:
+    """Estado de uma busca de subconjunto (melhor solução e prazo)"""
+
+    def __init__(self, valores: List[int], acumulado: List[int], alvo: int,
+                 limite_inferior: int, limite_superior: int, prazo: float):
+        self.valores = valores
+        self.acumulado = acumulado
+        self.alvo = alvo
+        self.limite_inferior = limite_inferior
+        self.limite_superior = limite_superior
+        self.prazo = prazo
+        self.melhor = None  # (diferença, tamanho, posições)
+        self._passos = 0
+
+    def esgotada(self) -> bool:
+        return perf_counter() > self.prazo
+
+    def explorar(self, inicio: int, restantes: int, parcial: int, escolhidos: List[int]):
+        valores, acumulado, n = self.valores, self.acumulado, len(self.valores)
+
+        if restantes == 1:
+            self._fechar_com_ultimo(inicio, parcial, escolhidos)
+            return
+
+        for i in range(inicio, n - restantes + 1):
+            self._passos += 1
+            if self._passos % 2048 == 0 and self.esgotada():
+                return
+            # Menor soma alcançável a partir de i já estoura o limite: valores seguintes são maiores
+            if parcial + acumulado[i + restantes] - acumulado[i] > self.limite_superior:
+                break
+            # Maior soma alcançável com i ainda não chega ao limite inferior
+            if parcial + valores[i] + acumulado[n] - acumulado[n - restantes + 1] < self.limite_inferior:
+                continue
+            self.explorar(i + 1, restantes - 1, parcial + valores[i], escolhidos + [i])
+            if self.melhor is not None and self.melhor[0] == 0:
+                return
+
+    def _fechar_com_ultimo(self, inicio: int, parcial: int, escolhidos: List[int]):
+        """Localiza por busca binária o último item que deixa a soma mais próxima do alvo"""
+        valores, n = self.valores, len(self.valores)
+        primeiro = max(inicio, bisect_left(valores, self.limite_inferior - parcial, inicio, n))
+        ultimo = bisect_right(valores, self.limite_superior - parcial, inicio, n) - 1
+        if primeiro > ultimo:
+            return
+
+        posicao = min(max(bisect_left(valores, self.alvo - parcial, primeiro, ultimo + 1), primeiro), ultimo)
+        for p in (posicao - 1, posicao):
+            if primeiro <= p <= ultimo:
+                diferenca = abs(parcial + valores[p] - self.alvo)
+                solucao = (diferenca, len(escolhidos) + 1, escolhidos + [p])
+                if self.melhor is None or solucao[:2] < self.melhor[:2]:
+                    self.melhor = solucao
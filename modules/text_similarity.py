@@ -0,0 +1,158 @@
+# modules/text_similarity.py
+import numpy as np
+import pandas as pd
+from difflib import SequenceMatcher
+from typing import Sequence
+from modules.matching_engine import descricoes_posicionais, dia_ordinal, expandir_janelas
+from modules.lsh_blocking import blocagem_por_lsh
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    SKLEARN_DISPONIVEL = True
+except ImportError:
+    SKLEARN_DISPONIVEL = False
+
+BACKENDS_SIMILARIDADE = ('sequencematcher', 'tfidf')
+
+
+def similaridade_sequencematcher(texto1: str, texto2: str) -> float:
+    """Similaridade difflib (0-100) entre dois textos, sem diferenciar maiúsculas"""
+    if not texto1 or not texto2: return 0.0
+    return SequenceMatcher(None, texto1.lower(), texto2.lower()).ratio() * 100
+
+
+class TextSimilarity:
+    """Similaridade de descrições (0-100) entre dois lados da conciliação
+
+    'sequencematcher' compara par a par com difflib; 'tfidf' usa n-gramas de caracteres
+    com TF-IDF e cosseno esparso, calculado em lote para os pares pedidos.
+    """
+
+    def __init__(self, backend: str = 'sequencematcher', ngramas: tuple = (2, 4)):
+        if backend not in BACKENDS_SIMILARIDADE:
+            raise ValueError(f"Backend de similaridade inválido: {backend}")
+        self.backend = backend if SKLEARN_DISPONIVEL else 'sequencematcher'
+        self.ngramas = ngramas
+        self._vetorizador = None
+        self._textos_a, self._textos_b = [], []
+        self._matriz_a = self._matriz_b = None
+
+    def ajustar(self, textos_a: Sequence[str], textos_b: Sequence[str], vetorizador=None) -> 'TextSimilarity':
+        """Prepara os dois lados (para 'tfidf', vocabulário e IDF vêm da união dos textos)
+
+        Um vetorizador já ajustado (de um conjunto maior de descrições) pode ser reaproveitado,
+        para que subconjuntos pontuem os pares exatamente como o conjunto inteiro.
+        """
+        self._textos_a = ['' if t is None else str(t) for t in textos_a]
+        self._textos_b = ['' if t is None else str(t) for t in textos_b]
+        if self.backend == 'tfidf':
+            self._vetorizador = vetorizador
+            try:
+                if vetorizador is None:
+                    self._vetorizador = TfidfVectorizer(analyzer='char_wb', ngram_range=self.ngramas,
+                                                        lowercase=True, sublinear_tf=True, dtype=np.float32)
+                    self._vetorizador.fit(self._textos_a + self._textos_b)
+                self._matriz_a = self._vetorizador.transform(self._textos_a).tocsr()
+                self._matriz_b = self._vetorizador.transform(self._textos_b).tocsr()
+            except ValueError:
+                # Vocabulário vazio (todas as descrições em branco): nenhum par é similar
+                self._vetorizador = None
+        return self
+
+    @property
+    def vetorizador(self):
+        """Vetorizador TF-IDF ajustado (None para 'sequencematcher' ou vocabulário vazio)"""
+        return self._vetorizador
+
+    def similaridade_pares(self, pos_a: np.ndarray, pos_b: np.ndarray) -> np.ndarray:
+        """Similaridade de cada par (pos_a[k], pos_b[k]) das listas ajustadas"""
+        pos_a = np.asarray(pos_a, dtype=np.int64)
+        pos_b = np.asarray(pos_b, dtype=np.int64)
+        if self.backend == 'sequencematcher':
+            return np.array([similaridade_sequencematcher(self._textos_a[i], self._textos_b[j])
+                             for i, j in zip(pos_a.tolist(), pos_b.tolist())], dtype=float)
+        if self._vetorizador is None or len(pos_a) == 0:
+            return np.zeros(len(pos_a))
+        # Linhas já normalizadas (L2): o cosseno é o produto escalar linha a linha
+        produto = self._matriz_a[pos_a].multiply(self._matriz_b[pos_b])
+        return np.asarray(produto.sum(axis=1), dtype=float).ravel() * 100
+
+    def similaridade_par(self, i: int, j: int) -> float:
+        """Similaridade de um único par das listas ajustadas"""
+        return float(self.similaridade_pares(np.array([i]), np.array([j]))[0])
+
+    def similaridade(self, texto1: str, texto2: str) -> float:
+        """Similaridade avulsa entre dois textos (tfidf usa o vocabulário ajustado, se houver)"""
+        if self.backend == 'sequencematcher' or not texto1 or not texto2:
+            return similaridade_sequencematcher(texto1, texto2)
+        if self._vetorizador is None:
+            return TextSimilarity('tfidf', self.ngramas).ajustar([texto1], [texto2]).similaridade_par(0, 0)
+        vetores = self._vetorizador.transform([texto1, texto2])
+        return float(vetores[0].multiply(vetores[1]).sum()) * 100
+
+
+def possiveis_correspondencias(extrato_df: pd.DataFrame, contabil_df: pd.DataFrame,
+                               backend: str = 'sequencematcher', coluna_valor: str = 'valor',
+                               tolerancia_percentual: float = 10, tolerancia_dias: int = 5,
+                               similaridade_minima: float = 40,
+                               blocagem_lsh: bool = False, amostra_recall: int = 0) -> pd.DataFrame:
+    """Pares (posicionais) próximos em valor e data cujas descrições atingem a similaridade mínima
+
+    Os candidatos vêm da janela de datas (ou, com blocagem_lsh, dos blocos MinHash/LSH das
+    descrições, estatísticas em resultado.attrs['blocagem_lsh'], com recall amostral só se
+    amostra_recall > 0); só os pares dentro das tolerâncias de valor e data são pontuados,
+    então os dois backends veem os mesmos pares.
+    """
+    colunas = ['pos_extrato', 'pos_contabil', 'similaridade', 'diff_valor_percent', 'diff_dias']
+    if extrato_df.empty or contabil_df.empty:
+        return pd.DataFrame(columns=colunas)
+
+    valores_extrato = pd.to_numeric(extrato_df[coluna_valor], errors='coerce').fillna(0).abs().to_numpy(dtype=float)
+    valores_contabil = pd.to_numeric(contabil_df[coluna_valor], errors='coerce').fillna(0).abs().to_numpy(dtype=float)
+    dias_extrato = _dias(extrato_df['data'])
+    dias_contabil = _dias(contabil_df['data'])
+    descricoes_extrato, descricoes_contabil = descricoes_posicionais(extrato_df), descricoes_posicionais(contabil_df)
+    textos = TextSimilarity(backend).ajustar(descricoes_extrato, descricoes_contabil)
+    estatisticas_lsh = None
+
+    if blocagem_lsh:
+        candidatos, estatisticas_lsh = blocagem_por_lsh(descricoes_extrato, descricoes_contabil,
+                                                         amostra_recall=amostra_recall)
+        pos_extrato = candidatos['pos_extrato'].to_numpy()
+        pos_contabil = candidatos['pos_contabil'].to_numpy()
+    else:
+        ordem = np.argsort(dias_contabil, kind='mergesort')
+        dias_ordenados = dias_contabil[ordem]
+        inicio = np.searchsorted(dias_ordenados, dias_extrato - tolerancia_dias, side='left')
+        fim = np.searchsorted(dias_ordenados, dias_extrato + tolerancia_dias, side='right')
+        pos_extrato, indice = expandir_janelas(inicio, fim)
+        pos_contabil = ordem[indice]
+
+    diff_valor_percent = np.where(
+        valores_extrato[pos_extrato] > 0,
+        np.abs(valores_extrato[pos_extrato] - valores_contabil[pos_contabil]) / np.maximum(valores_extrato[pos_extrato], 1e-12) * 100,
+        100
+    )
+    diff_dias = np.abs(dias_extrato[pos_extrato] - dias_contabil[pos_contabil])
+    dentro = (diff_valor_percent <= tolerancia_percentual) & (diff_dias <= tolerancia_dias)
+    pos_extrato, pos_contabil = pos_extrato[dentro], pos_contabil[dentro]
+    diff_valor_percent, diff_dias = diff_valor_percent[dentro], diff_dias[dentro].astype(np.int64)
+    similaridades = textos.similaridade_pares(pos_extrato, pos_contabil)
+
+    resultado = pd.DataFrame({
+        'pos_extrato': pos_extrato, 'pos_contabil': pos_contabil, 'similaridade': similaridades,
+        'diff_valor_percent': diff_valor_percent, 'diff_dias': diff_dias
+    })
+    resultado = resultado[resultado['similaridade'] >= similaridade_minima]
+    resultado = resultado.sort_values(['pos_extrato', 'pos_contabil'], kind='mergesort').reset_index(drop=True)
+    if estatisticas_lsh is not None:
+        resultado.attrs['blocagem_lsh'] = estatisticas_lsh
+    return resultado
+
+
+def _dias(datas: pd.Series) -> np.ndarray:
+    """Dias ordinais em float; datas inválidas viram NaN e não entram em nenhuma janela"""
+    datas = pd.to_datetime(datas, errors='coerce')
+    dias = dia_ordinal(datas.fillna(pd.Timestamp(0))).astype(float)
+    dias[datas.isna().to_numpy()] = np.nan
+    return dias
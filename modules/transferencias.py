@@ -0,0 +1,98 @@
+# modules/transferencias.py
+import numpy as np
+import pandas as pd
+from modules.matching_engine import dia_ordinal
+from modules.monetario import valor_para_centavos
+
+
+class InternalTransferDetector:
+    """Transferências entre contas próprias nos extratos de várias contas
+
+    Uma saída de uma conta e uma entrada de outra com o mesmo valor em centavos e datas a até
+    janela_dias formam um par. Cada deslocamento de dias (do menor para o maior) é um hash join
+    em (centavos, dia, ocorrência): a k-ésima saída livre de uma chave encontra a k-ésima entrada
+    livre, com as contas ordenadas em sentidos opostos para que as pontas caiam em contas diferentes.
+    """
+
+    def __init__(self, janela_dias: int = 2, rodadas: int = 2):
+        self.janela_dias = janela_dias
+        self.rodadas = rodadas
+
+    def detectar(self, extrato_df: pd.DataFrame, coluna_conta: str = 'conta_bancaria') -> pd.DataFrame:
+        """Pares (posição da saída, posição da entrada) com contas, valor e diferença de dias"""
+        colunas = ['pos_saida', 'pos_entrada', 'conta_origem', 'conta_destino', 'valor_centavos', 'diff_dias']
+        if extrato_df.empty or not self._tem_colunas(extrato_df, coluna_conta):
+            return pd.DataFrame(columns=colunas)
+
+        # Datas e valores ainda em texto são convertidos aqui; linhas sem data válida ficam de fora
+        datas = pd.to_datetime(extrato_df['data'], errors='coerce')
+        centavos = np.where(datas.notna().to_numpy(), valor_para_centavos(extrato_df['valor']).to_numpy(), 0)
+        linhas = pd.DataFrame({
+            'posicao': np.arange(len(extrato_df)),
+            'centavos': np.abs(centavos),
+            'dia': dia_ordinal(datas.fillna(pd.Timestamp(0))),
+            'conta': extrato_df[coluna_conta].astype(str).to_numpy()
+        })
+        saidas, entradas = linhas[centavos < 0], linhas[centavos > 0]
+
+        pares = []
+        for deslocamento in sorted(range(-self.janela_dias, self.janela_dias + 1), key=lambda d: (abs(d), d)):
+            for rodada in range(self.rodadas):
+                novos = self._parear(saidas.assign(dia=saidas['dia'] + deslocamento), entradas,
+                                     contas_opostas=rodada % 2 == 0)
+                if novos.empty:
+                    break
+                novos['diff_dias'] = abs(deslocamento)
+                pares.append(novos)
+                saidas = saidas[~saidas['posicao'].isin(novos['posicao_saida'])]
+                entradas = entradas[~entradas['posicao'].isin(novos['posicao_entrada'])]
+
+        if not pares:
+            return pd.DataFrame(columns=colunas)
+        pares = pd.concat(pares, ignore_index=True).sort_values('posicao_saida', kind='mergesort')
+        return pd.DataFrame({
+            'pos_saida': pares['posicao_saida'].to_numpy(),
+            'pos_entrada': pares['posicao_entrada'].to_numpy(),
+            'conta_origem': pares['conta_saida'].to_numpy(),
+            'conta_destino': pares['conta_entrada'].to_numpy(),
+            'valor_centavos': pares['centavos'].to_numpy(),
+            'diff_dias': pares['diff_dias'].to_numpy()
+        })
+
+    @staticmethod
+    def _tem_colunas(extrato_df: pd.DataFrame, coluna_conta: str) -> bool:
+        return all(coluna in extrato_df.columns for coluna in (coluna_conta, 'data', 'valor'))
+
+    @staticmethod
+    def _parear(saidas: pd.DataFrame, entradas: pd.DataFrame, contas_opostas: bool) -> pd.DataFrame:
+        """Uma rodada de join por (centavos, dia, ocorrência), descartando pares da mesma conta"""
+        saidas = saidas.sort_values(['centavos', 'dia', 'conta', 'posicao'], kind='mergesort')
+        entradas = entradas.sort_values(['centavos', 'dia', 'conta', 'posicao'],
+                                        ascending=[True, True, not contas_opostas, True], kind='mergesort')
+        saidas = saidas.assign(ocorrencia=saidas.groupby(['centavos', 'dia'], sort=False).cumcount())
+        entradas = entradas.assign(ocorrencia=entradas.groupby(['centavos', 'dia'], sort=False).cumcount())
+        pares = saidas.merge(entradas, on=['centavos', 'dia', 'ocorrencia'], suffixes=('_saida', '_entrada'))
+        return pares[pares['conta_saida'] != pares['conta_entrada']]
+
+    def marcar(self, extrato_df: pd.DataFrame, coluna_conta: str = 'conta_bancaria') -> pd.DataFrame:
+        """Cópia do extrato com 'transferencia_interna' e a conta da outra ponta em 'conta_contrapartida'
+
+        Sem as colunas 'data', 'valor' e da conta (arquivo ainda não mapeado) o extrato volta inalterado.
+        """
+        if not self._tem_colunas(extrato_df, coluna_conta):
+            return extrato_df
+        extrato_df = extrato_df.copy()
+        pares = self.detectar(extrato_df, coluna_conta)
+        marcadas = np.zeros(len(extrato_df), dtype=bool)
+        contrapartida = np.full(len(extrato_df), '', dtype=object)
+        marcadas[pares['pos_saida'].to_numpy(dtype=np.int64)] = True
+        marcadas[pares['pos_entrada'].to_numpy(dtype=np.int64)] = True
+        contrapartida[pares['pos_saida'].to_numpy(dtype=np.int64)] = pares['conta_destino'].to_numpy()
+        contrapartida[pares['pos_entrada'].to_numpy(dtype=np.int64)] = pares['conta_origem'].to_numpy()
+        extrato_df['transferencia_interna'] = marcadas
+        extrato_df['conta_contrapartida'] = contrapartida
+        return extrato_df
+
+
+def marcar_transferencias_internas(extrato_df: pd.DataFrame, janela_dias: int = 2) -> pd.DataFrame:
+    return InternalTransferDetector(janela_dias).marcar(extrato_df)
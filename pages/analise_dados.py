@@ -5,11 +5,13 @@ import numpy as np
 from datetime import datetime, timedelta
 import tempfile
 import modules.data_analyzer as analyzer
-from difflib import SequenceMatcher
 from modules.auth_middleware import require_auth
 import plotly.express as px
 import plotly.graph_objects as go
 from modules.interactive_dashboard import get_dashboard
+from modules.monetario import valor_para_centavos
+from modules.config_manager import get_config_manager
+from modules.text_similarity import possiveis_correspondencias
 
 
 @require_auth
@@ -133,6 +135,10 @@ def main():
         def processar_valores_para_matching(extrato_df, contabil_df):
             """Processa valores para matching considerando sinal negativo do extrato"""
             
+            # Centavos inteiros são a representação usada pelas camadas de matching
+            extrato_df['valor_centavos'] = valor_para_centavos(extrato_df['valor'])
+            contabil_df['valor_centavos'] = valor_para_centavos(contabil_df['valor'])
+            
             # Criar coluna com valor absoluto para matching
             extrato_df['valor_abs'] = extrato_df['valor'].abs()
             contabil_df['valor_abs'] = contabil_df['valor'].abs()
@@ -240,7 +246,11 @@ def main():
             max_value=10.0, 
             value=2.0, 
             step=0.1,
-            help="Diferença percentual máxima permitida entre valores para considerar como correspondência"
+            help="Diferença percentual máxima permitida entre valores, aplicada ao valor de cada transação"
+        )
+        tolerancia_minima = st.number_input(
+            "Tolerância mínima (R$)", min_value=0.0, max_value=100.0, value=0.01, step=0.01,
+            help="Piso absoluto da tolerância de valor, para que transações pequenas aceitem diferenças de centavos"
         )
         
         st.info("ℹ️ **Configurações automáticas:**")
@@ -250,7 +260,39 @@ def main():
     with st.sidebar.expander("📋 Regras de Correspondência"):
         considerar_1n = st.checkbox("Identificar parcelamentos (1:N)", True)
         considerar_n1 = st.checkbox("Identificar consolidações (N:1)", True)
+        config_manager = get_config_manager()
+        considerar_taxas = st.checkbox(
+            "Considerar taxas (cartão/boleto)", bool(config_manager.get_matching_config().get('considera_taxas', True)),
+            help="Casa liquidações pelo valor bruto menos MDR/tarifa da tabela de taxas, sem afrouxar a tolerância de valor"
+        )
         match_exato_prioritario = st.checkbox("Priorizar matches exatos", True)
+        
+        opcoes_atribuicao = {"Ótima (maior confiança total)": 'otima', "Gulosa (ordem das linhas)": 'gulosa'}
+        atribuicao_heuristica = opcoes_atribuicao[st.selectbox(
+            "Atribuição 1:1 - Similaridade", list(opcoes_atribuicao), index=0,
+            help="Ótima: escolhe o conjunto de pares com maior confiança total. Gulosa: cada linha fica com o primeiro candidato válido"
+        )]
+        atribuicao_ia = opcoes_atribuicao[st.selectbox(
+            "Atribuição 1:1 - Análise Avançada", list(opcoes_atribuicao), index=0
+        )]
+        
+        opcoes_similaridade = {"SequenceMatcher (par a par)": 'sequencematcher', "TF-IDF de n-gramas (vetorizado)": 'tfidf'}
+        backend_similaridade = opcoes_similaridade[st.selectbox(
+            "Similaridade de descrições", list(opcoes_similaridade), index=0,
+            help="TF-IDF compara n-gramas de caracteres em lote e é bem mais rápido em bases grandes"
+        )]
+        blocagem_lsh = st.checkbox(
+            "Blocagem LSH de descrições", False,
+            help="Compara apenas pares cujas descrições caem em um mesmo bloco MinHash/LSH (útil com tolerância de valor alta)"
+        )
+        processamento_paralelo = st.checkbox(
+            "Processamento paralelo", False,
+            help="Divide os pares candidatos em componentes independentes e pontua similaridade e IA em todos os núcleos da máquina"
+        )
+        prazo_ia = st.number_input(
+            "Tempo máximo da análise avançada (s)", min_value=0, max_value=3600, value=0, step=10,
+            help="0 = sem limite. Com limite, a análise avançada começa pelas transações de maior valor e, no prazo, mantém os matches já encontrados"
+        )
 
     with st.sidebar.expander("🎯 Filtros de Análise"):
         valor_minimo = st.number_input("Valor mínimo (R$)", 0.0, 1000.0, 1.0, 1.0)
@@ -277,17 +319,34 @@ def main():
                 extrato_filtrado = extrato_df[extrato_df['valor_matching'] >= valor_minimo].copy()
                 contabil_filtrado = contabil_df[contabil_df['valor_matching'] >= valor_minimo].copy()
             
+            # Transferências entre contas próprias (marcadas na importação) não têm contrapartida contábil a buscar
+            if 'transferencia_interna' in extrato_filtrado.columns:
+                transferencias_internas = extrato_filtrado['transferencia_interna'].fillna(False).astype(bool)
+                if transferencias_internas.any():
+                    st.info(f"🔀 {int(transferencias_internas.sum())} transferências entre contas próprias fora do matching")
+                extrato_filtrado = extrato_filtrado[~transferencias_internas].copy()
+            
             progress_bar.progress(40)
             status_text.text("Executando análise...")
             
-            # CONVERTER TOLERÂNCIA PERCENTUAL PARA VALOR ABSOLUTO
-            # Para usar nas funções existentes, precisamos converter % para R$
-            # Vamos calcular uma tolerância média baseada nos dados
-            valor_medio = extrato_filtrado['valor_matching'].mean()
-            tolerancia_valor_abs = (tolerancia_percentual / 100) * valor_medio
+            # None: um processo por núcleo; 1: execução serial
+            processos = None if processamento_paralelo else 1
+            
+            # Tolerância percentual avaliada linha a linha (sobre o valor de cada par), com piso absoluto
+            tolerancia_relativa = tolerancia_percentual / 100
+            
+            # Pares candidatos montados uma vez, nas tolerâncias mais folgadas entre heurística (2 dias) e IA (3 dias, R$ 0,05)
+            pares_candidatos = analyzer.construir_pares_candidatos(
+                extrato_filtrado, contabil_filtrado,
+                tolerancia_valor=max(tolerancia_minima, 0.05), tolerancia_dias=3,
+                tolerancia_relativa=tolerancia_relativa
+            )
             
-            # Executar análise em camadas com tolerâncias fixas
-            resultados_exato = analyzer.matching_exato(extrato_filtrado, contabil_filtrado)
+            # Executar análise em camadas com tolerâncias fixas, todas sobre o mesmo ledger de conciliação
+            ledger = analyzer.criar_ledger(extrato_filtrado, contabil_filtrado)
+            tabela_taxas = config_manager.get_taxas_config() if considerar_taxas else None
+            resultados_exato = analyzer.matching_exato(extrato_filtrado, contabil_filtrado, ledger=ledger,
+                                                       tabela_taxas=tabela_taxas)
             progress_bar.progress(60)
             
             # USAR TOLERÂNCIAS FIXAS: 2 dias e similaridade 70%
@@ -296,15 +355,31 @@ def main():
                 resultados_exato['nao_matchados_extrato'],
                 resultados_exato['nao_matchados_contabil'],
                 tolerancia_dias=2,  # FIXO
-                tolerancia_valor=tolerancia_valor_abs,
-                similaridade_minima=70  # FIXO
+                tolerancia_valor=tolerancia_minima,
+                tolerancia_relativa=tolerancia_relativa,
+                similaridade_minima=70,  # FIXO
+                estrategia_atribuicao=atribuicao_heuristica,
+                permite_1n=considerar_1n,
+                permite_n1=considerar_n1,
+                backend_similaridade=backend_similaridade,
+                blocagem_lsh=blocagem_lsh,
+                pares_candidatos=pares_candidatos,
+                ledger=ledger,
+                processos=processos
             )
             progress_bar.progress(80)
+            status_text.text("Executando análise avançada..." + (f" (até {prazo_ia} s)" if prazo_ia else ""))
             
             resultados_ia = analyzer.matching_ia(
                 extrato_filtrado, contabil_filtrado,
                 resultados_heurístico['nao_matchados_extrato'],
-                resultados_heurístico['nao_matchados_contabil']
+                resultados_heurístico['nao_matchados_contabil'],
+                estrategia_atribuicao=atribuicao_ia,
+                blocagem_lsh=blocagem_lsh,
+                pares_candidatos=pares_candidatos,
+                ledger=ledger,
+                processos=processos,
+                prazo_segundos=prazo_ia or None
             )
             
             progress_bar.progress(100)
@@ -319,6 +394,8 @@ def main():
             st.session_state['resultados_analise'] = resultados_finais
             st.session_state['extrato_filtrado'] = extrato_filtrado
             st.session_state['contabil_filtrado'] = contabil_filtrado
+            st.session_state['backend_similaridade'] = backend_similaridade
+            st.session_state['blocagem_lsh'] = blocagem_lsh
             
             st.success("🎉 Análise de correspondências concluída!")
             st.rerun()
@@ -339,6 +416,15 @@ def main():
         extrato_filtrado = st.session_state.get('extrato_filtrado', extrato_df)
         contabil_filtrado = st.session_state.get('contabil_filtrado', contabil_df)
         
+        cobertura_ia = resultados_finais.get('estatisticas', {}).get('cobertura_ia', {})
+        if cobertura_ia.get('prazo_esgotado'):
+            st.warning(
+                f"⏱️ Prazo da análise avançada esgotado em {cobertura_ia['tempo_segundos']:.1f} s: "
+                f"{cobertura_ia['percentual_linhas']:.1f}% das linhas pendentes "
+                f"({cobertura_ia['percentual_valor']:.1f}% do valor) passaram por todas as estratégias, maiores valores primeiro. "
+                "Os matches encontrados até o prazo foram mantidos."
+            )
+        
         # Métricas principais
         col1, col2, col3, col4 = st.columns(4)
 
@@ -516,7 +602,7 @@ def main():
             if resultados_finais.get('excecoes'):
                 # Gerar tabelas melhoradas
                 tabelas_divergencias = gerar_tabelas_divergencias_melhoradas(
-                    resultados_finais, extrato_filtrado, contabil_filtrado
+                    resultados_finais, extrato_filtrado, contabil_filtrado, backend_similaridade, blocagem_lsh
                 )
                 
                 # Abas para cada tipo de divergência
@@ -561,6 +647,14 @@ def main():
                     st.markdown("**Possíveis Correspondências por Similaridade**")
                     if not tabelas_divergencias['possiveis_similaridades'].empty:
                         st.dataframe(tabelas_divergencias['possiveis_similaridades'], width='stretch')
+                        estatisticas_blocagem = tabelas_divergencias['possiveis_similaridades'].attrs.get('blocagem_lsh')
+                        if estatisticas_blocagem:
+                            st.caption(
+                                f"Blocagem LSH: {estatisticas_blocagem['blocos']} blocos, "
+                                f"{estatisticas_blocagem['pares_distintos']} pares comparados de "
+                                f"{estatisticas_blocagem['pares_forca_bruta']} possíveis "
+                                f"(recall amostral: {estatisticas_blocagem['recall_amostral']['recall']:.1%})"
+                            )
                         
                         csv_similaridades = tabelas_divergencias['possiveis_similaridades'].to_csv(index=False)
                         st.download_button(
@@ -658,7 +752,8 @@ def main():
                         debug_matching_similaridades(
                             st.session_state.extrato_filtrado,
                             st.session_state.contabil_filtrado, 
-                            st.session_state.resultados_analise
+                            st.session_state.resultados_analise,
+                            backend_similaridade
                         )
 
                     if extrato_filtrado is not None and len(extrato_filtrado) > 0:
@@ -753,15 +848,30 @@ def main():
             
             st.json({
                 "configuracoes_aplicadas": {
-                    "tolerancia_percentual": f"{tolerancia_percentual}%",
+                    "tolerancia_percentual": f"{tolerancia_percentual}% (por transação)",
+                    "tolerancia_minima": f"R$ {tolerancia_minima:.2f}",
                     "tolerancia_data_dias": 2,  # FIXO
-                    "similaridade_minima_percentual": 70  # FIXO
+                    "similaridade_minima_percentual": 70,  # FIXO
+                    "atribuicao_similaridade": atribuicao_heuristica,
+                    "atribuicao_avancada": atribuicao_ia,
+                    "similaridade_descricoes": backend_similaridade,
+                    "blocagem_lsh": blocagem_lsh,
+                    "processamento_paralelo": processamento_paralelo,
+                    "prazo_analise_avancada_segundos": prazo_ia or None,
+                    "parcelamentos_1n": considerar_1n,
+                    "considera_taxas": considerar_taxas,
+                    "consolidacoes_n1": considerar_n1
                 },
                 "estatisticas_processamento": {
                     "transacoes_analisadas": len(extrato_filtrado),
                     "lancamentos_analisados": len(contabil_filtrado),
+                    "transferencias_internas": len(st.session_state.get('transferencias_internas', [])) // 2,
                     "correspondencias_identificadas": len(resultados_finais['matches']),
-                    "divergencias_identificadas": len(resultados_finais['excecoes'])
+                    "divergencias_identificadas": len(resultados_finais['excecoes']),
+                    "pares_candidatos_heuristica": resultados_finais.get('estatisticas', {}).get('pares_candidatos_heuristica', 0),
+                    "blocagem_lsh_heuristica": resultados_finais.get('estatisticas', {}).get('blocagem_lsh_heuristica', {}),
+                    "blocagem_lsh_ia": resultados_finais.get('estatisticas', {}).get('blocagem_lsh_ia', {}),
+                    "cobertura_ia": resultados_finais.get('estatisticas', {}).get('cobertura_ia', {})
                 }
             })
 
@@ -799,7 +909,7 @@ def main():
                 st.caption("Execute a análise primeiro")
 
 
-def debug_matching_similaridades(extrato_df, contabil_df, resultados_analise):
+def debug_matching_similaridades(extrato_df, contabil_df, resultados_analise, backend_similaridade='sequencematcher'):
     """Debug detalhado do matching por similaridade"""
     
     st.sidebar.header("🔍 Debug - Similaridades")
@@ -807,55 +917,49 @@ def debug_matching_similaridades(extrato_df, contabil_df, resultados_analise):
     # Encontrar transações do mesmo dia com valores próximos
     st.sidebar.write("**Transações do mesmo dia:**")
     
-    for data_extrato in extrato_df['data'].unique():
-        transacoes_dia_extrato = extrato_df[extrato_df['data'] == data_extrato]
-        transacoes_dia_contabil = contabil_df[contabil_df['data'] == data_extrato]
-        
-        for _, extrato_row in transacoes_dia_extrato.iterrows():
-            for _, contabil_row in transacoes_dia_contabil.iterrows():
-                valor_extrato = abs(extrato_row.get('valor_original', extrato_row.get('valor', 0)))
-                valor_contabil = abs(contabil_row.get('valor_original', contabil_row.get('valor', 0)))
-                
-                diff_valor = abs(valor_extrato - valor_contabil)
-                diff_percent = (diff_valor / valor_extrato * 100) if valor_extrato > 0 else 100
-                
-                # Se diferença for pequena (até 30%) e mesma data
-                if diff_percent <= 30 and diff_valor <= 10:
-                    similaridade = SequenceMatcher(
-                        None, 
-                        extrato_row.get('descricao', '').lower(), 
-                        contabil_row.get('descricao', '').lower()
-                    ).ratio() * 100
-                    
-                    st.sidebar.write(f"**Data:** {data_extrato.strftime('%d/%m')}")
-                    st.sidebar.write(f"**Extrato:** R$ {valor_extrato:.2f} - {extrato_row.get('descricao', '')[:30]}")
-                    st.sidebar.write(f"**Contábil:** R$ {valor_contabil:.2f} - {contabil_row.get('descricao', '')[:30]}")
-                    st.sidebar.write(f"**Diff:** R$ {diff_valor:.2f} ({diff_percent:.1f}%) | **Similaridade:** {similaridade:.1f}%")
-                    st.sidebar.write("---")
+    coluna_valor = 'valor_original' if 'valor_original' in extrato_df.columns and 'valor_original' in contabil_df.columns else 'valor'
+    # Diferença pequena (até 30%) e mesma data
+    pares = possiveis_correspondencias(
+        extrato_df, contabil_df, backend_similaridade, coluna_valor=coluna_valor,
+        tolerancia_percentual=30, tolerancia_dias=0, similaridade_minima=0
+    )
+    
+    for pos_extrato, pos_contabil, similaridade, diff_percent in pares[
+            ['pos_extrato', 'pos_contabil', 'similaridade', 'diff_valor_percent']].itertuples(index=False, name=None):
+        extrato_row = extrato_df.iloc[int(pos_extrato)]
+        contabil_row = contabil_df.iloc[int(pos_contabil)]
+        valor_extrato = abs(extrato_row[coluna_valor])
+        valor_contabil = abs(contabil_row[coluna_valor])
+        diff_valor = abs(valor_extrato - valor_contabil)
+        if diff_valor > 10:
+            continue
+        
+        st.sidebar.write(f"**Data:** {extrato_row['data'].strftime('%d/%m')}")
+        st.sidebar.write(f"**Extrato:** R$ {valor_extrato:.2f} - {extrato_row.get('descricao', '')[:30]}")
+        st.sidebar.write(f"**Contábil:** R$ {valor_contabil:.2f} - {contabil_row.get('descricao', '')[:30]}")
+        st.sidebar.write(f"**Diff:** R$ {diff_valor:.2f} ({diff_percent:.1f}%) | **Similaridade:** {similaridade:.1f}%")
+        st.sidebar.write("---")
 
 # [AS FUNÇÕES AUXILIARES PERMANECEM AS MESMAS...]
-def gerar_tabelas_divergencias_melhoradas(resultados_analise, extrato_df, contabil_df):
+def gerar_tabelas_divergencias_melhoradas(resultados_analise, extrato_df, contabil_df, backend_similaridade='sequencematcher',
+                                          blocagem_lsh=False):
     """
     Gera tabelas de divergências mais explicativas e organizadas
     """
     # Identificar transações não matchadas
-    extrato_match_ids = set()
-    contabil_match_ids = set()
-    
-    for match in resultados_analise['matches']:
-        extrato_match_ids.update(match['ids_extrato'])
-        contabil_match_ids.update(match['ids_contabil'])
+    ledger = analyzer.criar_ledger(extrato_df, contabil_df)
+    ledger.registrar(resultados_analise['matches'])
     
     # Tabela 1: Presente no bancário mas não no contábil
-    extrato_nao_match = extrato_df[~extrato_df['id'].isin(extrato_match_ids)]
+    extrato_nao_match = ledger.nao_conciliados(extrato_df, 'extrato')
     tabela_bancario_sem_contabil = _criar_tabela_bancario_sem_contabil(extrato_nao_match)
     
     # Tabela 2: Presente no contábil mas não no bancário
-    contabil_nao_match = contabil_df[~contabil_df['id'].isin(contabil_match_ids)]
+    contabil_nao_match = ledger.nao_conciliados(contabil_df, 'contabil')
     tabela_contabil_sem_bancario = _criar_tabela_contabil_sem_bancario(contabil_nao_match)
     
     # Tabela 3: Possíveis correspondências por similaridade
-    tabela_similaridades = _criar_tabela_similaridades(extrato_nao_match, contabil_nao_match)
+    tabela_similaridades = _criar_tabela_similaridades(extrato_nao_match, contabil_nao_match, backend_similaridade, blocagem_lsh)
     
     return {
         'bancario_sem_contabil': tabela_bancario_sem_contabil,
@@ -903,52 +1007,42 @@ def _criar_tabela_contabil_sem_bancario(contabil_nao_match):
     
     return pd.DataFrame(tabela)
 
-def _criar_tabela_similaridades(extrato_nao_match, contabil_nao_match):
+def _criar_tabela_similaridades(extrato_nao_match, contabil_nao_match, backend_similaridade='sequencematcher',
+                                blocagem_lsh=False):
     """Identifica possíveis correspondências por similaridade - TERMINOLOGIA MELHORADA"""
     tabela = []
+    pares = possiveis_correspondencias(
+        extrato_nao_match, contabil_nao_match, backend_similaridade,
+        tolerancia_percentual=10, tolerancia_dias=5, similaridade_minima=40, blocagem_lsh=blocagem_lsh,
+        amostra_recall=50
+    )
     
-    for _, extrato_row in extrato_nao_match.iterrows():
-        valor_extrato = abs(extrato_row['valor'])
+    for pos_extrato, pos_contabil, similaridade, diff_valor_percent, diff_dias in pares.itertuples(index=False, name=None):
+        extrato_row = extrato_nao_match.iloc[int(pos_extrato)]
+        contabil_row = contabil_nao_match.iloc[int(pos_contabil)]
         data_extrato = extrato_row['data']
+        data_contabil = contabil_row['data']
+        confianca_ajuste = (100 - diff_valor_percent) * (100 - diff_dias * 2) * similaridade / 10000
         
-        for _, contabil_row in contabil_nao_match.iterrows():
-            valor_contabil = abs(contabil_row['valor'])
-            data_contabil = contabil_row['data']
-            
-            diff_valor_percent = abs(valor_extrato - valor_contabil) / valor_extrato * 100 if valor_extrato > 0 else 100
-            diff_dias = abs((data_extrato - data_contabil).days) if hasattr(data_extrato, 'strftime') and hasattr(data_contabil, 'strftime') else 30
-            
-            if diff_valor_percent <= 10 and diff_dias <= 5:
-                similaridade = _calcular_similaridade_texto(
-                    extrato_row.get('descricao', ''),
-                    contabil_row.get('descricao', '')
-                )
-                
-                if similaridade >= 40:
-                    confianca_ajuste = (100 - diff_valor_percent) * (100 - diff_dias * 2) * similaridade / 10000
-                    
-                    tabela.append({
-                        'Tipo_Analise': '🟡 Possível Correspondência',
-                        'Similaridade_Detectada': f"{similaridade:.1f}%",
-                        'Data_Bancário': data_extrato.strftime('%d/%m/%Y') if hasattr(data_extrato, 'strftime') else str(data_extrato),
-                        'Data_Contábil': data_contabil.strftime('%d/%m/%Y') if hasattr(data_contabil, 'strftime') else str(data_contabil),
-                        'Valor_Bancário': f"R$ {extrato_row['valor']:,.2f}",
-                        'Valor_Contábil': f"R$ {contabil_row['valor']:,.2f}",
-                        'Descrição_Bancário': extrato_row.get('descricao', '')[:50] + "..." if len(extrato_row.get('descricao', '')) > 50 else extrato_row.get('descricao', ''),
-                        'Descrição_Contábil': contabil_row.get('descricao', '')[:50] + "..." if len(contabil_row.get('descricao', '')) > 50 else contabil_row.get('descricao', ''),
-                        'Diferença_Valor': f"R$ {abs(extrato_row['valor'] - contabil_row['valor']):,.2f}",
-                        'Diferença_Dias': diff_dias,
-                        'Confiança_Ajuste': f"{confianca_ajuste:.1f}%",
-                        'Recomendação': 'Analisar manualmente - possível correspondência que precisa de validação'
-                    })
+        tabela.append({
+            'Tipo_Analise': '🟡 Possível Correspondência',
+            'Similaridade_Detectada': f"{similaridade:.1f}%",
+            'Data_Bancário': data_extrato.strftime('%d/%m/%Y') if hasattr(data_extrato, 'strftime') else str(data_extrato),
+            'Data_Contábil': data_contabil.strftime('%d/%m/%Y') if hasattr(data_contabil, 'strftime') else str(data_contabil),
+            'Valor_Bancário': f"R$ {extrato_row['valor']:,.2f}",
+            'Valor_Contábil': f"R$ {contabil_row['valor']:,.2f}",
+            'Descrição_Bancário': extrato_row.get('descricao', '')[:50] + "..." if len(extrato_row.get('descricao', '')) > 50 else extrato_row.get('descricao', ''),
+            'Descrição_Contábil': contabil_row.get('descricao', '')[:50] + "..." if len(contabil_row.get('descricao', '')) > 50 else contabil_row.get('descricao', ''),
+            'Diferença_Valor': f"R$ {abs(extrato_row['valor'] - contabil_row['valor']):,.2f}",
+            'Diferença_Dias': int(diff_dias),
+            'Confiança_Ajuste': f"{confianca_ajuste:.1f}%",
+            'Recomendação': 'Analisar manualmente - possível correspondência que precisa de validação'
+        })
     
-    return pd.DataFrame(tabela)
-
-def _calcular_similaridade_texto(texto1, texto2):
-    """Calcula similaridade entre textos"""
-    if not texto1 or not texto2:
-        return 0.0
-    return SequenceMatcher(None, texto1.lower(), texto2.lower()).ratio() * 100
+    tabela = pd.DataFrame(tabela)
+    if 'blocagem_lsh' in pares.attrs:
+        tabela.attrs['blocagem_lsh'] = pares.attrs['blocagem_lsh']
+    return tabela
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
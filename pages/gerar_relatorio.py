@@ -8,7 +8,7 @@ import os
 import base64
 import modules.report_generator as report_gen
 import locale
-from difflib import SequenceMatcher
+from modules.text_similarity import possiveis_correspondencias
 from modules.auth_middleware import require_auth
 
 
@@ -116,61 +116,40 @@ def main():
         """Identifica possíveis correspondências por similaridade"""
         tabela = []
         
-        # Analisar possíveis matches por similaridade de valor e data
-        for _, extrato_row in extrato_nao_match.iterrows():
-            valor_extrato = abs(extrato_row.get('valor_original', extrato_row.get('valor', 0)))
+        # Possíveis matches por similaridade de valor (±10%), datas próximas (±5 dias) e descrição (>= 40%)
+        coluna_valor = 'valor_original' if 'valor_original' in extrato_nao_match.columns and 'valor_original' in contabil_nao_match.columns else 'valor'
+        pares = possiveis_correspondencias(
+            extrato_nao_match, contabil_nao_match, st.session_state.get('backend_similaridade', 'sequencematcher'),
+            coluna_valor=coluna_valor, tolerancia_percentual=10, tolerancia_dias=5, similaridade_minima=40,
+            blocagem_lsh=st.session_state.get('blocagem_lsh', False)
+        )
+        
+        for pos_extrato, pos_contabil, similaridade, diff_valor_percent, diff_dias in pares.itertuples(index=False, name=None):
+            extrato_row = extrato_nao_match.iloc[int(pos_extrato)]
+            contabil_row = contabil_nao_match.iloc[int(pos_contabil)]
             data_extrato = extrato_row.get('data', None)
+            data_contabil = contabil_row.get('data', None)
+            confianca_ajuste = (100 - diff_valor_percent) * (100 - diff_dias * 2) * similaridade / 10000
             
-            # Buscar lançamentos com valores similares (±10%) e datas próximas (±5 dias)
-            for _, contabil_row in contabil_nao_match.iterrows():
-                valor_contabil = abs(contabil_row.get('valor_original', contabil_row.get('valor', 0)))
-                data_contabil = contabil_row.get('data', None)
-                
-                # Calcular similaridade
-                if valor_extrato > 0:
-                    diff_valor_percent = abs(valor_extrato - valor_contabil) / valor_extrato * 100
-                else:
-                    diff_valor_percent = 100
-                    
-                if hasattr(data_extrato, 'strftime') and hasattr(data_contabil, 'strftime'):
-                    diff_dias = abs((data_extrato - data_contabil).days)
-                else:
-                    diff_dias = 30
-                
-                if diff_valor_percent <= 10 and diff_dias <= 5:
-                    similaridade = _calcular_similaridade_texto(
-                        extrato_row.get('descricao', ''),
-                        contabil_row.get('descricao', '')
-                    )
-                    
-                    if similaridade >= 40:  # Similaridade mínima de 40%
-                        confianca_ajuste = (100 - diff_valor_percent) * (100 - diff_dias * 2) * similaridade / 10000
-                        
-                        data_extrato_str = data_extrato.strftime('%d/%m/%Y') if hasattr(data_extrato, 'strftime') else str(data_extrato)
-                        data_contabil_str = data_contabil.strftime('%d/%m/%Y') if hasattr(data_contabil, 'strftime') else str(data_contabil)
-                        
-                        tabela.append({
-                            'Similaridade': f"{similaridade:.1f}%",
-                            'Data_Bancário': data_extrato_str,
-                            'Data_Contábil': data_contabil_str,
-                            'Valor_Bancário': f"R$ {extrato_row.get('valor_original', extrato_row.get('valor', 0)):,.2f}",
-                            'Valor_Contábil': f"R$ {contabil_row.get('valor_original', contabil_row.get('valor', 0)):,.2f}",
-                            'Descrição_Bancário': extrato_row.get('descricao', '')[:50] + "..." if len(extrato_row.get('descricao', '')) > 50 else extrato_row.get('descricao', ''),
-                            'Descrição_Contábil': contabil_row.get('descricao', '')[:50] + "..." if len(contabil_row.get('descricao', '')) > 50 else contabil_row.get('descricao', ''),
-                            'Diferença_Valor': f"R$ {abs(extrato_row.get('valor_original', extrato_row.get('valor', 0)) - contabil_row.get('valor_original', contabil_row.get('valor', 0))):,.2f}",
-                            'Diferença_Dias': diff_dias,
-                            'Confiança': f"{confianca_ajuste:.1f}%",
-                            'Recomendação': 'Analisar possível correspondência manual'
-                        })
+            data_extrato_str = data_extrato.strftime('%d/%m/%Y') if hasattr(data_extrato, 'strftime') else str(data_extrato)
+            data_contabil_str = data_contabil.strftime('%d/%m/%Y') if hasattr(data_contabil, 'strftime') else str(data_contabil)
+            
+            tabela.append({
+                'Similaridade': f"{similaridade:.1f}%",
+                'Data_Bancário': data_extrato_str,
+                'Data_Contábil': data_contabil_str,
+                'Valor_Bancário': f"R$ {extrato_row.get('valor_original', extrato_row.get('valor', 0)):,.2f}",
+                'Valor_Contábil': f"R$ {contabil_row.get('valor_original', contabil_row.get('valor', 0)):,.2f}",
+                'Descrição_Bancário': extrato_row.get('descricao', '')[:50] + "..." if len(extrato_row.get('descricao', '')) > 50 else extrato_row.get('descricao', ''),
+                'Descrição_Contábil': contabil_row.get('descricao', '')[:50] + "..." if len(contabil_row.get('descricao', '')) > 50 else contabil_row.get('descricao', ''),
+                'Diferença_Valor': f"R$ {abs(extrato_row.get('valor_original', extrato_row.get('valor', 0)) - contabil_row.get('valor_original', contabil_row.get('valor', 0))):,.2f}",
+                'Diferença_Dias': int(diff_dias),
+                'Confiança': f"{confianca_ajuste:.1f}%",
+                'Recomendação': 'Analisar possível correspondência manual'
+            })
         
         return pd.DataFrame(tabela)
 
-    def _calcular_similaridade_texto(texto1, texto2):
-        """Calcula similaridade entre textos"""
-        if not texto1 or not texto2:
-            return 0.0
-        return SequenceMatcher(None, texto1.lower(), texto2.lower()).ratio() * 100
-
     # --- FIM DAS NOVAS FUNÇÕES ---
 
     # Instruções
@@ -11,6 +11,9 @@ import modules.data_processor as processor
 import tempfile
 import os
 from modules.performance_optimizer import chunker, cache_manager
+from modules.transferencias import marcar_transferencias_internas
+from modules.identificadores import remover_fitids_duplicados
+from modules.parallel_matching import conciliar_contas_em_lote
 
 # --- Menu Customizado ---
 with st.sidebar:
@@ -211,7 +214,9 @@ def processar_ofx(arquivo):
                     'valor': float(transaction.amount),
                     'descricao': transaction.memo or transaction.payee or '',
                     'tipo': transaction.type,
-                    'id': transaction.id
+                    'id': transaction.id,
+                    # FITID em coluna própria: o 'id' é renumerado no processamento
+                    'fitid': transaction.id
                 })
         
         df = pd.DataFrame(transacoes)
@@ -230,37 +235,23 @@ def processar_ofx(arquivo):
         return None
 
 # FUNÇÕES CNAB CORRIGIDAS 
+def _processar_valor_cnab_centavos(valor_str):
+    """Converte o campo de valor CNAB (últimos 2 dígitos são centavos) em centavos inteiros"""
+    digitos = re.sub(r'\D', '', valor_str or '')
+    return int(digitos) if digitos else 0
+
 def _processar_valor_cnab_corrigido(valor_str):
     """Processa valor CNAB CORRETAMENTE - últimos 2 dígitos são centavos"""
     try:
-        print(f"💰 Processando valor CNAB: {valor_str}")
-        
         if not valor_str or valor_str == '0000000000000':
             return 0.0
         
-        # Em CNAB, os últimos 2 dígitos são centavos
-        parte_inteira = valor_str[:-2]  # Todos exceto últimos 2 dígitos
-        parte_decimal = valor_str[-2:]  # Últimos 2 dígitos
-        
-        # Remover zeros à esquerda da parte inteira
-        parte_inteira_limpa = parte_inteira.lstrip('0')
-        if not parte_inteira_limpa:
-            parte_inteira_limpa = "0"
-        
-        valor_final = float(parte_inteira_limpa + '.' + parte_decimal)
-        print(f"✅ Valor processado: {parte_inteira_limpa}.{parte_decimal} = R$ {valor_final:,.2f}")
-        
-        return valor_final
+        # Em CNAB, os últimos 2 dígitos são centavos: converter direto para inteiro evita erro de arredondamento
+        return _processar_valor_cnab_centavos(valor_str) / 100
         
     except Exception as e:
         print(f"❌ Erro no processamento do valor: {e}")
-        # Fallback: tentar divisão por 100
-        try:
-            valor_fallback = float(valor_str) / 100.0
-            print(f"🔄 Fallback (divisão por 100): R$ {valor_fallback:,.2f}")
-            return valor_fallback
-        except:
-            return 0.0
+        return 0.0
 
 def _extrair_valor_caixa_completo(linha):
     """Extrai valor do CNAB da Caixa - Versão CORRIGIDA"""
@@ -831,6 +822,95 @@ def processar_arquivo(arquivo, tipo_arquivo):
         st.error(f"Erro ao processar {tipo_arquivo.upper()}: {e}")
         return None
 
+def detectar_colunas_automaticamente(df, tipo):
+    """Detecta automaticamente colunas de data, valor e descrição"""
+    colunas = df.columns.tolist()
+    colunas_lower = [str(col).lower() for col in colunas]  # GARANTIR QUE É STRING
+    
+    # Mapeamento de padrões com pesos
+    padroes_data = ['data', 'date', 'dt', 'datahora', 'data_transacao', 'vencimento']
+    padroes_valor = ['valor', 'value', 'amount', 'vlr', 'montante', 'saldo', 'total']
+    padroes_descricao = ['descricao', 'description', 'desc', 'historico', 'observacao', 'memo', 'payee', 'nome']
+    
+    # Encontrar colunas correspondentes com scoring
+    col_data = None
+    col_valor = None
+    col_descricao = None
+    melhor_score_data = 0
+    melhor_score_valor = 0
+    melhor_score_desc = 0
+    
+    for i, col in enumerate(colunas_lower):
+        col_original = colunas[i]
+        
+        # Verificar padrões de data
+        for j, padrao in enumerate(padroes_data):
+            if padrao in col:
+                score = len(padrao)  # Score baseado no tamanho do padrão
+                if score > melhor_score_data:
+                    melhor_score_data = score
+                    col_data = col_original
+        
+        # Verificar padrões de valor
+        for j, padrao in enumerate(padroes_valor):
+            if padrao in col:
+                score = len(padrao)
+                if score > melhor_score_valor:
+                    melhor_score_valor = score
+                    col_valor = col_original
+        
+        # Verificar padrões de descrição
+        for j, padrao in enumerate(padroes_descricao):
+            if padrao in col:
+                score = len(padrao)
+                if score > melhor_score_desc:
+                    melhor_score_desc = score
+                    col_descricao = col_original
+    
+    # Fallbacks inteligentes
+    if not col_data:
+        # Procurar colunas que parecem ser datas
+        for col in colunas:
+            if df[col].dtype == 'datetime64[ns]':
+                col_data = col
+                break
+            elif len(df) > 0 and isinstance(df[col].iloc[0], (datetime, pd.Timestamp)):
+                col_data = col
+                break
+    
+    if not col_valor and len(colunas) > 0:
+        # Procurar colunas numéricas
+        for col in colunas:
+            if pd.api.types.is_numeric_dtype(df[col]):
+                col_valor = col
+                break
+    
+    if not col_descricao and len(colunas) > 0:
+        # Procurar colunas de texto
+        for col in colunas:
+            if pd.api.types.is_string_dtype(df[col]):
+                col_descricao = col
+                break
+    
+    # Últimos fallbacks
+    if not col_data and len(colunas) > 0:
+        col_data = colunas[0]
+    if not col_valor and len(colunas) > 1:
+        col_valor = colunas[1]
+    if not col_descricao and len(colunas) > 2:
+        col_descricao = colunas[2]
+    
+    st.info(f"🔍 {tipo} - Colunas detectadas: Data='{col_data}', Valor='{col_valor}', Descrição='{col_descricao}'")
+    return col_data, col_valor, col_descricao
+
+def padronizar_arquivo(df, lado):
+    """Mapeia data/valor/descrição de um arquivo e padroniza com processar_extrato ou processar_contabil"""
+    if lado == 'bancario':
+        col_data, col_valor, col_descricao = detectar_colunas_automaticamente(df, "Extrato Bancário")
+        return processor.processar_extrato(df, col_data, col_valor, col_descricao)
+    col_data, col_valor, col_descricao = detectar_colunas_automaticamente(df, "Lançamentos Contábeis")
+    return processor.processar_contabil(df, col_data, col_valor, col_descricao)
+
 # INTERFACE PRINCIPAL - SISTEMA DE UPLOAD
 if metodo_importacao == "📤 Upload de Arquivos":
     
@@ -915,13 +995,16 @@ if metodo_importacao == "📤 Upload de Arquivos":
                 if st.button("🔄 Processar Conciliação", type="primary", key="btn_processar_validacao"):
                     with st.spinner("Processando arquivos..."):
                         try:
-                            # Processar arquivos bancários
+                            # Processar arquivos bancários: com mais de uma conta, todas são lidas para
+                            # identificar transferências entre contas próprias. Cada arquivo tem seu
+                            # mapeamento de colunas antes de juntar layouts diferentes
+                            contas_bancarias = list(info_arquivos['bancarios']) if len(info_arquivos['bancarios']) > 1 else [conta_selecionada]
                             dfs_bancarios = []
-                            for arquivo in info_arquivos['bancarios'][conta_selecionada]:
+                            for arquivo in [a for conta in contas_bancarias for a in info_arquivos['bancarios'][conta]]:
                                 tipo_arquivo = detectar_tipo_arquivo(arquivo.name)
                                 df = processar_arquivo(arquivo, tipo_arquivo)
                                 if df is not None and not df.empty:
-                                    dfs_bancarios.append(df)
+                                    dfs_bancarios.append(padronizar_arquivo(df, 'bancario'))
                             
                             # Processar arquivos contábeis
                             dfs_contabeis = []
@@ -933,13 +1016,29 @@ if metodo_importacao == "📤 Upload de Arquivos":
                                     continue
                                 df = processar_arquivo(arquivo, tipo_arquivo)
                                 if df is not None and not df.empty:
-                                    dfs_contabeis.append(df)
+                                    dfs_contabeis.append(padronizar_arquivo(df, 'contabil'))
                             
                             # Combinar DataFrames
                             if dfs_bancarios and dfs_contabeis:
                                 extrato_final = pd.concat(dfs_bancarios, ignore_index=True)
                                 contabil_final = pd.concat(dfs_contabeis, ignore_index=True)
                                 
+                                # Arquivos OFX da mesma conta com períodos sobrepostos repetem transações
+                                extrato_final, repetidas_extrato = remover_fitids_duplicados(extrato_final)
+                                contabil_final, repetidas_contabil = remover_fitids_duplicados(contabil_final)
+                                if repetidas_extrato or repetidas_contabil:
+                                    st.info(f"🔁 FITIDs repetidos removidos: {repetidas_extrato} no bancário, {repetidas_contabil} no contábil")
+                                
+                                # Saída de uma conta e entrada de mesmo valor em outra, em até 2 dias
+                                st.session_state.transferencias_internas = pd.DataFrame()
+                                if len(contas_bancarias) > 1:
+                                    extrato_final = marcar_transferencias_internas(extrato_final, janela_dias=2)
+                                    transferencias = extrato_final[extrato_final['transferencia_interna']]
+                                    st.session_state.transferencias_internas = transferencias
+                                    extrato_final = extrato_final[extrato_final['conta_bancaria'] == conta_selecionada].reset_index(drop=True)
+                                    if not transferencias.empty:
+                                        st.info(f"🔀 {len(transferencias) // 2} transferências entre contas próprias identificadas; {int(extrato_final['transferencia_interna'].sum())} lançamentos da conta {conta_selecionada} ficam fora do matching")
+                                
                                 # Salvar no session state
                                 st.session_state.extrato_df = extrato_final
                                 st.session_state.contabil_df = contabil_final
@@ -967,6 +1066,49 @@ if metodo_importacao == "📤 Upload de Arquivos":
                                 
                         except Exception as e:
                             st.error(f"❌ Erro no processamento: {e}")
+                
+                # Conciliação em lote: todas as contas com B_ e C_, uma conta por processo
+                if len(contas_validas) > 1 and st.button(f"⚡ Conciliar todas as {len(contas_validas)} contas", key="btn_conciliar_lote"):
+                    with st.spinner("Conciliando contas em paralelo..."):
+                        try:
+                            # Cada arquivo passa pelo mesmo mapeamento de colunas da conciliação de uma conta
+                            dfs_bancarios, dfs_contabeis = [], []
+                            for lado, padrao, destino in (('bancarios', 'bancario', dfs_bancarios),
+                                                          ('contabeis', 'contabil', dfs_contabeis)):
+                                for conta in sorted(info_arquivos[lado]):
+                                    for arquivo in info_arquivos[lado][conta]:
+                                        tipo_arquivo = detectar_tipo_arquivo(arquivo.name)
+                                        if lado == 'contabeis' and not permitir_ofx_contabil and tipo_arquivo == 'ofx':
+                                            continue
+                                        df = processar_arquivo(arquivo, tipo_arquivo)
+                                        if df is not None and not df.empty:
+                                            destino.append(padronizar_arquivo(df, padrao))
+                            
+                            if dfs_bancarios and dfs_contabeis:
+                                extrato_lote, _ = remover_fitids_duplicados(pd.concat(dfs_bancarios, ignore_index=True))
+                                contabil_lote, _ = remover_fitids_duplicados(pd.concat(dfs_contabeis, ignore_index=True))
+                                extrato_lote = marcar_transferencias_internas(extrato_lote, janela_dias=2)
+                                
+                                resultado_lote = conciliar_contas_em_lote(extrato_lote, contabil_lote)
+                                st.session_state.resultados_lote = resultado_lote
+                                
+                                totais = resultado_lote['totais']
+                                st.success(f"✅ {totais['contas']} contas conciliadas: {totais['matches']} correspondências, "
+                                           f"{totais['cobertura_extrato']:.1f}% do extrato conciliado")
+                                st.dataframe(resultado_lote['resumo'], width='stretch')
+                                st.download_button(
+                                    "📥 Baixar resumo por conta (CSV)",
+                                    resultado_lote['resumo'].to_csv(index=False).encode('utf-8'),
+                                    file_name=f"conciliacao_lote_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                                    mime="text/csv"
+                                )
+                                if resultado_lote['contas_ignoradas']:
+                                    st.warning(f"⚠️ Contas sem par B_/C_ ignoradas: {', '.join(resultado_lote['contas_ignoradas'])}")
+                            else:
+                                st.error("❌ Não foi possível processar os arquivos para conciliação")
+                        
+                        except Exception as e:
+                            st.error(f"❌ Erro na conciliação em lote: {e}")
             
             else:
                 st.error("""
@@ -1106,87 +1248,6 @@ if st.session_state.extrato_df is not None and st.session_state.contabil_df is n
     # Processamento automático sem configuração do usuário
     with st.spinner("Processando e padronizando dados automaticamente..."):
         try:
-            def detectar_colunas_automaticamente(df, tipo):
-                """Detecta automaticamente colunas de data, valor e descrição"""
-                colunas = df.columns.tolist()
-                colunas_lower = [str(col).lower() for col in colunas]  # GARANTIR QUE É STRING
-                
-                # Mapeamento de padrões com pesos
-                padroes_data = ['data', 'date', 'dt', 'datahora', 'data_transacao', 'vencimento']
-                padroes_valor = ['valor', 'value', 'amount', 'vlr', 'montante', 'saldo', 'total']
-                padroes_descricao = ['descricao', 'description', 'desc', 'historico', 'observacao', 'memo', 'payee', 'nome']
-                
-                # Encontrar colunas correspondentes com scoring
-                col_data = None
-                col_valor = None
-                col_descricao = None
-                melhor_score_data = 0
-                melhor_score_valor = 0
-                melhor_score_desc = 0
-                
-                for i, col in enumerate(colunas_lower):
-                    col_original = colunas[i]
-                    
-                    # Verificar padrões de data
-                    for j, padrao in enumerate(padroes_data):
-                        if padrao in col:
-                            score = len(padrao)  # Score baseado no tamanho do padrão
-                            if score > melhor_score_data:
-                                melhor_score_data = score
-                                col_data = col_original
-                    
-                    # Verificar padrões de valor
-                    for j, padrao in enumerate(padroes_valor):
-                        if padrao in col:
-                            score = len(padrao)
-                            if score > melhor_score_valor:
-                                melhor_score_valor = score
-                                col_valor = col_original
-                    
-                    # Verificar padrões de descrição
-                    for j, padrao in enumerate(padroes_descricao):
-                        if padrao in col:
-                            score = len(padrao)
-                            if score > melhor_score_desc:
-                                melhor_score_desc = score
-                                col_descricao = col_original
-                
-                # Fallbacks inteligentes
-                if not col_data:
-                    # Procurar colunas que parecem ser datas
-                    for col in colunas:
-                        if df[col].dtype == 'datetime64[ns]':
-                            col_data = col
-                            break
-                        elif len(df) > 0 and isinstance(df[col].iloc[0], (datetime, pd.Timestamp)):
-                            col_data = col
-                            break
-                
-                if not col_valor and len(colunas) > 0:
-                    # Procurar colunas numéricas
-                    for col in colunas:
-                        if pd.api.types.is_numeric_dtype(df[col]):
-                            col_valor = col
-                            break
-                
-                if not col_descricao and len(colunas) > 0:
-                    # Procurar colunas de texto
-                    for col in colunas:
-                        if pd.api.types.is_string_dtype(df[col]):
-                            col_descricao = col
-                            break
-                
-                # Últimos fallbacks
-                if not col_data and len(colunas) > 0:
-                    col_data = colunas[0]
-                if not col_valor and len(colunas) > 1:
-                    col_valor = colunas[1]
-                if not col_descricao and len(colunas) > 2:
-                    col_descricao = colunas[2]
-                
-                st.info(f"🔍 {tipo} - Colunas detectadas: Data='{col_data}', Valor='{col_valor}', Descrição='{col_descricao}'")
-                return col_data, col_valor, col_descricao
-            
             # Detectar colunas automaticamente
             col_data_extrato, col_valor_extrato, col_descricao_extrato = detectar_colunas_automaticamente(
                 st.session_state.extrato_df, "Extrato Bancário"
@@ -1205,6 +1266,8 @@ if st.session_state.extrato_df is not None and st.session_state.contabil_df is n
 
             # Processar extrato
             extrato_processado = chunker.process_in_chunks(st.session_state.extrato_df, process_chunk)
+            # Cada chunk numera seus ids a partir de 1: renumera para manter um id por linha
+            extrato_processado['id'] = range(1, len(extrato_processado) + 1)
             
             # Processar lançamentos contábeis
             contabil_processado = processor.processar_contabil(
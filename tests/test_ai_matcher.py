@@ -0,0 +1,42 @@
+import itertools
+
+import pandas as pd
+
+import modules.ai_matcher as ai_matcher
+from modules.ai_matcher import AIMatcher
+
+
+def _lancamentos(valores, ids):
+    return pd.DataFrame({'id': ids, 'data': pd.Timestamp('2024-03-01'), 'valor': valores,
+                         'descricao': [f'PAGAMENTO FORNECEDOR {i}' for i in ids]})
+
+
+def test_prazo_esgotado_reporta_cobertura_parcial_dos_maiores_valores(monkeypatch):
+    """Relógio que avança 1s por leitura: a estratégia semântica só processa o primeiro bloco"""
+    relogio = itertools.count()
+    monkeypatch.setattr(ai_matcher, 'perf_counter', lambda: next(relogio))
+    extrato = _lancamentos([100.0, 400.0, 300.0, 200.0], [1, 2, 3, 4])
+    contabil = _lancamentos([100.0, 400.0, 300.0, 200.0], [11, 12, 13, 14])
+
+    resultado = AIMatcher(linhas_por_bloco=2).matching_avancado_com_ia(
+        extrato, contabil, extrato, contabil, prazo_segundos=1.5)
+
+    semantica = resultado['cobertura']['estrategias']['semantica']
+    assert semantica == {'linhas': 2, 'percentual_linhas': 50.0, 'percentual_valor': 70.0}
+    assert resultado['cobertura']['prazo_esgotado']
+    assert resultado['cobertura']['percentual_linhas'] <= 50.0
+    assert [(m['ids_extrato'], m['ids_contabil']) for m in resultado['matches']] == [([2], [12]), ([3], [13])]
+
+
+def test_prazo_zero_nao_processa_nada_e_sem_prazo_cobre_tudo():
+    extrato = _lancamentos([100.0, 400.0], [1, 2])
+    contabil = _lancamentos([100.0, 400.0], [11, 12])
+
+    esgotado = AIMatcher().matching_avancado_com_ia(extrato, contabil, extrato, contabil, prazo_segundos=0)
+    completo = AIMatcher().matching_avancado_com_ia(extrato, contabil, extrato, contabil)
+
+    assert esgotado['matches'] == []
+    assert esgotado['cobertura']['prazo_esgotado']
+    assert esgotado['cobertura']['percentual_linhas'] == esgotado['cobertura']['percentual_valor'] == 0.0
+    assert not completo['cobertura']['prazo_esgotado']
+    assert completo['cobertura']['percentual_linhas'] == completo['cobertura']['percentual_valor'] == 100.0
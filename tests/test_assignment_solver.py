@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from modules.assignment_solver import AssignmentSolver
+
+
+def test_atribuicao_otima_supera_a_gulosa_num_componente():
+    """A gulosa aceita o par mais forte (0, 0) e deixa o extrato 1 sem par; a ótima troca e soma mais"""
+    pos_extrato = np.array([0, 0, 1])
+    pos_contabil = np.array([0, 1, 0])
+    pesos = np.array([90.0, 85.0, 80.0])
+
+    gulosa = AssignmentSolver('gulosa').resolver(pos_extrato, pos_contabil, pesos)
+    otima = AssignmentSolver('otima').resolver(pos_extrato, pos_contabil, pesos)
+
+    assert gulosa.tolist() == [0]
+    assert otima.tolist() == [1, 2]
+    assert pesos[otima].sum() > pesos[gulosa].sum()
+
+
+def test_componentes_independentes_e_estrategia_invalida():
+    pos_extrato = np.array([0, 0, 1, 2, 5])
+    pos_contabil = np.array([0, 1, 0, 7, 9])
+    pesos = np.array([90.0, 85.0, 80.0, 50.0, 10.0])
+
+    escolhidos = AssignmentSolver('otima').resolver(pos_extrato, pos_contabil, pesos)
+
+    assert escolhidos.tolist() == [1, 2, 3, 4]
+    assert AssignmentSolver().resolver([], [], []).tolist() == []
+    with pytest.raises(ValueError):
+        AssignmentSolver('aleatoria')
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from modules.data_analyzer import DataAnalyzer
+from modules.identificadores import codigo_barras_boleto, documentos_validos, remover_fitids_duplicados
+
+# Boleto do banco 001 (R$ 100,00) e conta de concessionária (R$ 15,00), com todos os DVs conferindo
+CODIGO_BOLETO = '00199100000000100000000001234567890123456789'
+LINHA_BOLETO = '00190.00009 01234.567897 01234.567897 9 10000000010000'
+CODIGO_ARRECADACAO = '82690000000150000011234567890123456789012345'
+LINHA_ARRECADACAO = '82690000000-9 15000001123-2 45678901234-5 56789012345-6'
+
+
+def _trocar_digito(texto: str, posicao: int) -> str:
+    return texto[:posicao] + str((int(texto[posicao]) + 1) % 10) + texto[posicao + 1:]
+
+
+def test_linha_digitavel_e_codigo_de_barras_validos_viram_o_mesmo_codigo():
+    assert codigo_barras_boleto(LINHA_BOLETO) == CODIGO_BOLETO
+    assert codigo_barras_boleto(LINHA_BOLETO.replace('.', '').replace(' ', '')) == CODIGO_BOLETO
+    assert codigo_barras_boleto(CODIGO_BOLETO) == CODIGO_BOLETO
+    assert codigo_barras_boleto(LINHA_ARRECADACAO) == CODIGO_ARRECADACAO
+    assert codigo_barras_boleto(CODIGO_ARRECADACAO) == CODIGO_ARRECADACAO
+
+
+def test_dv_geral_errado_ou_tamanho_invalido_descartam_o_codigo():
+    assert codigo_barras_boleto(_trocar_digito(CODIGO_BOLETO, 4)) == ''
+    assert codigo_barras_boleto(_trocar_digito(CODIGO_BOLETO, 30)) == ''
+    assert codigo_barras_boleto(_trocar_digito(CODIGO_ARRECADACAO, 3)) == ''
+    assert codigo_barras_boleto(CODIGO_BOLETO[:-1]) == ''
+    assert codigo_barras_boleto(None) == ''
+
+
+def test_camada_exata_casa_boleto_e_e2e_pix_entre_formatos():
+    e2e = 'E12345678202403011200ABCDEFGHIJK'
+    extrato = pd.DataFrame({'id': [1, 2, 3], 'data': pd.to_datetime(['2024-03-01', '2024-03-02', '2024-03-03']),
+                            'valor': [-100.0, 250.0, -100.0],
+                            'descricao': [f'PAG BOLETO {LINHA_BOLETO}', f'PIX RECEBIDO {e2e}',
+                                          f'PAG BOLETO {_trocar_digito(CODIGO_BOLETO, 4)}']})
+    contabil = pd.DataFrame({'id': [10, 11, 12], 'data': pd.to_datetime(['2024-02-20', '2024-02-25', '2024-04-01']),
+                             'valor': [100.0, 250.0, 100.0],
+                             'descricao': [f'FORNECEDOR CB {CODIGO_BOLETO}', f'CLIENTE X {e2e}',
+                                           f'OUTRO CB {_trocar_digito(CODIGO_BOLETO, 4)}']})
+
+    matches = DataAnalyzer().matching_exato(extrato, contabil, por_janela=False)['matches']
+
+    assert sorted((m['chave_match'].split('_')[0], m['ids_extrato'], m['ids_contabil']) for m in matches) == [
+        ('BOLETO', [1], [10]), ('E2E', [2], [11])]
+
+
+def test_documentos_validos_confere_dvs_de_cpf_e_cnpj():
+    textos = pd.Series(['PIX CPF 529.982.247-25', 'TED CNPJ 11.222.333/0001-81', 'DOC 52998224725',
+                        'FORN 11222333000181', 'CPF 529.982.247-24', 'CNPJ 11.222.333/0001-80',
+                        'CPF 111.111.111-11', 'CONTA 12345678901 CPF 52998224725', None, 'SEM DOCUMENTO'])
+
+    assert documentos_validos(textos).tolist() == [
+        '52998224725', '11222333000181', '52998224725', '11222333000181', '', '', '', '52998224725', '', '']
+
+
+def test_fitid_repetido_so_e_removido_dentro_da_mesma_conta():
+    extrato = pd.DataFrame({'conta_bancaria': ['A', 'A', 'B', 'A', 'A', 'A'],
+                            'fitid': ['F1', 'F1', 'F1', 'F2', None, None],
+                            'valor': [10.0, 10.0, 10.0, 20.0, 30.0, 30.0]})
+
+    sem_repetidas, removidas = remover_fitids_duplicados(extrato)
+
+    assert removidas == 1
+    assert sem_repetidas[['conta_bancaria', 'fitid']].fillna('').values.tolist() == [
+        ['A', 'F1'], ['B', 'F1'], ['A', 'F2'], ['A', ''], ['A', '']]
+    assert remover_fitids_duplicados(extrato.drop(columns='conta_bancaria'))[1] == 2
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from modules.match_ledger import MatchLedger
+
+
+def _match(ids_extrato, ids_contabil):
+    return {'ids_extrato': ids_extrato, 'ids_contabil': ids_contabil}
+
+
+def test_ledger_recusa_match_que_toca_linha_ja_conciliada():
+    extrato = pd.DataFrame({'id': [1, 2, 3]})
+    contabil = pd.DataFrame({'id': ['a', 'b', 'c']})
+    ledger = MatchLedger(extrato, contabil)
+
+    aceitos = ledger.registrar([_match([1], ['a']), _match([2], ['a']), _match([2, 3], ['b']), _match([3], ['c'])])
+
+    assert aceitos == [_match([1], ['a']), _match([2, 3], ['b'])]
+    assert ledger.total_conciliados('extrato') == 3
+    assert ledger.nao_conciliados(contabil, 'contabil')['id'].tolist() == ['c']
+
+
+def test_ledger_com_ids_repetidos_e_ids_de_fora():
+    extrato = pd.DataFrame({'id': [7, 7, 8]})
+    ledger = MatchLedger(extrato, pd.DataFrame({'id': [1]}))
+
+    assert ledger.reivindicar(_match([7, 99], [1]))
+    # As duas linhas com id 7 compartilham o estado; ids desconhecidos ficam livres
+    assert ledger.livres(extrato, 'extrato').tolist() == [False, False, True]
+    assert ledger.livres(pd.DataFrame({'id': [99]}), 'extrato').tolist() == [True]
+    assert ledger.codigos('extrato', [8, 99]).tolist() == [1, -1]
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from modules.data_analyzer import DataAnalyzer
+from modules.matching_engine import (CandidateIndex, FeeAwareMatcher, HashJoinEngine, SortMergeMatcher,
+                                     dentro_da_tolerancia, limites_tolerancia)
+
+
+def _ids(matches):
+    return sorted((m['chave_match'].split('_')[0], tuple(m['ids_extrato']), tuple(m['ids_contabil'])) for m in matches)
+
+
+def test_hash_join_agrupa_multiplicidades_da_chave():
+    extrato = pd.DataFrame({'id': [1, 2, 3], 'valor': [100.0, 50.0, 30.0], 'nsu': ['111111', '222222', '222222']})
+    contabil = pd.DataFrame({'id': [7, 8, 9], 'valor': [60.0, 40.0, 80.0], 'nsu': ['111111', '111111', '222222']})
+
+    matches = HashJoinEngine().juntar_por_chave(extrato, contabil, 'nsu', 'NSU', 'NSU')
+
+    assert sorted((m['tipo_match'], m['ids_extrato'], m['ids_contabil'], m['valor_total']) for m in matches) == [
+        ('1:N', [1], [7, 8], 100.0), ('N:1', [2, 3], [9], 80.0)]
+
+
+def test_linha_casada_por_um_identificador_nao_volta_nas_etapas_seguintes():
+    """O extrato 1 traz TXID e NSU: casa pelo TXID e o lançamento que só tem o NSU fica livre"""
+    extrato = pd.DataFrame({
+        'id': [1, 2], 'data': pd.to_datetime(['2024-03-01', '2024-03-02']), 'valor': [150.0, 75.0],
+        'descricao': ['PIX TXID: ABC123XYZ NSU 654321', 'PAGAMENTO NSU 777777']
+    })
+    contabil = pd.DataFrame({
+        'id': [10, 11, 12], 'data': pd.to_datetime(['2024-03-01', '2024-03-05', '2024-03-09']),
+        'valor': [150.0, 150.0, 75.0],
+        'descricao': ['RECEBIMENTO TXID: ABC123XYZ', 'VENDA CARTAO NSU 654321', 'BAIXA NSU 777777']
+    })
+
+    resultado = DataAnalyzer().matching_exato(extrato, contabil, por_janela=False)
+
+    assert _ids(resultado['matches']) == [('NSU', (2,), (12,)), ('TXID', (1,), (10,))]
+    assert resultado['nao_matchados_contabil']['id'].tolist() == [11]
+
+
+def test_sort_merge_pareia_valores_repetidos_por_ocorrencia():
+    """Três lançamentos iguais no mesmo dia contra dois no extrato: a k-ésima ocorrência casa com a k-ésima"""
+    extrato = pd.DataFrame({'id': [1, 2, 3], 'data': pd.to_datetime(['2024-05-02', '2024-05-02', '2024-05-03']),
+                            'valor': [-49.9, -49.9, -49.9]})
+    contabil = pd.DataFrame({'id': [10, 11, 12, 13], 'data': pd.to_datetime(['2024-05-02'] * 3 + ['2024-05-04']),
+                             'valor': [49.9, 49.9, 49.9, 49.9]})
+
+    matches = SortMergeMatcher().parear_valor_data(extrato, contabil)
+
+    assert [(m['ids_extrato'], m['ids_contabil'], m['confianca']) for m in matches] == [([1], [10], 90), ([2], [11], 90)]
+    assert matches[1]['chave_match'].endswith('_2')
+    assert 'ocorrência 2 de 3' in matches[1]['explicacao']
+
+
+def _pares_forca_bruta(consulta, indice, tolerancia_valor, tolerancia_dias, tolerancia_relativa=0.0):
+    centavos_c = np.rint(consulta['valor'].abs().to_numpy() * 100).astype(np.int64)
+    centavos_i = np.rint(indice['valor'].abs().to_numpy() * 100).astype(np.int64)
+    dias_c, dias_i = consulta['data'].to_numpy(), indice['data'].to_numpy()
+    return sorted((a, b) for a in range(len(consulta)) for b in range(len(indice))
+                  if abs((dias_c[a] - dias_i[b]) / np.timedelta64(1, 'D')) <= tolerancia_dias
+                  and dentro_da_tolerancia(abs(centavos_c[a] - centavos_i[b]), max(centavos_c[a], centavos_i[b]),
+                                           tolerancia_valor, tolerancia_relativa))
+
+
+def test_indice_de_candidatos_nas_bordas_do_recorte_de_centavos():
+    """Janelas abaixo de zero e acima do maior valor do índice são recortadas sem vazar para outros dias"""
+    indice = pd.DataFrame({'data': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-03']),
+                           'valor': [10.00, 0.05, 10.00, 0.01]})
+    consulta = pd.DataFrame({'data': pd.to_datetime(['2024-01-02', '2024-01-02', '2024-01-02', '2024-01-02']),
+                             'valor': [0.03, 10.01, 20.00, 9.99]})
+    index = CandidateIndex(indice)
+
+    for tolerancias in ((0.05, 0), (0.05, 1), (0.02, 1), (0.0, 1, 0.5)):
+        pares = index.pares(consulta, *tolerancias)
+        assert list(zip(pares['pos_extrato'], pares['pos_contabil'])) == _pares_forca_bruta(consulta, indice, *tolerancias)
+
+    mesmo_dia = index.pares(consulta, 0.05, 0)
+    assert list(zip(mesmo_dia['pos_extrato'], mesmo_dia['pos_contabil'])) == [(0, 1), (1, 2), (3, 2)]
+
+
+def test_taxas_usam_a_janela_de_dias_de_cada_meio():
+    """Cartão liquida em até 30 dias; boleto em até 1 dia, então o de 3 dias de atraso fica livre"""
+    tabela = {'CARTAO': {'descricao': r'CARTAO', 'percentual': 2.5, 'fixa': 0, 'janela_dias': 30},
+              'BOLETO': {'descricao': r'BOLETO', 'percentual': 0, 'fixa': 3.50, 'janela_dias': 1}}
+    extrato = pd.DataFrame({
+        'id': [1, 2, 3], 'data': pd.to_datetime(['2024-03-21', '2024-03-02', '2024-03-04']),
+        'valor': [975.00, 296.50, 496.50], 'descricao': ['LIQ VENDAS CARTAO', 'LIQ BOLETO', 'LIQ BOLETO']
+    })
+    contabil = pd.DataFrame({
+        'id': [10, 11, 12], 'data': pd.to_datetime(['2024-03-01', '2024-03-01', '2024-03-01']),
+        'valor': [1000.00, 300.00, 500.00], 'descricao': ['VENDA', 'BOLETO CLIENTE A', 'BOLETO CLIENTE B']
+    })
+
+    matches = FeeAwareMatcher(tabela).parear(extrato, contabil)
+
+    assert sorted((m['chave_match'].split('_')[1], m['ids_extrato'], m['ids_contabil']) for m in matches) == [
+        ('BOLETO', [2], [11]), ('CARTAO', [1], [10])]
+
+    tabela['BOLETO']['janela_dias'] = 3
+    assert len(FeeAwareMatcher(tabela).parear(extrato, contabil)) == 3
+
+
+def test_janela_relativa_e_simetrica_em_escala_log_com_piso_absoluto():
+    centavos = np.array([10000, 100, 1_000_000])
+
+    inferior, superior = limites_tolerancia(centavos, tolerancia_valor=0.05, tolerancia_relativa=0.2)
+
+    assert inferior.tolist() == [8000, 80, 800_000]
+    assert superior.tolist() == [12500, 125, 1_250_000]
+    assert limites_tolerancia(np.array([100]), tolerancia_valor=0.50, tolerancia_relativa=0.2)[0].tolist() == [50]
+    # As bordas da janela são exatamente os pares que dentro_da_tolerancia aceita
+    for valor, baixo, alto in zip(centavos, inferior, superior):
+        for outro, aceito in ((baixo, True), (baixo - 1, False), (alto, True), (alto + 1, False)):
+            maior = np.maximum(valor, outro)
+            assert dentro_da_tolerancia(abs(valor - outro), maior, 0.05, 0.2) == aceito
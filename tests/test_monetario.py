@@ -0,0 +1,22 @@
+import pandas as pd
+
+from modules.monetario import centavos_absolutos, garantir_coluna_centavos
+
+
+def test_centavos_sao_recalculados_quando_valor_muda_depois():
+    df = garantir_coluna_centavos(pd.DataFrame({'valor': [10.10, -0.29]}))
+    df['valor'] = [10.15, '-0.29']
+
+    atualizado = garantir_coluna_centavos(df)
+
+    assert atualizado['valor_centavos'].tolist() == [1015, -29]
+    assert centavos_absolutos(df).tolist() == [1015, 29]
+
+
+def test_centavos_em_dia_e_sem_valor_ficam_como_estao():
+    df = garantir_coluna_centavos(pd.DataFrame({'valor': [1.0, 2.5]}))
+    so_centavos = pd.DataFrame({'valor_centavos': [100, -250]})
+
+    assert garantir_coluna_centavos(df) is df
+    assert garantir_coluna_centavos(so_centavos) is so_centavos
+    assert centavos_absolutos(so_centavos).tolist() == [100, 250]
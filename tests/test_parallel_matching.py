@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from modules.parallel_matching import (PARAMETROS_CONCILIACAO_PADRAO, AccountBatchReconciler, conciliar_conta,
+                                      conciliar_conta_por_periodo)
+
+
+def _conta_com_identificador_distante(dias: int = 40):
+    """Uma linha por dia casando por valor e data, mais um par por NSU no meio de fatias diferentes de 14 dias"""
+    datas = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(dias - 2), 'D')
+    valores = np.round(100 + np.arange(dias - 2) * 7.31, 2)
+    extrato = pd.DataFrame({'id': range(1, dias - 1), 'data': datas, 'valor': valores,
+                            'descricao': [f'PAGAMENTO {i}' for i in range(dias - 2)]})
+    contabil = pd.DataFrame({'id': range(1, dias - 1), 'data': datas, 'valor': valores,
+                             'descricao': [f'LANCAMENTO {i}' for i in range(dias - 2)]})
+    extrato.loc[len(extrato)] = [dias - 1, pd.Timestamp('2024-01-08'), 5432.10, 'VENDA CARTAO NSU 987654']
+    contabil.loc[len(contabil)] = [dias - 1, pd.Timestamp('2024-01-22'), 5432.10, 'RECEBIMENTO NSU 987654']
+    return extrato, contabil
+
+
+def _pares(resultado):
+    return sorted((m['camada'], tuple(m['ids_extrato']), tuple(m['ids_contabil']))
+                  for m in resultado['resultados']['matches'])
+
+
+def test_fatias_de_datas_equivalem_a_execucao_serial_com_identificador_distante():
+    extrato, contabil = _conta_com_identificador_distante()
+    parametros = {**PARAMETROS_CONCILIACAO_PADRAO, 'permite_1n': False, 'permite_n1': False}
+
+    serial = conciliar_conta(extrato, contabil, parametros)
+    fatiado = conciliar_conta_por_periodo(extrato, contabil, processos=1, dias_por_fatia=14,
+                                          permite_1n=False, permite_n1=False)
+
+    assert fatiado['fatias'] > 1
+    assert ('exata', (39,), (39,)) in _pares(serial)
+    assert _pares(fatiado) == _pares(serial)
+
+
+def test_lote_por_conta_equivale_a_execucoes_seriais_por_conta():
+    extrato_a, contabil_a = _conta_com_identificador_distante()
+    extrato_b, contabil_b = _conta_com_identificador_distante(20)
+    extrato_b['valor'] = extrato_b['valor'] + 0.37
+    contabil_b['valor'] = contabil_b['valor'] + 0.37
+    extrato = pd.concat([extrato_a.assign(conta_bancaria='111'), extrato_b.assign(conta_bancaria='222')], ignore_index=True)
+    contabil = pd.concat([contabil_a.assign(conta_bancaria='111'), contabil_b.assign(conta_bancaria='222')], ignore_index=True)
+    parametros = {'permite_1n': False, 'permite_n1': False}
+
+    lote = AccountBatchReconciler(processos=2, **parametros).conciliar(extrato, contabil)
+
+    assert sorted(lote['contas']) == ['111', '222']
+    for conta, (extrato_conta, contabil_conta) in {'111': (extrato_a, contabil_a), '222': (extrato_b, contabil_b)}.items():
+        serial = conciliar_conta(extrato_conta.assign(conta_bancaria=conta), contabil_conta.assign(conta_bancaria=conta),
+                                 {**PARAMETROS_CONCILIACAO_PADRAO, **parametros})
+        assert _pares(lote['contas'][conta]) == _pares(serial)
+    assert lote['totais']['matches'] == sum(len(r['resultados']['matches']) for r in lote['contas'].values())
+
+
+def test_agrupamento_ia_que_cruza_a_fronteira_das_fatias_equivale_a_execucao_serial():
+    """Grupo N:1 da IA ancorado na véspera da fronteira, com o alvo 6 dias depois e a outra parte 12 dias depois"""
+    dias = 50
+    datas = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(dias), 'D')
+    valores = np.round(100 + np.arange(dias) * 7.31, 2)
+    extrato = pd.DataFrame({'id': range(1, dias + 1), 'data': datas, 'valor': valores,
+                            'descricao': [f'PAGAMENTO {i}' for i in range(dias)]})
+    contabil = pd.DataFrame({'id': range(1, dias + 1), 'data': datas, 'valor': valores,
+                             'descricao': [f'LANCAMENTO {i}' for i in range(dias)]})
+    extrato.loc[len(extrato)] = [dias + 1, pd.Timestamp('2024-01-21'), 3000.00, 'PARCELA A']
+    extrato.loc[len(extrato)] = [dias + 2, pd.Timestamp('2024-02-02'), 2000.00, 'PARCELA B']
+    contabil.loc[len(contabil)] = [dias + 1, pd.Timestamp('2024-01-27'), 5000.00, 'FATURA CONSOLIDADA']
+
+    serial = conciliar_conta(extrato, contabil, PARAMETROS_CONCILIACAO_PADRAO)
+    fatiado = conciliar_conta_por_periodo(extrato, contabil, processos=1, dias_por_fatia=21)
+
+    assert fatiado['fatias'] > 1
+    assert ('ia_agrupamento', (dias + 1, dias + 2), (dias + 1,)) in _pares(serial)
+    assert _pares(fatiado) == _pares(serial)
@@ -0,0 +1,43 @@
+from itertools import combinations
+
+import pandas as pd
+
+from modules.matching_engine import GroupSumMatcher
+from modules.subset_sum import SubsetSumSolver
+
+
+def test_grupo_exato_com_menos_itens_e_indices_originais():
+    centavos = [1250, 700, 5000, 550, 300, 2000]
+    solver = SubsetSumSolver(orcamento_segundos=5)
+
+    grupo = solver.melhor_grupo(centavos, 2550)
+
+    # 2000 + 550 é o grupo exato com menos itens
+    assert sorted(grupo) == [3, 5]
+    assert solver.melhor_grupo(centavos, 2, tolerancia=1) is None
+
+
+def test_sem_soma_exata_fica_o_grupo_mais_proximo_dentro_da_tolerancia():
+    centavos = [333, 415, 255, 96, 120]
+    alvo, tolerancia = 1000, 10
+    esperado = min((abs(sum(centavos[i] for i in c) - alvo), len(c)) for n in range(2, 6)
+                   for c in combinations(range(len(centavos)), n))
+    assert esperado == (3, 3)
+
+    grupo = SubsetSumSolver(orcamento_segundos=5).melhor_grupo(centavos, alvo, tolerancia)
+
+    assert (abs(sum(centavos[i] for i in grupo) - alvo), len(grupo)) == esperado
+    assert SubsetSumSolver(orcamento_segundos=5).melhor_grupo(centavos, alvo, tolerancia=0) is None
+
+
+def test_agrupamento_nao_reutiliza_partes_entre_alvos():
+    datas = pd.to_datetime(['2024-02-01'] * 5)
+    partes = pd.DataFrame({'id': range(1, 6), 'data': datas, 'valor': [10.0, 20.0, 30.0, 40.0, 5.0]})
+    alvos = pd.DataFrame({'id': [100, 101], 'data': datas[:2], 'valor': [70.0, 30.0]})
+
+    grupos = GroupSumMatcher(SubsetSumSolver(orcamento_segundos=5)).agrupar(alvos, partes, 0, 1)
+
+    usadas = [p for _, posicoes in grupos for p in posicoes.tolist()]
+    assert len(usadas) == len(set(usadas))
+    assert [pos_alvo for pos_alvo, _ in grupos] == [0, 1]
+    assert all(partes['valor'].iloc[posicoes].sum() == alvos['valor'].iloc[pos_alvo] for pos_alvo, posicoes in grupos)
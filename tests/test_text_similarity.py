@@ -0,0 +1,17 @@
+import pandas as pd
+import pytest
+
+from modules.text_similarity import BACKENDS_SIMILARIDADE, possiveis_correspondencias
+
+
+@pytest.mark.parametrize('backend', BACKENDS_SIMILARIDADE)
+def test_descricoes_repetidas_nao_escondem_o_par_dentro_das_tolerancias(backend):
+    """Com 30 descrições idênticas no contábil, só a única dentro de valor e data vira par"""
+    extrato = pd.DataFrame({'data': ['2024-01-10'], 'valor': [100.0], 'descricao': ['PAGAMENTO FORNECEDOR REF']})
+    contabil = pd.DataFrame({'data': ['2024-03-01'] * 29 + ['2024-01-10'], 'valor': [100.0] * 30,
+                             'descricao': ['PAGAMENTO FORNECEDOR REF'] * 30})
+    contabil.loc[0:10, ['data', 'valor']] = ['2024-01-11', 500.0]
+
+    pares = possiveis_correspondencias(extrato, contabil, backend)
+
+    assert pares[['pos_extrato', 'pos_contabil']].values.tolist() == [[0, 29]]
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from modules.transferencias import InternalTransferDetector, marcar_transferencias_internas
+
+
+def _extratos_duas_contas():
+    """Duas contas com uma transferência espelhada (saída na 111, entrada na 222 um dia depois)"""
+    return pd.DataFrame({
+        'data': ['2024-10-01', '2024-10-02', '2024-10-03', '2024-10-01', '2024-10-04'],
+        'valor': ['-150.00', '-2500.00', '80.50', '150.00', '2500.00'],
+        'descricao': ['SUPERMERCADO ABC', 'TED ENVIADA', 'PIX RECEBIDO', 'ESTORNO', 'TED RECEBIDA'],
+        'conta_bancaria': ['111', '111', '111', '222', '222']
+    })
+
+
+def test_transferencia_espelhada_entre_contas_e_marcada():
+    extrato = _extratos_duas_contas()
+    extrato.loc[4, 'data'] = '2024-10-03'
+
+    marcado = marcar_transferencias_internas(extrato, janela_dias=2)
+
+    # Datas e valores em texto são convertidos pelo próprio detector
+    assert marcado['transferencia_interna'].tolist() == [True, True, False, True, True]
+    assert marcado['conta_contrapartida'].tolist() == ['222', '222', '', '111', '111']
+
+
+def test_pares_fora_da_janela_nao_sao_transferencias():
+    pares = InternalTransferDetector(janela_dias=1).detectar(_extratos_duas_contas())
+
+    assert pares[['pos_saida', 'pos_entrada', 'diff_dias']].values.tolist() == [[0, 3, 0]]
+
+
+def test_extrato_sem_colunas_mapeadas_volta_inalterado():
+    extrato = _extratos_duas_contas().rename(columns={'data': 'Data', 'valor': 'Valor'})
+
+    marcado = marcar_transferencias_internas(extrato)
+
+    assert marcado is extrato
+    assert InternalTransferDetector().detectar(extrato).empty